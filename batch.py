@@ -0,0 +1,107 @@
+import re
+import sqlite3
+
+from intent import leading_action
+
+# Actions that change data; only these are batched or spread over task IDs
+WRITE_ACTIONS = {"add", "update"}
+
+# Bullets and numbering in front of pasted list items
+_ITEM_PREFIX_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+# "mark tasks 3, 5 and 9 completed": one change applied to several task IDs
+_TASK_IDS_RE = re.compile(
+    r"^(.*?\btasks?)\s+(?:ids?\s+)?(#?\d+(?:\s*(?:,|and|&)\s*#?\d+)+)\b(.*)$", re.IGNORECASE)
+
+
+def split_commands(prompt: str) -> list:
+    """Individual commands in a pasted list.
+
+    Items are separated by newlines or inline "•" bullets, with bullets and
+    numbering removed; semicolons are left alone since values may contain
+    them. A write naming several task IDs ("mark tasks 3, 5 and 9
+    completed") becomes one command per task; a view such as "show tasks
+    1, 2 and 3" is left whole.
+    """
+    commands = []
+    for line in re.split(r"\n+|\s•\s", prompt):
+        line = _ITEM_PREFIX_RE.sub("", line).strip()
+        if not line:
+            continue
+        match = _TASK_IDS_RE.match(line)
+        if match and leading_action(line) in WRITE_ACTIONS:
+            head, task_ids, tail = match.groups()
+            head = re.sub(r"\btasks\b", "task", head, flags=re.IGNORECASE)
+            commands += [f"{head} {task_id}{tail}" for task_id in re.findall(r"\d+", task_ids)]
+        else:
+            commands.append(line)
+    return commands
+
+
+def is_batch(commands) -> bool:
+    """True if at least two of the split commands open with a command verb and one is a write.
+
+    Anything else (one request written over several lines, a form-like
+    list of fields, views only, whose rows a batch does not show) is
+    handled as a single prompt.
+    """
+    actions = [leading_action(command) for command in commands]
+    return (sum(action is not None for action in actions) >= 2
+            and any(action in WRITE_ACTIONS for action in actions))
+
+
+def batch_item(command: str) -> dict:
+    """Unresolved batch entry; action, sql and params are filled in by the caller."""
+    return {"command": command, "action": None, "sql": None, "params": (), "source": None, "error": None}
+
+
+def run_batch(items, pool):
+    """Run resolved batch items in one transaction, all or nothing.
+
+    Returns (results, committed). Each result has the item's command,
+    action, source and SQL plus rows (affected or returned) and a status:
+    "ok" when the batch committed; otherwise the failing item says why and
+    the others are "rolled back" or "not run". An unresolved item fails the
+    batch before anything is executed; if the transaction cannot be started
+    (the database is locked) every item is "not run: <reason>".
+    """
+    results = [{"#": i, "command": item["command"], "action": item["action"], "source": item["source"],
+                "sql": item["sql"], "rows": None, "status": "not run"}
+               for i, item in enumerate(items, 1)]
+    unresolved = [(result, item) for result, item in zip(results, items) if not item["sql"]]
+    if unresolved:
+        for result, item in unresolved:
+            result["status"] = f"error: {item['error'] or 'could not be resolved'}"
+        return results, False
+
+    try:
+        with pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return _execute(conn, items, results)
+    except sqlite3.Error as e:
+        # No connection or no write lock (the database is locked): nothing ran
+        for result in results:
+            result["status"] = f"not run: {e}"
+        return results, False
+
+
+def _execute(conn, items, results):
+    """Run the items inside the open transaction and commit, or roll back on the first error."""
+    for result, item in zip(results, items):
+        try:
+            cur = conn.execute(item["sql"], item["params"] or ())
+            result["rows"] = len(cur.fetchall()) if cur.description else cur.rowcount
+            result["status"] = "ok"
+        except sqlite3.Error as e:
+            conn.rollback()
+            result["status"] = f"error: {e}"
+            for done in results[:result["#"] - 1]:
+                done["status"] = "rolled back"
+            return results, False
+    try:
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        for result in results:
+            result["status"] = f"rolled back: {e}"
+        return results, False
+    return results, True
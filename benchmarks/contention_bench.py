@@ -0,0 +1,221 @@
+"""Write latency while analytical queries run, with readers on the primary vs. the read snapshot.
+
+Times the writes the forms and the chat make (single-row INSERT and
+UPDATE, each its own transaction) on a writer thread while --readers
+threads run Deep Search style analysis: one read transaction per run
+holding several full scans and joins over TASKS. Each mode runs on a
+fresh copy of the database:
+
+    no readers   writes alone, the baseline
+    primary      readers share the primary file with the writer
+    snapshot     readers go through snapshot.SnapshotReader, refreshed in
+                 the background whenever it is --staleness seconds old
+
+Besides write latency it reports "database is locked" failures, the
+largest the primary's WAL grew (readers that always hold a transaction
+keep checkpoints from resetting it) and how many reader runs finished.
+
+Usage (from the repository root):
+    python benchmarks/contention_bench.py [--db path | --contacts 10000 --tasks 100000]
+                                          [--seconds 20] [--readers 4] [--staleness 5]
+                                          [--write-interval 0.01] [--json out.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datagen import generate  # noqa: E402
+from db import get_pool  # noqa: E402
+from snapshot import SnapshotReader  # noqa: E402
+from sql_templates import STATUSES  # noqa: E402
+
+MODES = ["no readers", "primary", "snapshot"]
+
+# One reader run: the kind of multi-step analysis the SQL agent does
+ANALYSIS = [
+    "SELECT C.NAME, COUNT(*) AS TASKS, SUM(T.STATUS = 'Completed') AS DONE FROM TASKS T "
+    "JOIN CONTACTS C ON C.ID = T.ASSIGNED_TO GROUP BY C.ID ORDER BY TASKS DESC LIMIT 10",
+    "SELECT CATEGORY, PRIORITY, COUNT(*), AVG(LENGTH(DESCRIPTION)) FROM TASKS GROUP BY CATEGORY, PRIORITY",
+    "SELECT COUNT(*) FROM TASKS WHERE LOWER(NOTES) LIKE '%review%' OR LOWER(INSTRUCTIONS) LIKE '%review%'",
+    "SELECT STRFTIME('%Y-%m', DEADLINE) AS MONTH, STATUS, COUNT(*) FROM TASKS GROUP BY MONTH, STATUS",
+]
+
+INSERT_TASK = """INSERT INTO TASKS (
+    TITLE, DESCRIPTION, CATEGORY, PRIORITY, EXPECTED_OUTCOME,
+    DEADLINE, ASSIGNED_TO, DEPENDENCIES, REQUIRED_RESOURCES,
+    ESTIMATED_TIME, INSTRUCTIONS, REVIEW_PROCESS, PERFORMANCE_METRICS,
+    SUPPORT_CONTACT, NOTES, STATUS
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def analyze(conn):
+    """One reader run inside a single read transaction."""
+    conn.execute("BEGIN")
+    try:
+        for sql_query in ANALYSIS:
+            conn.execute(sql_query).fetchall()
+    finally:
+        conn.rollback()
+
+
+def writer(pool, path, contacts, tasks, seed, stop, interval):
+    """Form-style writes until stop is set: (latencies, lock errors, largest WAL in bytes)."""
+    rng = random.Random(seed)
+    samples, locked, wal_peak = [], 0, 0
+    while not stop.is_set():
+        if rng.random() < 0.5:
+            sql_query, params = "UPDATE TASKS SET STATUS = ? WHERE ID = ?", (
+                rng.choice(STATUSES), rng.randint(1, tasks))
+        else:
+            sql_query, params = INSERT_TASK, (
+                f"Bench task {rng.random()}", "Benchmark task", "Work", "Medium", "Done",
+                "2025-04-01 18:00:00", rng.randint(1, contacts), "", "", "1 day", "", "", "",
+                None, "", "Not Started")
+        start = time.perf_counter()
+        try:
+            with pool.connection() as conn:
+                conn.execute(sql_query, params)
+                conn.commit()
+            samples.append(time.perf_counter() - start)
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            locked += 1
+        try:
+            wal_peak = max(wal_peak, os.path.getsize(f"{path}-wal"))
+        except OSError:
+            pass
+        time.sleep(interval)
+    return samples, locked, wal_peak
+
+
+def reader(connect, stop, runs):
+    while not stop.is_set():
+        with connect() as conn:
+            analyze(conn)
+        runs.append(1)
+
+
+def run_mode(mode, path, contacts, tasks, args):
+    pool = get_pool(path)
+    snapshots = None
+    if mode == "primary":
+        connect = pool.connection
+    elif mode == "snapshot":
+        snapshots = SnapshotReader(path, max_staleness=args.staleness)
+        snapshots.refresh()
+        connect = snapshots.connection
+
+    stop, runs = threading.Event(), []
+    threads = [] if mode == "no readers" else [
+        threading.Thread(target=reader, args=(connect, stop, runs), daemon=True) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    timer = threading.Timer(args.seconds, stop.set)
+    timer.start()
+    samples, locked, wal_peak = writer(pool, path, contacts, tasks, args.seed, stop, args.write_interval)
+    for thread in threads:
+        thread.join()
+    while snapshots and snapshots._refreshing:
+        time.sleep(0.05)  # let a background copy finish before the directory goes
+    pool.close_all()
+
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    result = {
+        "writes": len(samples),
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "max_ms": max(samples) * 1000,
+        "locked": locked,
+        "wal_peak_mb": wal_peak / 2**20,
+        "reader_runs": len(runs),
+    }
+    if snapshots:
+        reads = snapshots.stats["snapshot_reads"] + snapshots.stats["primary_reads"]
+        result["snapshot_share"] = snapshots.stats["snapshot_reads"] / reads if reads else 0.0
+        result["refreshes"] = snapshots.stats["refreshes"]
+        result["refresh_ms"] = snapshots.stats["refresh_seconds"] / max(snapshots.stats["refreshes"], 1) * 1000
+    return result
+
+
+def print_results(results):
+    print(f"{'readers':<12}{'writes':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'locked':>8}{'WAL MB':>8}{'reader runs':>13}")
+    for mode, result in results.items():
+        print(f"{mode:<12}{result['writes']:>8}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+              f"{result['p99_ms']:>9.2f}{result['max_ms']:>9.1f}{result['locked']:>8}"
+              f"{result['wal_peak_mb']:>8.1f}{result['reader_runs']:>13}")
+    if "snapshot" in results:
+        result = results["snapshot"]
+        print(f"snapshot: {result['snapshot_share']:.0%} of reader runs on the snapshot, "
+              f"{result['refreshes']} refreshes of {result['refresh_ms']:.0f} ms each")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contacts", type=int, default=10_000)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="existing database to benchmark copies of instead of generating one")
+    parser.add_argument("--seconds", type=float, default=20.0, help="length of each mode")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent analysis threads")
+    parser.add_argument("--staleness", type=float, default=5.0, help="snapshot staleness bound in seconds")
+    parser.add_argument("--write-interval", type=float, default=0.01, help="pause between writes in seconds")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.db
+        if not source:
+            source = os.path.join(tmp, "source.db")
+            start = time.perf_counter()
+            generate(source, args.contacts, args.tasks, args.seed)
+            print(f"generated {args.contacts:,} contacts and {args.tasks:,} tasks "
+                  f"in {time.perf_counter() - start:.1f}s")
+        for mode in args.modes:
+            path = os.path.join(tmp, f"{mode.replace(' ', '_')}.db")
+            shutil.copy(source, path)
+            with sqlite3.connect(path) as conn:
+                contacts = conn.execute("SELECT MAX(ID) FROM CONTACTS").fetchone()[0]
+                tasks = conn.execute("SELECT MAX(ID) FROM TASKS").fetchone()[0]
+            results[mode] = run_mode(mode, path, contacts, tasks, args)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "meta": {
+                    "contacts": contacts,
+                    "tasks": tasks,
+                    "seconds": args.seconds,
+                    "readers": args.readers,
+                    "staleness": args.staleness,
+                    "write_interval": args.write_interval,
+                    "db": args.db,
+                    "sqlite": sqlite3.sqlite_version,
+                    "python": platform.python_version(),
+                    "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                },
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
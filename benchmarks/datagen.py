@@ -0,0 +1,130 @@
+"""Reproducible synthetic CONTACTS/TASKS data at any scale.
+
+Creates a database with the schema of test.db (plus all migrations) and
+fills it with contacts and tasks that satisfy every constraint: unique
+10-digit phones and emails, statuses and priorities from the CHECK lists,
+deadlines around a fixed date, assignees and support contacts that exist,
+and acyclic dependencies on earlier tasks by title. The same seed always
+produces the same rows.
+
+Usage (from the repository root):
+    python benchmarks/datagen.py out.db [--contacts 10000] [--tasks 100000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bulk_import import import_records  # noqa: E402
+from db import ConnectionPool  # noqa: E402
+from migrations import apply_migrations  # noqa: E402
+from sql_templates import PRIORITIES, STATUSES  # noqa: E402
+
+FIRST_NAMES = ["Aarav", "Vivek", "Ansh", "Akshit", "Ishani", "Vaibhav", "Mohit", "Priya", "Neha",
+               "Rohan", "Sara", "John", "Maria", "Chen", "Fatima", "Lucas", "Emma", "Omar",
+               "Yuki", "Elena", "Ravi", "Kavya", "Arjun", "Meera", "Daniel", "Aisha"]
+LAST_NAMES = ["Choudhary", "Sharma", "Gupta", "Doe", "Singh", "Patel", "Khan", "Iyer", "Mehta",
+              "Smith", "Garcia", "Wang", "Kumar", "Das", "Reddy", "Nair", "Brown", "Rossi"]
+CITIES = ["Delhi", "Mumbai", "Jaipur", "Pune", "Bengaluru", "Chennai", "Hyderabad", "Kolkata",
+          "New York", "London", "Berlin", "Toronto", "Dubai", "Singapore"]
+STREETS = ["Main St", "Park Road", "MG Road", "Lake View", "Station Road", "Oak Ave", "Ring Road"]
+VERBS = ["Plan", "Set up", "Design", "Review", "Test", "Deploy", "Document", "Migrate", "Audit",
+         "Refactor", "Prepare", "Launch", "Optimize", "Train", "Research"]
+OBJECTS = ["database", "UI", "API", "website", "mobile app", "budget", "marketing campaign",
+           "release", "onboarding", "dashboard", "backup strategy", "vendor contract",
+           "quarterly report", "test suite", "server cluster"]
+CATEGORIES = ["Work", "Personal", "Project", "Other"]
+ESTIMATES = ["2 hours", "4 hours", "1 day", "2 days", "3 days", "5 days", "1 week", "2 weeks"]
+# Weighted like a live task list: most work is not started or in progress
+STATUS_WEIGHTS = [35, 30, 10, 20, 5]
+PRIORITY_WEIGHTS = [30, 50, 20]
+# Deadlines are spread around this date so runs do not depend on the clock
+BASE_DATE = datetime(2025, 3, 1)
+
+
+def schema_sql():
+    """CREATE TABLE statements for CONTACTS and TASKS, taken from test.db."""
+    conn = sqlite3.connect(os.path.join(ROOT, "test.db"))
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name IN ('CONTACTS', 'TASKS') "
+            "ORDER BY name")]
+    finally:
+        conn.close()
+
+
+def contact_records(count, rng):
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield i + 1, {
+            "NAME": f"{first} {last}",
+            "PHONE": 6000000000 + i,
+            "EMAIL": f"{first}.{last}.{i}@example.com".lower(),
+            "ADDRESS": f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+        }
+
+
+def task_records(count, contacts, rng):
+    titles = []
+    for i in range(count):
+        title = f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} #{i + 1}"
+        # Depend on up to two recent tasks; earlier titles only, so no cycles
+        dependencies = rng.sample(titles[-50:], k=min(len(titles), rng.choice([0, 0, 1, 1, 2])))
+        titles.append(title)
+        deadline = BASE_DATE + timedelta(days=rng.randint(-60, 180), hours=rng.randint(9, 18))
+        yield i + 1, {
+            "TITLE": title,
+            "DESCRIPTION": f"{title.split(' #')[0]} for the {rng.choice(CITIES)} team",
+            "CATEGORY": rng.choice(CATEGORIES),
+            "PRIORITY": rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+            "EXPECTED_OUTCOME": f"{rng.choice(OBJECTS).capitalize()} ready",
+            "DEADLINE": deadline.strftime("%Y-%m-%d %H:%M"),
+            "ASSIGNED_TO": rng.randint(1, contacts),
+            "DEPENDENCIES": ", ".join(dependencies) or None,
+            "ESTIMATED_TIME": rng.choice(ESTIMATES),
+            "SUPPORT_CONTACT": rng.randint(1, contacts) if rng.random() < 0.5 else None,
+            "STATUS": rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+        }
+
+
+def generate(path, contacts=10_000, tasks=100_000, seed=0) -> dict:
+    """Create `path` with `contacts` contacts and `tasks` tasks; returns the import reports."""
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    for statement in schema_sql():
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+    apply_migrations(path)
+
+    pool = ConnectionPool(path)
+    try:
+        return {
+            "contacts": import_records(contact_records(contacts, rng), "contacts", pool=pool),
+            "tasks": import_records(task_records(tasks, contacts, rng), "tasks", pool=pool),
+        }
+    finally:
+        pool.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--contacts", type=int, default=10_000)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    reports = generate(args.path, args.contacts, args.tasks, args.seed)
+    for table, report in reports.items():
+        print(f"{table}: {report['written']} rows in {report['seconds']:.2f}s, {report['rejected']} rejected")
+
+
+if __name__ == "__main__":
+    main()
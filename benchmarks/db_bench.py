@@ -0,0 +1,301 @@
+"""p50/p95/p99 latency and throughput of every database touchpoint in main.py.
+
+Builds a database with datagen.py (or benchmarks a copy of --db, so the
+original is never written to), then times each touchpoint the app hits on
+a rerun or a chat turn: the contact directory and New Task picker, template
+and dependency matching, the SQL cache and plan advisor, opening and paging
+view results, the UPDATE/INSERT paths and the chat archive. The LLM is a
+FakeLLM that maps each prompt to a fixed SQL statement, so a chat turn
+exercises the gateway and the database without a network and every run
+issues the same queries.
+
+Usage (from the repository root):
+    python benchmarks/db_bench.py [--contacts 10000] [--tasks 100000] [--seed 0]
+                                  [--iterations 200] [--db path] [--json out.json]
+                                  [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from contacts import ContactDirectory  # noqa: E402
+from dashboard import match_dashboard_question  # noqa: E402
+from datagen import BASE_DATE, CITIES, OBJECTS, generate  # noqa: E402
+from db import ConnectionPool  # noqa: E402
+from dependencies import DependencyGraph, match_dependency_question  # noqa: E402
+from history import ChatHistory  # noqa: E402
+from llm_gateway import FakeLLM, LLMGateway  # noqa: E402
+from plan_advisor import QueryPlanAdvisor  # noqa: E402
+from resources import chat_messages  # noqa: E402
+from sql_cache import SQLCache  # noqa: E402
+from sql_templates import STATUSES, fts_phrase, match_template  # noqa: E402
+
+RESULT_PAGE_SIZE = 20
+CONTACT_PAGE_SIZE = 50
+WARMUP = 10
+
+# View statements in the shapes the templates and the view prompt produce
+VIEWS = [
+    ("SELECT * FROM TASKS WHERE STATUS = ? ORDER BY DEADLINE", lambda t: (t.rng.choice(STATUSES),)),
+    ("SELECT T.*, C.NAME AS ASSIGNEE FROM TASKS T JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID "
+     "WHERE T.ASSIGNED_TO = ? AND T.STATUS = ?",
+     lambda t: (t.rng.randint(1, t.contacts), t.rng.choice(STATUSES))),
+    ("SELECT C.* FROM CONTACTS_FTS JOIN CONTACTS C ON C.ID = CONTACTS_FTS.rowid WHERE CONTACTS_FTS MATCH ?",
+     lambda t: (fts_phrase(t.rng.choice(CITIES), "ADDRESS"),)),
+    ("SELECT T.* FROM TASKS_FTS JOIN TASKS T ON T.ID = TASKS_FTS.rowid WHERE TASKS_FTS MATCH ?",
+     lambda t: (fts_phrase(t.rng.choice(OBJECTS)),)),
+    ("SELECT * FROM TASKS WHERE DEADLINE < ? AND STATUS != 'Completed' ORDER BY DEADLINE",
+     lambda t: ("2025-03-01",)),
+]
+
+# Prompts the stub answers; anything else gets the first view
+STUB_SQL = {
+    "show overdue tasks": "SELECT * FROM TASKS WHERE DEADLINE < '2025-03-01' AND STATUS != 'Completed' "
+                          "ORDER BY DEADLINE",
+    "how many tasks does each contact have": "SELECT C.NAME, COUNT(T.ID) AS TASKS FROM CONTACTS C "
+                                             "LEFT JOIN TASKS T ON T.ASSIGNED_TO = C.ID GROUP BY C.ID",
+    "high priority tasks in progress": "SELECT * FROM TASKS WHERE PRIORITY = 'High' AND STATUS = 'In Progress'",
+}
+
+
+def stub_reply(messages):
+    return STUB_SQL.get(messages[-1].content, next(iter(STUB_SQL.values())))
+
+
+# The same statements main.py runs, without the Streamlit error reporting
+
+def open_result(pool, sql_query, params):
+    with pool.connection() as conn:
+        cur = conn.execute(f"SELECT * FROM (\n{sql_query}\n) LIMIT 0", params)
+        columns = [desc[0] for desc in cur.description]
+        total = conn.execute(f"SELECT COUNT(*) FROM (\n{sql_query}\n)", params).fetchone()[0]
+    return {"sql": sql_query, "params": list(params), "columns": columns, "total": total, "page": 0}
+
+
+def fetch_page(pool, handle, page_size=RESULT_PAGE_SIZE):
+    with pool.connection() as conn:
+        rows = conn.execute(f"SELECT * FROM (\n{handle['sql']}\n) LIMIT ? OFFSET ?",
+                            [*handle["params"], page_size + 1, handle["page"] * page_size]
+                            ).fetchmany(page_size + 1)
+    return rows[:page_size], len(rows) > page_size
+
+
+def execute_write(pool, sql_query, params):
+    with pool.connection() as conn:
+        cur = conn.execute(sql_query, params)
+        conn.commit()
+        return cur.rowcount
+
+
+class Touchpoints:
+    """One callable per touchpoint; each call is a single timed operation."""
+
+    def __init__(self, path, tmp, contacts, tasks, seed):
+        self.rng = random.Random(seed)
+        self.contacts = contacts
+        self.tasks = tasks
+        self.pool = ConnectionPool(path)
+        self.directory = ContactDirectory(self.pool)
+        self.graph = DependencyGraph(self.pool)
+        self.advisor = QueryPlanAdvisor(self.pool)
+        self.cache = SQLCache(os.path.join(tmp, "cache.db"), path)
+        self.history = ChatHistory(path=os.path.join(tmp, "history.db"))
+        self.gateway = LLMGateway(FakeLLM(stub_reply))
+        self.handles = [open_result(self.pool, sql, make(self)) for sql, make in VIEWS]
+        self.next_phone = 9000000000
+        for prompt, sql in STUB_SQL.items():
+            self.cache.put(prompt, "view", sql)
+
+    def close(self):
+        self.gateway.close()
+        self.pool.close_all()
+
+    def contact_directory_load(self):
+        self.directory.invalidate()
+        self.directory.contacts
+
+    def contact_picker_search(self):
+        term = self.rng.choice(["", "an", "sharma", "priya", "x"])
+        self.directory.search(term, self.rng.randint(0, 3), CONTACT_PAGE_SIZE)
+
+    def template_match(self):
+        prompt = self.rng.choice([
+            f"show {self.rng.choice(STATUSES).lower()} tasks",
+            f"show contacts from {self.rng.choice(CITIES)}",
+            f"find tasks mentioning {self.rng.choice(OBJECTS)}",
+            f"mark task {self.rng.randint(1, self.tasks)} as completed",
+            "what is the weather like",
+        ])
+        match_template(prompt, self.directory.index)
+
+    def dependency_question(self):
+        task = self.rng.randint(1, self.tasks)
+        prompt = self.rng.choice(["what is blocked by task {}", "what blocks task {}", "critical path to task {}"])
+        match_dependency_question(prompt.format(task), self.graph)
+
+    def dashboard_question(self):
+        prompt = self.rng.choice([
+            "how many high priority tasks are in progress per person",
+            "overdue tasks by category",
+            "how many open tasks by deadline",
+            "how many tasks are due this week",
+        ])
+        _, sql, params = match_dashboard_question(prompt, BASE_DATE.date())
+        open_result(self.pool, sql, params)
+
+    def sql_cache_lookup(self):
+        self.cache.get(self.rng.choice([*STUB_SQL, "list every contact in berlin"]))
+
+    def plan_advisor_check(self):
+        sql, make = self.rng.choice(VIEWS)
+        self.advisor.check(sql, make(self))
+
+    def view_open_result(self):
+        sql, make = self.rng.choice(VIEWS)
+        open_result(self.pool, sql, make(self))
+
+    def view_fetch_page(self):
+        handle = self.rng.choice(self.handles)
+        handle["page"] = self.rng.randint(0, max(min(handle["total"] // RESULT_PAGE_SIZE, 50), 0))
+        fetch_page(self.pool, handle)
+
+    def chat_turn_stub_llm(self):
+        prompt = self.rng.choice(list(STUB_SQL))
+        sql = self.gateway.invoke(chat_messages("", prompt)).content
+        fetch_page(self.pool, open_result(self.pool, sql, ()))
+
+    def update_task_status(self):
+        execute_write(self.pool, "UPDATE TASKS SET STATUS = ? WHERE ID = ?",
+                      (self.rng.choice(STATUSES), self.rng.randint(1, self.tasks)))
+
+    def insert_contact(self):
+        self.next_phone += 1
+        execute_write(self.pool, "INSERT INTO CONTACTS (NAME, PHONE, EMAIL, ADDRESS) VALUES (?, ?, ?, ?)",
+                      ("Bench Contact", self.next_phone, f"bench{self.next_phone}@example.com",
+                       f"1 Main St, {self.rng.choice(CITIES)}"))
+        self.directory.invalidate()
+
+    def insert_task(self):
+        execute_write(self.pool, """INSERT INTO TASKS (
+            TITLE, DESCRIPTION, CATEGORY, PRIORITY, EXPECTED_OUTCOME,
+            DEADLINE, ASSIGNED_TO, DEPENDENCIES, REQUIRED_RESOURCES,
+            ESTIMATED_TIME, INSTRUCTIONS, REVIEW_PROCESS, PERFORMANCE_METRICS,
+            SUPPORT_CONTACT, NOTES, STATUS
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", (
+            f"Bench task {self.rng.random()}", "Benchmark task", "Work", "Medium", "Done",
+            "2025-04-01 18:00:00", self.rng.randint(1, self.contacts),
+            f"Plan database #{self.rng.randint(1, self.tasks)}", "", "1 day", "", "", "",
+            None, "", "Not Started"))
+
+    def history_append(self):
+        self.history.append({"role": "user", "content": "show overdue tasks"})
+
+    def all(self):
+        return [(name.replace("_", " "), getattr(self, name)) for name in [
+            "contact_directory_load", "contact_picker_search", "template_match", "dependency_question",
+            "dashboard_question", "sql_cache_lookup", "plan_advisor_check", "view_open_result", "view_fetch_page",
+            "chat_turn_stub_llm", "update_task_status", "insert_contact", "insert_task", "history_append",
+        ]]
+
+
+def measure(operation, iterations):
+    for _ in range(WARMUP):
+        operation()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - start)
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "n": iterations,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "ops_per_sec": iterations / sum(samples),
+    }
+
+
+def run(path, tmp, contacts, tasks, seed, iterations):
+    touchpoints = Touchpoints(path, tmp, contacts, tasks, seed)
+    try:
+        return {name: measure(operation, iterations) for name, operation in touchpoints.all()}
+    finally:
+        touchpoints.close()
+
+
+def print_results(results, baseline=None):
+    header = f"{'touchpoint':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>11}"
+    print(header + ("   p50 vs baseline" if baseline else ""))
+    for name, result in results.items():
+        line = (f"{name:<26}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+                f"{result['p99_ms']:>10.3f}{result['ops_per_sec']:>11.0f}")
+        if baseline and name in baseline:
+            before = baseline[name]["p50_ms"]
+            line += f"   {(result['p50_ms'] - before) / before * 100:+7.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contacts", type=int, default=10_000)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--db", help="existing database to benchmark a copy of instead of generating one")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        if args.db:
+            shutil.copy(args.db, path)
+            with sqlite3.connect(path) as conn:
+                contacts = conn.execute("SELECT MAX(ID) FROM CONTACTS").fetchone()[0]
+                tasks = conn.execute("SELECT MAX(ID) FROM TASKS").fetchone()[0]
+        else:
+            start = time.perf_counter()
+            generate(path, args.contacts, args.tasks, args.seed)
+            contacts, tasks = args.contacts, args.tasks
+            print(f"generated {contacts:,} contacts and {tasks:,} tasks in {time.perf_counter() - start:.1f}s")
+        results = run(path, tmp, contacts, tasks, args.seed, args.iterations)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "meta": {
+                    "contacts": contacts,
+                    "tasks": tasks,
+                    "seed": args.seed,
+                    "iterations": args.iterations,
+                    "db": args.db,
+                    "sqlite": sqlite3.sqlite_version,
+                    "python": platform.python_version(),
+                    "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                },
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
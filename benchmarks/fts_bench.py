@@ -0,0 +1,144 @@
+"""LIKE '%...%' scans vs. FTS5 MATCH lookups on the free-text columns.
+
+Builds a throwaway database per size with the CONTACTS/TASKS schema from
+test.db, fills both tables with synthetic rows, applies the migrations
+(indexes and the FTS5 tables) and times the keyword filters the chat path
+used to generate against their MATCH equivalents.
+
+Usage (from the repository root):
+    python benchmarks/fts_bench.py [--sizes 10000 100000 1000000] [--repeat 20]
+
+Each size is the row count of both CONTACTS and TASKS. Building the
+1,000,000-row database takes a minute or two and about 1 GB of disk.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from migrations import apply_migrations  # noqa: E402
+
+CITIES = ["Delhi", "Mumbai", "Jaipur", "Pune", "Chennai", "Kolkata", "Bengaluru", "Hyderabad",
+          "Lucknow", "Indore", "New York", "London", "Berlin", "Toronto", "Sydney", "Dubai"]
+WORDS = ["project", "setup", "review", "database", "schema", "report", "client", "meeting",
+         "design", "deploy", "server", "budget", "invoice", "testing", "release", "backup",
+         "website", "content", "marketing", "hiring", "training", "audit", "migration", "api",
+         "mobile", "dashboard", "metrics", "support", "ticket", "research", "vendor", "contract"]
+# Appears in about one task in a thousand
+RARE_WORD = "kubernetes"
+
+QUERIES = [
+    ("contacts in a city (page of 20)",
+     "SELECT * FROM CONTACTS WHERE LOWER(ADDRESS) LIKE ? LIMIT 20", ("%delhi%",),
+     "SELECT C.* FROM CONTACTS_FTS JOIN CONTACTS C ON C.ID = CONTACTS_FTS.rowid WHERE CONTACTS_FTS MATCH ? LIMIT 20",
+     ('ADDRESS: "delhi"*',)),
+    ("contacts in a city (count)",
+     "SELECT COUNT(*) FROM CONTACTS WHERE LOWER(ADDRESS) LIKE ?", ("%delhi%",),
+     "SELECT COUNT(*) FROM CONTACTS_FTS WHERE CONTACTS_FTS MATCH ?", ('ADDRESS: "delhi"*',)),
+    ("tasks mentioning a common word (page of 20)",
+     "SELECT * FROM TASKS WHERE LOWER(TITLE) LIKE ? OR LOWER(DESCRIPTION) LIKE ? "
+     "OR LOWER(NOTES) LIKE ? OR LOWER(INSTRUCTIONS) LIKE ? LIMIT 20", ("%database%",) * 4,
+     "SELECT T.* FROM TASKS_FTS JOIN TASKS T ON T.ID = TASKS_FTS.rowid WHERE TASKS_FTS MATCH ? LIMIT 20",
+     ('"database"*',)),
+    ("tasks mentioning a common word (count)",
+     "SELECT COUNT(*) FROM TASKS WHERE LOWER(TITLE) LIKE ? OR LOWER(DESCRIPTION) LIKE ? "
+     "OR LOWER(NOTES) LIKE ? OR LOWER(INSTRUCTIONS) LIKE ?", ("%database%",) * 4,
+     "SELECT COUNT(*) FROM TASKS_FTS WHERE TASKS_FTS MATCH ?", ('"database"*',)),
+    ("tasks mentioning a rare word (all rows)",
+     "SELECT * FROM TASKS WHERE LOWER(TITLE) LIKE ? OR LOWER(DESCRIPTION) LIKE ? "
+     "OR LOWER(NOTES) LIKE ? OR LOWER(INSTRUCTIONS) LIKE ?", (f"%{RARE_WORD}%",) * 4,
+     "SELECT T.* FROM TASKS_FTS JOIN TASKS T ON T.ID = TASKS_FTS.rowid WHERE TASKS_FTS MATCH ?",
+     (f'"{RARE_WORD}"*',)),
+]
+
+
+def schema_sql():
+    """CREATE TABLE statements for CONTACTS and TASKS, taken from test.db."""
+    conn = sqlite3.connect(os.path.join(ROOT, "test.db"))
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name IN ('CONTACTS', 'TASKS') "
+            "ORDER BY name")]
+    finally:
+        conn.close()
+
+
+def sentence(rng, length):
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def build(path, size, seed=0):
+    """Create and fill a database with `size` contacts and `size` tasks."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    for statement in schema_sql():
+        conn.execute(statement)
+    conn.executemany(
+        "INSERT INTO CONTACTS (ID, NAME, PHONE, EMAIL, ADDRESS) VALUES (?, ?, ?, ?, ?)",
+        ((i, f"Contact {i}", 1000000000 + i, f"contact{i}@example.com",
+          f"{rng.randint(1, 999)}, {sentence(rng, 2).title()} Road, {rng.choice(CITIES)}")
+         for i in range(1, size + 1)))
+    conn.executemany(
+        "INSERT INTO TASKS (TITLE, DESCRIPTION, PRIORITY, DEADLINE, ASSIGNED_TO, INSTRUCTIONS, NOTES, STATUS) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ((sentence(rng, 3).capitalize(),
+          sentence(rng, 10) + (f" {RARE_WORD}" if rng.random() < 0.001 else ""),
+          rng.choice(["Low", "Medium", "High"]),
+          f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 18:00",
+          rng.randint(1, size), sentence(rng, 8), sentence(rng, 5),
+          rng.choice(["Not Started", "In Progress", "On Hold", "Completed"]))
+         for _ in range(size)))
+    conn.commit()
+    conn.close()
+    apply_migrations(path)
+
+
+def timings(conn, sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench(size, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        start = time.perf_counter()
+        build(path, size)
+        print(f"\n{size:,} rows per table (built in {time.perf_counter() - start:.1f}s)")
+        conn = sqlite3.connect(path)
+        try:
+            for label, like_sql, like_params, fts_sql, fts_params in QUERIES:
+                like = timings(conn, like_sql, like_params, repeat)
+                fts = timings(conn, fts_sql, fts_params, repeat)
+                print(f"  {label:<45} LIKE {statistics.median(like) * 1000:9.2f} ms   "
+                      f"FTS {statistics.median(fts) * 1000:9.2f} ms   "
+                      f"{statistics.median(like) / statistics.median(fts):7.1f}x")
+        finally:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print("median of", args.repeat, "runs")
+    for size in args.sizes:
+        bench(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Startup and rerun cost of the Streamlit app's LLM/agent initialization.
+
+"before" repeats what main.py used to do at import time on every rerun:
+build ChatGroq twice, reflect the schema with SQLDatabase.from_uri and
+build the SQL agent. "after" calls the cached factories in resources.py,
+which only do that work on the first call in a process.
+
+Usage (from the repository root):
+    python benchmarks/startup_bench.py [--reruns 20] [--app]
+
+--app additionally times full runs of main.py through Streamlit's AppTest
+harness (first run vs. reruns). No network access is needed: nothing here
+sends a request to the LLM.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+def legacy_init():
+    """The per-rerun initialization main.py used to run."""
+    from langchain_groq import ChatGroq
+    from langchain_community.agent_toolkits import create_sql_agent
+    from langchain_community.utilities import SQLDatabase
+
+    api_key = os.getenv("GROQ_API_KEY") or "unused"
+    ChatGroq(api_key=api_key, model_name="llama-3.3-70b-versatile")
+    db_agent = SQLDatabase.from_uri("sqlite:///test.db", include_tables=['CONTACTS', 'TASKS'],
+                                    sample_rows_in_table_info=2)
+    llm = ChatGroq(api_key=api_key, model_name="llama-3.3-70b-versatile")
+    create_sql_agent(llm=llm, db=db_agent, verbose=True, top_k=5, max_iterations=10)
+
+
+def cached_init():
+    """The factories main.py now uses."""
+    import resources
+
+    resources.get_llm()
+    resources.get_llm_gateway()
+    resources.get_agent_executor()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def first_run(name):
+    """Time one initialization in a fresh interpreter, imports included."""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--first-run", name],
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def report(label, first, reruns):
+    print(f"{label:<28} first run {first * 1000:8.1f} ms   "
+          f"rerun median {statistics.median(reruns) * 1000:8.2f} ms   "
+          f"rerun max {max(reruns) * 1000:8.2f} ms")
+
+
+def bench_app(reruns):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=120)
+    first = timed(app.run)
+    report("main.py (AppTest)", first, [timed(app.run) for _ in range(reruns)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--app", action="store_true", help="also time full main.py runs")
+    parser.add_argument("--first-run", choices=["legacy", "cached"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    os.environ.setdefault("GROQ_API_KEY", "unused")
+    inits = {"legacy": legacy_init, "cached": cached_init}
+
+    if args.first_run:
+        print(timed(inits[args.first_run]))
+        return
+
+    # First runs happen in a fresh interpreter so both include the imports;
+    # reruns then show the steady-state cost Streamlit pays per interaction.
+    for label, name in [("before: init every rerun", "legacy"), ("after: cached factories", "cached")]:
+        init = inits[name]
+        init()
+        report(label, first_run(name), [timed(init) for _ in range(args.reruns)])
+    if args.app:
+        bench_app(args.reruns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""Bulk loader for CONTACTS and TASKS from CSV or JSONL.
+
+Records are streamed from the file, validated in memory against the
+table constraints (10-digit unique phone, unique email, status/priority
+values, existing assignees) and written with executemany, one
+transaction per batch. Contacts are upserted on PHONE; tasks are upserted
+on ID when the file has an ID column and inserted otherwise.
+
+Usage (from the repository root):
+    python bulk_import.py contacts contacts.csv
+    python bulk_import.py tasks tasks.jsonl [--batch-size 50000] [--db test.db]
+"""
+import argparse
+import csv
+import io
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from db import DB_PATH, get_pool
+from dependencies import load_edges, reaches
+from migrations import apply_migrations, summary_refresh
+from sql_templates import PRIORITIES, STATUSES
+
+BATCH_SIZE = 50_000
+# Rejected records kept in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+CONTACT_COLUMNS = ("NAME", "PHONE", "EMAIL", "ADDRESS")
+TASK_COLUMNS = (
+    "TITLE", "DESCRIPTION", "CATEGORY", "PRIORITY", "EXPECTED_OUTCOME", "DEADLINE",
+    "ASSIGNED_TO", "DEPENDENCIES", "REQUIRED_RESOURCES", "ESTIMATED_TIME", "INSTRUCTIONS",
+    "REVIEW_PROCESS", "PERFORMANCE_METRICS", "SUPPORT_CONTACT", "NOTES", "STATUS",
+)
+
+_PHONE_RE = re.compile(r"[1-9]\d{9}")
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+")
+_DEADLINE_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?")
+
+
+def _upsert(table, key, columns):
+    """INSERT ... ON CONFLICT (key) DO UPDATE that leaves unchanged rows alone.
+
+    Skipping identical rows keeps reruns of the same file from firing the
+    change-counter and full-text triggers.
+    """
+    inserted = (key,) + columns if key not in columns else columns
+    return (
+        f"INSERT INTO {table} ({', '.join(inserted)}) VALUES ({', '.join('?' * len(inserted))}) "
+        f"ON CONFLICT ({key}) DO UPDATE SET "
+        + ", ".join(f"{column} = excluded.{column}" for column in columns if column != key)
+        + " WHERE " + " OR ".join(f"{table}.{column} IS NOT excluded.{column}"
+                                  for column in columns if column != key)
+    )
+
+
+_UPSERT_CONTACT = _upsert("CONTACTS", "PHONE", CONTACT_COLUMNS)
+_INSERT_TASK = (
+    f"INSERT INTO TASKS ({', '.join(TASK_COLUMNS)}) VALUES ({', '.join('?' * len(TASK_COLUMNS))})"
+)
+_UPSERT_TASK = _upsert("TASKS", "ID", TASK_COLUMNS)
+# Statements whose new rows always get an ID above the table's current
+# maximum (AUTOINCREMENT), so their insert triggers can run per batch
+_DEFERRED_TRIGGERS = {_UPSERT_CONTACT: "CONTACTS", _INSERT_TASK: "TASKS"}
+
+
+def read_records(stream, fmt: str):
+    """Yield (line number, record dict with upper-cased keys) from a text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, {(key or "").strip().upper(): value for key, value in record.items()}
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, e
+                    continue
+                yield line_no, ({str(key).upper(): value for key, value in record.items()}
+                                if isinstance(record, dict) else ValueError("not a JSON object"))
+    else:
+        raise ValueError(f"unsupported format: {fmt}")
+
+
+def detect_format(filename: str) -> str:
+    """'csv' or 'jsonl' from a file name."""
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def _text(record, column):
+    value = record.get(column)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+class ContactValidator:
+    """Checks contact records against CONTACTS' constraints without the database.
+
+    Phones and emails already stored, and those seen earlier in the file,
+    are held in memory so UNIQUE violations are caught per record instead of
+    failing a whole batch.
+    """
+
+    def __init__(self, conn):
+        self._email_phone = {email.lower(): phone for phone, email in
+                             conn.execute("SELECT PHONE, EMAIL FROM CONTACTS")}
+        self._phone_email = {phone: email for email, phone in self._email_phone.items()}
+
+    @staticmethod
+    def statement(row) -> str:
+        return _UPSERT_CONTACT
+
+    def __call__(self, record):
+        name, phone, email = _text(record, "NAME"), _text(record, "PHONE"), _text(record, "EMAIL")
+        if not name:
+            return None, "NAME is required"
+        if not phone or not _PHONE_RE.fullmatch(phone):
+            return None, f"PHONE must be 10 digits: {phone!r}"
+        if not email or not _EMAIL_RE.fullmatch(email):
+            return None, f"invalid EMAIL: {email!r}"
+        phone = int(phone)
+        owner = self._email_phone.get(email.lower())
+        if owner is not None and owner != phone:
+            return None, f"EMAIL {email} belongs to another contact"
+        # An upsert that changes a contact's email frees the old one
+        old_email = self._phone_email.get(phone)
+        if old_email and old_email != email.lower():
+            del self._email_phone[old_email]
+        self._email_phone[email.lower()] = phone
+        self._phone_email[phone] = email.lower()
+        return (name, phone, email, _text(record, "ADDRESS")), None
+
+
+class TaskValidator:
+    """Checks task records against TASKS' constraints without the database.
+
+    ASSIGNED_TO and SUPPORT_CONTACT may be a contact ID or a contact's phone
+    number; both are resolved from an in-memory copy of CONTACTS.
+    DEPENDENCIES titles are resolved the way the TASKS sync triggers do it
+    (a title names its lowest task ID) against the dependency graph plus
+    the rows accepted so far, and a row whose dependencies would close a
+    cycle is rejected instead of aborting its batch. Rows without an ID
+    stand in as negative nodes until the database numbers them; nothing
+    can depend on such a row yet, so only rows that may already have
+    dependents are walked. The graph and titles are loaded at the first
+    row that lists dependencies, so files without any skip that work.
+    """
+
+    def __init__(self, conn):
+        self._contact_ids = set()
+        self._phone_ids = {}
+        for contact_id, phone in conn.execute("SELECT ID, PHONE FROM CONTACTS"):
+            self._contact_ids.add(contact_id)
+            self._phone_ids[str(phone)] = contact_id
+        self._conn = conn
+        self._graph = None  # (depends_on, nodes with dependents, title -> lowest ID)
+        self._seen = []     # (node, title) of rows accepted before the graph was loaded
+        self._new_rows = 0
+
+    @staticmethod
+    def statement(row) -> str:
+        # Rows with an explicit ID are upserted, the rest get a new ID
+        return _UPSERT_TASK if len(row) > len(TASK_COLUMNS) else _INSERT_TASK
+
+    def _contact(self, value):
+        if value is None:
+            return None
+        if value in self._phone_ids:
+            return self._phone_ids[value]
+        if value.isdigit() and int(value) in self._contact_ids:
+            return int(value)
+        raise ValueError(value)
+
+    def _load_graph(self):
+        depends_on, dependents = load_edges(self._conn)
+        title_ids = {title: task_id for task_id, title in self._conn.execute(
+            "SELECT ID, LOWER(TITLE) FROM TASKS WHERE TITLE IS NOT NULL ORDER BY ID DESC")}
+        # The set of nodes with dependents is a superset, never shrunk
+        self._graph = (depends_on, set(dependents), title_ids)
+        for node, title in self._seen:
+            self._record(node, title, set())
+        self._seen = None
+
+    def _record(self, node, title, prerequisites):
+        depends_on, required, title_ids = self._graph
+        depends_on[node] = prerequisites
+        required.update(prerequisites)
+        current = title_ids.get(title)
+        # Existing IDs sort before the ones new rows will get
+        if current is None or (node > 0 and (current < 0 or node < current)):
+            title_ids[title] = node
+
+    def __call__(self, record):
+        values = {column: _text(record, column) for column in TASK_COLUMNS}
+        if not values["TITLE"]:
+            return None, "TITLE is required"
+        if not values["DEADLINE"] or not _DEADLINE_RE.fullmatch(values["DEADLINE"]):
+            return None, f"DEADLINE must be YYYY-MM-DD [HH:MM]: {values['DEADLINE']!r}"
+        values["DEADLINE"] = values["DEADLINE"].replace("T", " ")
+        values["STATUS"] = values["STATUS"] or "Not Started"
+        if values["STATUS"] not in STATUSES:
+            return None, f"STATUS must be one of {', '.join(STATUSES)}: {values['STATUS']!r}"
+        if values["PRIORITY"] is not None and values["PRIORITY"] not in PRIORITIES:
+            return None, f"PRIORITY must be one of {', '.join(PRIORITIES)}: {values['PRIORITY']!r}"
+        for column in ("ASSIGNED_TO", "SUPPORT_CONTACT"):
+            try:
+                values[column] = self._contact(values[column])
+            except ValueError:
+                return None, f"{column} is not a known contact ID or phone: {values[column]!r}"
+        if values["ASSIGNED_TO"] is None:
+            return None, "ASSIGNED_TO is required"
+        task_id = _text(record, "ID")
+        if task_id is not None and not task_id.isdigit():
+            return None, f"ID must be an integer: {task_id!r}"
+
+        node = int(task_id) if task_id is not None else -(self._new_rows + 1)
+        if values["DEPENDENCIES"] is None and self._graph is None:
+            self._seen.append((node, values["TITLE"].lower()))
+        else:
+            if self._graph is None:
+                self._load_graph()
+            depends_on, required, title_ids = self._graph
+            prerequisites = {}
+            for title in (values["DEPENDENCIES"] or "").split(","):
+                prerequisite = title_ids.get(title.strip().lower())
+                if prerequisite is not None and prerequisite != node:
+                    prerequisites[title.strip()] = prerequisite
+            if node in required:
+                for title, prerequisite in prerequisites.items():
+                    if reaches(depends_on, prerequisite, node):
+                        return None, f"DEPENDENCIES would create a dependency cycle through {title!r}"
+            self._record(node, values["TITLE"].lower(), set(prerequisites.values()))
+        if task_id is None:
+            self._new_rows += 1
+
+        row = tuple(values[column] for column in TASK_COLUMNS)
+        return row if task_id is None else (int(task_id),) + row, None
+
+
+VALIDATORS = {"contacts": ContactValidator, "tasks": TaskValidator}
+
+
+@contextmanager
+def _deferred_insert_triggers(conn, table):
+    """Do the per-row work of {table}'s insert triggers once per batch.
+
+    The full-text, change-counter, contact-counter and task summary insert
+    triggers are dropped for the batch; afterwards the new rows are indexed
+    and counted into the summaries with one INSERT ... SELECT each, the
+    counters are bumped and the triggers are recreated,
+    all in the same transaction, so a failed batch rolls back to the
+    triggers being in place. Updates still go through their own triggers.
+    """
+    names = (f"{table}_FTS_INSERT", f"{table}_CHANGE_INSERT", f"{table}_SUMMARY_INSERT",
+             f"{table}_COUNTER_INSERT")
+    triggers = dict(conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN (?, ?, ?, ?)", names))
+    last_id = conn.execute(f"SELECT IFNULL(MAX(ID), 0) FROM {table}").fetchone()[0]
+    for name in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    yield
+    if f"{table}_FTS_INSERT" in triggers:
+        columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA table_info({table}_FTS)"))
+        conn.execute(f"INSERT INTO {table}_FTS (rowid, {columns}) "
+                     f"SELECT ID, {columns} FROM {table} WHERE ID > ?", (last_id,))
+    if f"{table}_CHANGE_INSERT" in triggers:
+        conn.execute(f"UPDATE DB_META SET VALUE = VALUE + (SELECT COUNT(*) FROM {table} WHERE ID > ?) "
+                     "WHERE KEY = 'change_counter'", (last_id,))
+    if f"{table}_COUNTER_INSERT" in triggers:
+        conn.execute("UPDATE DB_META SET VALUE = VALUE + 1 WHERE KEY = 'contact_counter'")
+    if f"{table}_SUMMARY_INSERT" in triggers:
+        for sql in summary_refresh("T.ID > ?"):
+            conn.execute(sql, (last_id,))
+    for sql in triggers.values():
+        conn.execute(sql)
+
+
+def import_records(records, table: str, pool=None, batch_size: int = BATCH_SIZE) -> dict:
+    """Validate and write (line number, record) pairs into table.
+
+    Returns a report dict: rows written, valid rows identical to what is
+    stored, rows rejected, the first MAX_REPORTED_ERRORS rejections as
+    (line, message), seconds and rows/sec (all valid rows). A batch the
+    database refuses anyway is rolled back and its rows counted as
+    rejected; batches committed before it stay.
+    """
+    pool = pool or get_pool()
+    start = time.perf_counter()
+    report = {"table": table, "written": 0, "unchanged": 0, "rejected": 0, "errors": []}
+
+    def reject(line_no, message):
+        report["rejected"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append((line_no, message))
+
+    with pool.connection() as conn:
+        validate = VALIDATORS[table](conn)
+        batches = {}   # statement -> rows
+        span = [None, None]  # first and last line number in the batches
+
+        def flush():
+            if not batches:
+                return
+            counts = []
+            try:
+                # Explicit, or the trigger DDL would commit on its own
+                conn.execute("BEGIN")
+                for sql, rows in batches.items():
+                    if sql in _DEFERRED_TRIGGERS:
+                        with _deferred_insert_triggers(conn, _DEFERRED_TRIGGERS[sql]):
+                            written = conn.executemany(sql, rows).rowcount
+                    else:
+                        written = conn.executemany(sql, rows).rowcount
+                    counts.append((written, len(rows)))
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                rows = sum(len(rows) for rows in batches.values())
+                report["rejected"] += rows
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append(
+                        (span[0], f"batch of {rows} rows (lines {span[0]}-{span[1]}) rolled back: {e}"))
+            else:
+                for written, total in counts:
+                    report["written"] += written
+                    report["unchanged"] += total - written
+            batches.clear()
+            span[:] = [None, None]
+
+        pending = 0
+        for line_no, record in records:
+            if isinstance(record, Exception):
+                reject(line_no, str(record))
+                continue
+            row, error = validate(record)
+            if error:
+                reject(line_no, error)
+                continue
+            batches.setdefault(validate.statement(row), []).append(row)
+            span[0] = span[0] or line_no
+            span[1] = line_no
+            pending += 1
+            if pending >= batch_size:
+                flush()
+                pending = 0
+        flush()
+
+    report["seconds"] = time.perf_counter() - start
+    processed = report["written"] + report["unchanged"]
+    report["rows_per_sec"] = processed / report["seconds"] if report["seconds"] else 0.0
+    return report
+
+
+def import_file(path: str, table: str, fmt: str = None, pool=None, batch_size: int = BATCH_SIZE) -> dict:
+    """Import a CSV or JSONL file into table ('contacts' or 'tasks')."""
+    with open(path, newline="", encoding="utf-8") as stream:
+        return import_records(read_records(stream, fmt or detect_format(path)), table,
+                              pool=pool, batch_size=batch_size)
+
+
+def import_upload(upload, table: str, pool=None) -> dict:
+    """Import a binary file object with a name, e.g. a Streamlit UploadedFile."""
+    stream = io.TextIOWrapper(upload, encoding="utf-8", newline="")
+    try:
+        return import_records(read_records(stream, detect_format(upload.name)), table, pool=pool)
+    finally:
+        stream.detach()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("table", choices=sorted(VALIDATORS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    apply_migrations(args.db)
+    report = import_file(args.path, args.table, args.format, pool=get_pool(args.db),
+                         batch_size=args.batch_size)
+    print(f"{report['written']} rows written, {report['unchanged']} unchanged, {report['rejected']} rejected "
+          f"in {report['seconds']:.2f}s ({report['rows_per_sec']:,.0f} rows/sec)")
+    for line_no, message in report["errors"]:
+        print(f"  line {line_no}: {message}")
+
+
+if __name__ == "__main__":
+    main()
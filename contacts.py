@@ -0,0 +1,308 @@
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from db import get_pool
+
+# Statements that change what the directory holds
+_CONTACTS_WRITE_RE = re.compile(
+    r"^\s*(INSERT(\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(\s+OR\s+\w+)?|DELETE\s+FROM)\s+CONTACTS\b",
+    re.IGNORECASE)
+
+
+def is_contacts_write(sql_query: str) -> bool:
+    """True when a statement inserts, updates or deletes CONTACTS rows."""
+    return bool(_CONTACTS_WRITE_RE.match(sql_query))
+
+
+# Minimum score for a resolved name, and how far it must lead the runner-up
+RESOLVE_THRESHOLD = 0.6
+RESOLVE_MARGIN = 0.05
+# Minimum score when a word matched only by spelling or sound ("anshul" for
+# "ansh"); weaker matches of that kind are hints, not resolved IDs
+FUZZY_RESOLVE_THRESHOLD = 0.85
+
+# Prompt words never taken for a contact name when scanning free text
+_COMMON_WORDS = {
+    "a", "all", "and", "are", "as", "assign", "assigned", "by", "change", "completed", "contact",
+    "contacts", "create", "deadline", "display", "done", "due", "email", "find", "for", "from",
+    "high", "hold", "how", "in", "is", "list", "low", "many", "mark", "me", "medium", "my", "new",
+    "not", "of", "on", "or", "phone", "priority", "progress", "reassign", "set", "show", "started",
+    "status", "task", "tasks", "the", "their", "this", "to", "update", "what", "which", "who", "with",
+}
+
+_SOUNDEX_CODES = {**dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"),
+                  **dict.fromkeys("dt", "3"), "l": "4", **dict.fromkeys("mn", "5"), "r": "6"}
+
+
+def soundex(word: str) -> str:
+    """American Soundex code of a word ("Robert" -> "R163")."""
+    word = re.sub(r"[^a-z]", "", word.lower())
+    if not word:
+        return ""
+    code, previous = word[0].upper(), _SOUNDEX_CODES.get(word[0], "")
+    for char in word[1:]:
+        digit = _SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code += digit
+        if char not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 once it is certain to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        previous, row[0] = row[0], i
+        for j, char_b in enumerate(b, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (char_a != char_b))
+        if min(row) > limit:
+            return limit + 1
+    return row[-1]
+
+
+def _words(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def _trigrams(token: str) -> set:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Typo-tolerant lookup of contacts by name or email.
+
+    Words of the distinct contact names are indexed four ways: exactly, by
+    prefix (sorted list), by Soundex code and by trigram, the last
+    narrowing candidates for an edit-distance check. Contacts sharing a
+    name are scored once. A name's score for a query is the average of its
+    best match per query word, weighted 4:1 with the share of its own words
+    that were matched, so "John" prefers the contact called just John over
+    "John Doe". Emails and their local parts resolve exactly.
+    """
+
+    def __init__(self, rows):
+        self._names = {}                    # contact -> name
+        self._emails = {}                   # email or its local part -> contact
+        self._name_ids = defaultdict(list)  # normalized name -> contacts
+        self._name_words = {}               # normalized name -> its words
+        self._word_names = defaultdict(set)
+        self._soundex = defaultdict(set)
+        self._trigram_words = defaultdict(set)
+        for row in rows:
+            contact_id, name = row[0], row[1]
+            self._names[contact_id] = name
+            key = " ".join(_words(name))
+            self._name_ids[key].append(contact_id)
+            email = (row[2] if len(row) > 2 else None) or ""
+            for address in {email.lower(), email.lower().split("@")[0]} - {""}:
+                self._emails[address] = None if address in self._emails else contact_id
+        for key in self._name_ids:
+            self._name_words[key] = set(key.split())
+            for word in self._name_words[key]:
+                self._word_names[word].add(key)
+        for word in self._word_names:
+            self._soundex[soundex(word)].add(word)
+            for trigram in _trigrams(word):
+                self._trigram_words[trigram].add(word)
+        self._sorted_words = sorted(self._word_names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def _word_scores(self, word: str) -> dict:
+        """Indexed name words resembling word, with a similarity in (0, 1]."""
+        scores = {}
+        if word in self._word_names:
+            scores[word] = 1.0
+        if len(word) < 3:
+            return scores
+        start = bisect.bisect_left(self._sorted_words, word)
+        for candidate in self._sorted_words[start:start + 50]:
+            if not candidate.startswith(word):
+                break
+            scores.setdefault(candidate, 0.7 + 0.2 * len(word) / len(candidate))
+        for candidate in self._soundex.get(soundex(word), ()):
+            scores[candidate] = max(scores.get(candidate, 0), 0.75)
+        # An edit changes at most three trigrams
+        limit = 1 if len(word) <= 5 else 2
+        trigrams = _trigrams(word)
+        shared = defaultdict(int)
+        for trigram in trigrams:
+            for candidate in self._trigram_words.get(trigram, ()):
+                shared[candidate] += 1
+        for candidate, count in shared.items():
+            if count >= len(trigrams) - 3 * limit:
+                distance = _edit_distance(word, candidate, limit)
+                if distance <= limit:
+                    similarity = 1 - distance / max(len(word), len(candidate))
+                    scores[candidate] = max(scores.get(candidate, 0), similarity)
+        return scores
+
+    def _ranked(self, text: str, limit: int) -> list:
+        """Best matches as (ID, NAME, score, fuzzy, complete), best first.
+
+        fuzzy is set when a query word matched the name only by spelling or
+        sound rather than exactly or as a prefix; complete when every query
+        word matched a word of the name.
+        """
+        text = (text or "").strip().lower()
+        if self._emails.get(text):
+            contact_id = self._emails[text]
+            return [(contact_id, self._names[contact_id], 1.0, False, True)]
+        words = _words(text)
+        if not words:
+            return []
+        best = defaultdict(dict)  # name -> {query word: (score, fuzzy)}
+        for word in words:
+            for candidate, score in self._word_scores(word).items():
+                fuzzy = candidate != word and not candidate.startswith(word)
+                for key in self._word_names[candidate]:
+                    if score > best[key].get(word, (0, False))[0]:
+                        best[key][word] = (score, fuzzy)
+        scored = []
+        for key, matched in best.items():
+            coverage = min(len(matched), len(self._name_words[key])) / len(self._name_words[key])
+            score = 0.8 * sum(score for score, _ in matched.values()) / len(words) + 0.2 * coverage
+            scored.append((round(score, 3), key, any(fuzzy for _, fuzzy in matched.values()),
+                           len(matched) == len(words)))
+        ranked = []
+        for score, key, fuzzy, complete in sorted(scored, key=lambda item: (-item[0], item[1])):
+            ranked += [(contact_id, self._names[contact_id], score, fuzzy, complete)
+                       for contact_id in self._name_ids[key]]
+            if len(ranked) >= limit:
+                break
+        return ranked[:limit]
+
+    def resolve(self, text: str, limit: int = 5) -> list:
+        """Best matching contacts for text as (ID, NAME, score), best first."""
+        return [match[:3] for match in self._ranked(text, limit)]
+
+    def _match(self, text: str):
+        """The one contact text most likely refers to as (ID, NAME, certain, complete), or None.
+
+        certain is False for a match that relied on a misspelling or sound-alike
+        and scored below FUZZY_RESOLVE_THRESHOLD.
+        """
+        ranked = self._ranked(text, limit=2)
+        if not ranked or ranked[0][2] < RESOLVE_THRESHOLD:
+            return None
+        if len(ranked) > 1 and ranked[0][2] - ranked[1][2] < RESOLVE_MARGIN:
+            return None
+        contact_id, name, score, fuzzy, complete = ranked[0]
+        return contact_id, name, not fuzzy or score >= FUZZY_RESOLVE_THRESHOLD, complete
+
+    def find(self, text: str):
+        """The one contact text clearly refers to as (ID, NAME), or None."""
+        match = self._match(text)
+        return match[:2] if match and match[2] else None
+
+    def mentions(self, prompt: str) -> list:
+        """Contacts named in free text as (text, ID, NAME, certain), longest spans first.
+
+        Runs of up to three words that are not common command words are
+        resolved; a span is kept only when it names one contact clearly and
+        every word in it matched that contact's name. Uncertain ones (see
+        _match) are for the LLM to use only if the prompt clearly means them.
+        """
+        words = [word.strip(".,;:!?'\"") for word in prompt.split()]
+        found, used = [], set()
+        for size in (3, 2, 1):
+            for start in range(len(words) - size + 1):
+                span = set(range(start, start + size))
+                chunk = words[start:start + size]
+                if used & span or any(len(word) < 3 or word.lower() in _COMMON_WORDS for word in chunk):
+                    continue
+                match = self._match(" ".join(chunk))
+                if match and match[3]:
+                    found.append((" ".join(chunk), *match[:3]))
+                    used |= span
+        return found
+
+
+class ContactDirectory:
+    """In-process copy of CONTACTS (ID, NAME), sorted by name.
+
+    Loaded on first use and kept until invalidate() is called after a write
+    to CONTACTS, so Streamlit reruns do not rescan the table. The NameIndex
+    over names and emails is rebuilt with it.
+    """
+
+    def __init__(self, pool=None):
+        self._pool = pool or get_pool()
+        self._lock = threading.Lock()
+        self._contacts = None
+        self._names = {}
+        self._lower_names = []
+        self._index = None
+        self.stats = {"loads": 0, "hits": 0}
+
+    def _load(self):
+        with self._pool.connection() as conn:
+            rows = conn.execute("SELECT ID, NAME, EMAIL FROM CONTACTS ORDER BY NAME").fetchall()
+        contacts = [(contact_id, name) for contact_id, name, _ in rows]
+        self._names = dict(contacts)
+        self._lower_names = [(name or "").lower() for _, name in contacts]
+        self._index = NameIndex(rows)
+        self._contacts = contacts
+        self.stats["loads"] += 1
+
+    def _snapshot(self):
+        with self._lock:
+            if self._contacts is None:
+                self._load()
+            else:
+                self.stats["hits"] += 1
+            return self._contacts, self._names, self._lower_names
+
+    @property
+    def contacts(self):
+        """All (ID, NAME) pairs ordered by name."""
+        return self._snapshot()[0]
+
+    @property
+    def index(self) -> NameIndex:
+        """Fuzzy name/email index over the same contacts."""
+        with self._lock:
+            if self._contacts is None:
+                self._load()
+            return self._index
+
+    def name(self, contact_id):
+        """Name of a contact ID, or None if unknown."""
+        return self._snapshot()[1].get(contact_id)
+
+    def search(self, term: str = "", page: int = 0, page_size: int = 50):
+        """One page of contacts whose name contains term.
+
+        Returns (contacts_on_page, total_matches).
+        """
+        contacts, _, lower_names = self._snapshot()
+        term = term.strip().lower()
+        if term:
+            contacts = [contact for contact, lower in zip(contacts, lower_names) if term in lower]
+        start = max(page, 0) * page_size
+        return contacts[start:start + page_size], len(contacts)
+
+    def invalidate(self):
+        """Drop the cached copy; the next access reloads it."""
+        with self._lock:
+            self._contacts = None
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_directory() -> ContactDirectory:
+    """Process-wide contact directory."""
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            _directory = ContactDirectory()
+        return _directory
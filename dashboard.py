@@ -0,0 +1,149 @@
+import re
+from datetime import date, timedelta
+
+from deadlines import match_deadline_range
+from sql_templates import FILLER, OPEN_STATUSES, STATUS_WORDS
+
+# Deadline bucket of a TASK_DUE_COUNTS row; parameters are today, today and
+# the day a week from today
+DEADLINE_BUCKET = ("CASE WHEN DUE_DAY = '' THEN 'No deadline' WHEN DUE_DAY < ? THEN 'Overdue' "
+                   "WHEN DUE_DAY = ? THEN 'Due today' WHEN DUE_DAY < ? THEN 'Due in 7 days' "
+                   "ELSE 'Later' END")
+
+_DIMENSIONS = {
+    "person": "assignee", "people": "assignee", "assignee": "assignee", "contact": "assignee",
+    "owner": "assignee", "user": "assignee", "member": "assignee", "status": "status",
+    "priority": "priority", "category": "category", "deadline": "deadline", "due date": "deadline",
+}
+_COUNT_RE = re.compile(r"\b(?:how many|counts?|number of|totals?)\b")
+_GROUP_RE = re.compile(
+    r"\b(?:per|by|for each|for every|grouped by|broken down by|across)\s+(?:each\s+)?"
+    rf"({'|'.join(sorted(_DIMENSIONS, key=len, reverse=True))})(?:e?s)?\b")
+_OVERDUE_RE = re.compile(r"\b(?:overdue|late|past due)\b")
+_DUE_RE = re.compile(r"\b(?:due|deadlines?) ")
+_STATUS_RE = "|".join(re.escape(word) for word in sorted(STATUS_WORDS, key=len, reverse=True))
+_QUESTION_WORDS = {"how", "many", "count", "counts", "number", "total", "totals", "task", "tasks",
+                   "there", "do", "does", "we", "have", "with", "in", "show", "list", "give", "get",
+                   "display", "what", "each", "by", "per", "priority", "status"}
+
+
+def _bucket_params(today: date):
+    return (today.isoformat(), today.isoformat(), (today + timedelta(days=7)).isoformat())
+
+
+def status_priority_counts(conn):
+    """(STATUS, PRIORITY, N) for all tasks."""
+    return conn.execute(
+        "SELECT STATUS, NULLIF(PRIORITY, ''), SUM(N) FROM TASK_DUE_COUNTS GROUP BY STATUS, PRIORITY").fetchall()
+
+
+def deadline_buckets(conn, today: date = None):
+    """(BUCKET, CATEGORY, N) for open tasks, buckets in deadline order."""
+    return conn.execute(
+        f"SELECT {DEADLINE_BUCKET} AS BUCKET, NULLIF(CATEGORY, ''), SUM(N) FROM TASK_DUE_COUNTS "
+        f"WHERE STATUS IN ({', '.join('?' * len(OPEN_STATUSES))}) "
+        "GROUP BY BUCKET, CATEGORY ORDER BY MIN(DUE_DAY), CATEGORY",
+        (*_bucket_params(today or date.today()), *OPEN_STATUSES)).fetchall()
+
+
+def workload(conn, limit: int = 20):
+    """(ASSIGNEE, STATUS, N) for the `limit` contacts with the most open tasks."""
+    placeholders = ", ".join("?" * len(OPEN_STATUSES))
+    return conn.execute(f"""
+        WITH BUSIEST AS (
+            SELECT ASSIGNED_TO FROM TASK_COUNTS WHERE STATUS IN ({placeholders})
+            GROUP BY ASSIGNED_TO ORDER BY SUM(N) DESC LIMIT ?
+        )
+        SELECT C.NAME, S.STATUS, SUM(S.N) FROM BUSIEST B
+        JOIN TASK_COUNTS S ON S.ASSIGNED_TO = B.ASSIGNED_TO
+        JOIN CONTACTS C ON C.ID = B.ASSIGNED_TO
+        GROUP BY B.ASSIGNED_TO, S.STATUS""", (*OPEN_STATUSES, limit)).fetchall()
+
+
+def match_dashboard_question(prompt: str, today: date = None):
+    """Answer task-count questions from the summary tables.
+
+    Handles counts filtered by status, priority and deadline ("overdue" or
+    "due" followed by anything deadlines.match_deadline_range reads: "due
+    today", "due next week", "due before friday"), optionally broken down
+    by person, status, priority, category or deadline bucket: "how many
+    high priority tasks are in progress per person", "overdue tasks by
+    category". Returns (action, sql, params) like
+    sql_templates.match_template, or None.
+    """
+    text = re.sub(r"\s+", " ", prompt.strip().rstrip("?.!").strip().lower())
+    if not re.search(r"\btasks?\b", text):
+        return None
+    today = today or date.today()
+    count, group = _COUNT_RE.search(text), _GROUP_RE.search(text)
+    dimension = _DIMENSIONS[group.group(1)] if group else None
+    rest = f" {_GROUP_RE.sub(' ', text)} "
+
+    due = None  # (first day, day after the last), either open-ended
+    overdue = _OVERDUE_RE.search(rest)
+    due_word = _DUE_RE.search(rest)
+    if overdue:
+        due = (None, today)
+        rest = rest[:overdue.start()] + " " + rest[overdue.end():]
+    elif due_word:
+        found = match_deadline_range(rest[due_word.end():], today)
+        if not found:
+            return None
+        due = found[:2]
+        rest = rest[:due_word.start()] + " " + rest[due_word.end() + found[2]:]
+    if not (count or (group and due)):
+        return None
+
+    conditions, params = [], []
+    status = re.search(rf"(?<!\w)(open|active|outstanding|{_STATUS_RE})(?!\w)", rest)
+    if status:
+        rest = rest.replace(status.group(0), " ", 1)
+    if status and status.group(1) in STATUS_WORDS:
+        conditions.append("STATUS = ?")
+        params.append(STATUS_WORDS[status.group(1)])
+    elif status or due or dimension == "deadline":
+        # Deadlines only matter for work that is still open
+        conditions.append(f"STATUS IN ({', '.join('?' * len(OPEN_STATUSES))})")
+        params += OPEN_STATUSES
+
+    priority = re.search(r"(?<!\w)(high|medium|low)(?: priority)?(?!\w)", rest)
+    if priority:
+        conditions.append("PRIORITY = ?")
+        params.append(priority.group(1).capitalize())
+        rest = rest.replace(priority.group(0), " ", 1)
+
+    if set(re.findall(r"\w+", rest)) - FILLER - _QUESTION_WORDS:
+        return None
+
+    # Per-person counts with a deadline filter are not materialized; they
+    # come from TASKS through the (STATUS, DEADLINE) index instead
+    if dimension == "assignee" and due:
+        source, day, total = "TASKS", "DEADLINE", "COUNT(*)"
+    elif dimension == "assignee":
+        source, day, total = "TASK_COUNTS", None, "SUM(N)"
+    else:
+        source, day, total = "TASK_DUE_COUNTS", "DUE_DAY", "SUM(N)"
+    if due:
+        start, end = due
+        if day == "DUE_DAY":
+            conditions.append("DUE_DAY != ''")
+        if start:
+            conditions.append(f"{day} >= ?")
+            params.append(start.isoformat())
+        if end:
+            conditions.append(f"{day} < ?")
+            params.append(end.isoformat())
+
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    if dimension is None:
+        return "view", f"SELECT IFNULL({total}, 0) AS TASKS FROM {source}{where}", tuple(params)
+    if dimension == "assignee":
+        return ("view", f"SELECT C.NAME AS ASSIGNEE, {total} AS TASKS FROM {source} S "
+                f"JOIN CONTACTS C ON C.ID = S.ASSIGNED_TO{where} "
+                "GROUP BY S.ASSIGNED_TO ORDER BY TASKS DESC", tuple(params))
+    if dimension == "deadline":
+        return ("view", f"SELECT {DEADLINE_BUCKET} AS DEADLINE, {total} AS TASKS FROM {source}{where} "
+                "GROUP BY 1 ORDER BY MIN(DUE_DAY)", (*_bucket_params(today), *params))
+    column = dimension.upper()
+    return ("view", f"SELECT NULLIF({column}, '') AS {column}, {total} AS TASKS FROM {source}{where} "
+            f"GROUP BY {column} ORDER BY TASKS DESC", tuple(params))
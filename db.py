@@ -0,0 +1,126 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DB_PATH = 'test.db'
+
+# Applied to every pooled connection
+PRAGMAS = {
+    "journal_mode": "WAL",       # readers no longer block the writer
+    "synchronous": "NORMAL",     # safe with WAL, avoids an fsync per commit
+    "cache_size": -20000,        # ~20 MB page cache per connection
+    "mmap_size": 268435456,      # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,        # wait for locks instead of failing at once
+    "foreign_keys": "ON",        # same as the seed script in sql2.py
+}
+# PRAGMAs that change the file and so are skipped on read-only connections
+WRITE_PRAGMAS = {"journal_mode", "synchronous"}
+
+
+class ConnectionPool:
+    """Pool of long-lived SQLite connections.
+
+    Each connection is checked out by one thread at a time and returned to
+    the pool afterwards, so Streamlit sessions (which run every rerun on a new
+    thread) reuse connections instead of reconnecting. Connections that have
+    been idle longer than health_check_interval are pinged before reuse and
+    replaced when the ping fails.
+
+    A read_only pool opens its file with mode=ro&immutable=1, for copies
+    that are replaced rather than written in place (see snapshot.py):
+    reads then take no locks at all.
+    """
+
+    def __init__(self, path=DB_PATH, max_idle=8, cached_statements=256,
+                 health_check_interval=30.0, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self.cached_statements = cached_statements
+        self.health_check_interval = health_check_interval
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0}
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self.read_only:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True,
+                                   check_same_thread=False, cached_statements=self.cached_statements)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False,
+                                   cached_statements=self.cached_statements)
+        for name, value in PRAGMAS.items():
+            if not (self.read_only and name in WRITE_PRAGMAS):
+                conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self.stats["connects"] += 1
+        return conn
+
+    @staticmethod
+    def _healthy(conn) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _acquire(self):
+        try:
+            conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+        if time.monotonic() - last_used > self.health_check_interval and not self._healthy(conn):
+            conn.close()
+            with self._lock:
+                self.stats["reconnects"] += 1
+            return self._connect()
+        with self._lock:
+            self.stats["reuses"] += 1
+        return conn
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait((conn, time.monotonic()))
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the with block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        except sqlite3.Error:
+            # A connection in an unknown state is not worth keeping
+            conn.close()
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._release(conn)
+
+    def close_all(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=DB_PATH) -> ConnectionPool:
+    """Process-wide connection pool for a database file."""
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
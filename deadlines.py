@@ -0,0 +1,272 @@
+import calendar
+import re
+from datetime import date, datetime, time, timedelta
+
+# Time of day given to deadlines stated without one
+DEFAULT_TIME = time(23, 59)
+
+_NUMBERS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+            "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12}
+_NUM = rf"(\d{{1,3}}|{'|'.join(sorted(_NUMBERS, key=len, reverse=True))})"
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+_MONTHS["sept"] = 9
+_MONTH = rf"({'|'.join(sorted(_MONTHS, key=len, reverse=True))})\.?"
+_ORDINAL = r"(\d{1,2})(?:st|nd|rd|th)?"
+_PARTS_OF_DAY = {"morning": time(9), "afternoon": time(15), "evening": time(18), "night": time(20)}
+
+
+def _number(text: str) -> int:
+    return int(text) if text.isdigit() else _NUMBERS[text]
+
+
+def _add_months(day: date, months: int) -> date:
+    year, month = divmod(day.month - 1 + months, 12)
+    year, month = day.year + year, month + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _end_of(unit: str, today: date, ahead: int = 0) -> date:
+    """Last day of the day, working week (Friday), month or year, `ahead` periods on."""
+    if unit == "day":
+        return today + timedelta(days=ahead)
+    if unit == "week":
+        return today + timedelta(days=(4 - today.weekday()) % 7 + 7 * ahead)
+    if unit == "month":
+        last = _add_months(today.replace(day=1), ahead)
+        return last.replace(day=calendar.monthrange(last.year, last.month)[1])
+    return date(today.year + ahead, 12, 31)
+
+
+def _calendar_date(year, month, day, now, future):
+    try:
+        value = date(int(year) if year else now.year, month, int(day))
+        if future and not year and value < now.date():
+            # "March 5" said after March 5 means next year's
+            value = value.replace(year=value.year + 1)
+    except ValueError:
+        return None
+    return value, None
+
+
+def _offset(number, unit, now):
+    count = _number(number)
+    if unit in ("minute", "hour"):
+        moment = now + timedelta(**{f"{unit}s": count})
+        return moment.date(), moment.time().replace(second=0, microsecond=0)
+    today = now.date()
+    if unit == "day":
+        return today + timedelta(days=count), None
+    if unit == "week":
+        return today + timedelta(weeks=count), None
+    return _add_months(today, count * (12 if unit == "year" else 1)), None
+
+
+def _weekday(which, name, now):
+    today, day = now.date(), _WEEKDAYS.index(name)
+    if which == "next":
+        # The named day of next calendar week
+        return today + timedelta(days=7 - today.weekday() + day), None
+    return today + timedelta(days=(day - today.weekday()) % 7), None
+
+
+def _period(which, unit, now):
+    """"next week" is a week from today; "this week" its last (working) day."""
+    today = now.date()
+    if which == "this":
+        return _end_of(unit, today), None
+    if unit == "week":
+        return today + timedelta(weeks=1), None
+    return _add_months(today, 12 if unit == "year" else 1), None
+
+
+# (pattern, handler(match, now, future) -> (date, time or None) or None), tried in order
+_DAY_PATTERNS = [
+    (r"(?:the\s+)?day\s+after\s+tomorrow", lambda m, now, future: (now.date() + timedelta(days=2), None)),
+    (r"today|tonight", lambda m, now, future: (now.date(), time(20) if m.group(0) == "tonight" else None)),
+    (r"tomorrow|tmrw|tmr", lambda m, now, future: (now.date() + timedelta(days=1), None)),
+    (r"yesterday", lambda m, now, future: (now.date() - timedelta(days=1), None)),
+    (r"(\d{4})[-/](\d{1,2})[-/](\d{1,2})",
+     lambda m, now, future: _calendar_date(m.group(1), int(m.group(2)), m.group(3), now, future)),
+    (rf"{_MONTH}\s+{_ORDINAL}(?:,?\s+(\d{{4}}))?",
+     lambda m, now, future: _calendar_date(m.group(3), _MONTHS[m.group(1)], m.group(2), now, future)),
+    (rf"(?:the\s+)?{_ORDINAL}\s+(?:of\s+)?{_MONTH}(?:,?\s+(\d{{4}}))?",
+     lambda m, now, future: _calendar_date(m.group(3), _MONTHS[m.group(2)], m.group(1), now, future)),
+    (rf"in\s+{_NUM}\s+(minute|hour|day|week|month|year)s?",
+     lambda m, now, future: _offset(m.group(1), m.group(2), now)),
+    (rf"{_NUM}\s+(minute|hour|day|week|month|year)s?\s+from\s+(?:now|today)",
+     lambda m, now, future: _offset(m.group(1), m.group(2), now)),
+    (r"(?:the\s+)?end\s+of\s+(?:the\s+)?(next\s+)?(day|week|month|year)",
+     lambda m, now, future: (_end_of(m.group(2), now.date(), 1 if m.group(1) else 0), None)),
+    (r"eo(d|w|m|y)",
+     lambda m, now, future: (_end_of({"d": "day", "w": "week", "m": "month", "y": "year"}[m.group(1)],
+                                     now.date()), None)),
+    (rf"(?:(next|this|coming)\s+)?({'|'.join(_WEEKDAYS)})",
+     lambda m, now, future: _weekday(m.group(1), m.group(2), now)),
+    (r"(next|this)\s+(week|month|year)", lambda m, now, future: _period(m.group(1), m.group(2), now)),
+]
+_DAY_PATTERNS = [(re.compile(rf"(?:{pattern})\b"), handler) for pattern, handler in _DAY_PATTERNS]
+
+_TIME_RE = re.compile(
+    r"(?:at\s+|@\s*)?(?:(\d{1,2})(?::([0-5]\d))?\s*([ap])\.?m\b\.?|([01]?\d|2[0-3]):([0-5]\d)\b"
+    r"|(noon|midday|midnight)\b)")
+_PART_OF_DAY_RE = re.compile(rf"(?:in\s+the\s+|at\s+)?({'|'.join(_PARTS_OF_DAY)})\b")
+# Between a date and its time, or a time and its date
+_JOIN_RE = re.compile(r"\s*,?\s*(?:on\s+|by\s+)?")
+_LEAD_RE = re.compile(r"(?:(?:due|deadline|by|on|before|until|till|for|is|to)\s+)*")
+
+
+def _match_time(text, pos, after_day=False):
+    """(time, end) for a clock time at pos; "morning" and the like only after a day."""
+    m = _TIME_RE.match(text, pos)
+    if m:
+        hour, minute, half, hour24, minute24, word = m.groups()
+        if word:
+            clock = time(12) if word in ("noon", "midday") else DEFAULT_TIME
+        elif hour24:
+            clock = time(int(hour24), int(minute24))
+        elif 1 <= int(hour) <= 12:
+            clock = time(int(hour) % 12 + (12 if half == "p" else 0), int(minute or 0))
+        else:
+            return None
+        return clock, m.end()
+    m = _PART_OF_DAY_RE.match(text, pos) if after_day else None
+    return (_PARTS_OF_DAY[m.group(1)], m.end()) if m else None
+
+
+def _match_date(text, pos, now, future):
+    """(date, time or None, end) for a day, optionally followed by a time, at pos."""
+    for pattern, handler in _DAY_PATTERNS:
+        m = pattern.match(text, pos)
+        if m:
+            value = handler(m, now, future)
+            if value is None:
+                return None
+            day, clock = value
+            end = m.end()
+            if clock is None:
+                joined = _JOIN_RE.match(text, end).end()
+                found = _match_time(text, joined, after_day=True)
+                if found:
+                    clock, end = found
+            return day, clock, end
+    return None
+
+
+def _match_moment(text, pos, now, future=True):
+    """(date, time or None, end) for a date and/or time expression at pos."""
+    found = _match_date(text, pos, now, future)
+    if found:
+        return found
+    found = _match_time(text, pos)
+    if not found:
+        return None
+    clock, end = found
+    day = _match_date(text, _JOIN_RE.match(text, end).end(), now, future)
+    if day:
+        return day[0], clock, day[2]
+    # A bare time is today's, or tomorrow's once it has passed
+    today = now.date()
+    return (today if clock > now.time() or not future else today + timedelta(days=1)), clock, end
+
+
+def parse_deadline(text: str, now: datetime = None):
+    """Deadline named by text as a datetime, or None when it is not a date/time expression.
+
+    Understands relative days ("tomorrow", "in 3 days", "2 weeks from
+    now"), weekdays ("friday", "next tuesday"), period ends ("end of
+    month", "eow"), calendar dates ("2025-03-05", "March 5th", "5 mar
+    2026") and times ("5pm", "17:30", "noon", "tomorrow morning"), with
+    leading words such as "due" or "by" ignored. Days without a time get
+    DEFAULT_TIME; a month and day without a year that has passed is next
+    year's.
+    """
+    now = now or datetime.now()
+    text = re.sub(r"\s+", " ", (text or "").strip().lower()).rstrip(".!?")
+    found = _match_moment(text, _LEAD_RE.match(text).end(), now)
+    if not found or found[2] != len(text):
+        return None
+    day, clock, _ = found
+    return datetime.combine(day, clock or DEFAULT_TIME)
+
+
+def deadline_mentions(text: str, now: datetime = None) -> list:
+    """(matched text, datetime) for each date/time expression in free text."""
+    now = now or datetime.now()
+    lowered = text.lower()
+    found, end = [], 0
+    for word in re.finditer(r"(?<![\w:@-])[\w@]", lowered):
+        if word.start() < end:
+            continue
+        moment = _match_moment(lowered, word.start(), now)
+        if moment:
+            day, clock, end = moment
+            found.append((text[word.start():end], datetime.combine(day, clock or DEFAULT_TIME)))
+    return found
+
+
+_SPAN_RE = re.compile(r"(?:between|from)\s+")
+_SPAN_JOIN_RE = re.compile(r"\s+(?:and|to|until|till|through|-)\s+")
+_BOUND_RES = [
+    (re.compile(r"(?:before|prior\s+to)\s+"), "before"),
+    (re.compile(r"(?:by|until|till|no\s+later\s+than)\s+"), "by"),
+    (re.compile(r"after\s+"), "after"),
+]
+_WINDOW_RE = re.compile(rf"(?:(?:with)?in\s+)?(?:the\s+)?(?:next|coming)\s+{_NUM}\s+(day|week)s?\b"
+                        rf"|within\s+{_NUM}\s+(day|week)s?\b")
+_CALENDAR_RE = re.compile(r"(this|next)\s+(week|month)\b")
+
+
+def match_deadline_range(text: str, today: date = None):
+    """Deadline range at the start of text as (start, end, length), or None.
+
+    start and end are dates, end exclusive; either may be None for an
+    open range. Handles a single day ("tomorrow", "on friday"), "before",
+    "by" and "after" a day, "between ... and ...", "from ... to ...",
+    "the next 10 days", "soon" (7 days) and the rest of this week or
+    month or all of the next one. length is how much of text was used,
+    so callers can strip the expression from a longer prompt.
+    """
+    today = today or date.today()
+    now = datetime.combine(today, time())
+    one_day = timedelta(days=1)
+
+    m = _SPAN_RE.match(text)
+    if m:
+        first = _match_date(text, m.end(), now, False)
+        joined = first and _SPAN_JOIN_RE.match(text, first[2])
+        last = joined and _match_date(text, joined.end(), now, False)
+        if last:
+            return first[0], last[0] + one_day, last[2]
+    for pattern, bound in _BOUND_RES:
+        m = pattern.match(text)
+        day = m and _match_date(text, m.end(), now, False)
+        if day:
+            if bound == "before":
+                return None, day[0], day[2]
+            if bound == "by":
+                return None, day[0] + one_day, day[2]
+            return day[0] + one_day, None, day[2]
+    m = _WINDOW_RE.match(text)
+    if m:
+        number, unit = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+        return today, today + timedelta(days=_number(number) * (7 if unit == "week" else 1)), m.end()
+    m = _CALENDAR_RE.match(text)
+    if m:
+        which, unit = m.groups()
+        if unit == "week":
+            monday = today - timedelta(days=today.weekday()) + timedelta(weeks=1)
+            start, end = (today, monday) if which == "this" else (monday, monday + timedelta(weeks=1))
+        else:
+            first = _add_months(today.replace(day=1), 1)
+            start, end = (today, first) if which == "this" else (first, _add_months(first, 1))
+        return start, end, m.end()
+    m = re.match(r"soon\b", text)
+    if m:
+        return today, today + timedelta(days=7), m.end()
+    m = re.match(r"(?:on\s+)?", text)
+    day = _match_date(text, m.end(), now, False)
+    if day:
+        return day[0], day[0] + one_day, day[2]
+    return None
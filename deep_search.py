@@ -0,0 +1,129 @@
+import contextvars
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+from langchain_community.utilities import SQLDatabase
+
+from db import DB_PATH, get_pool
+from migrations import change_counter
+from sql_cache import content_sequence
+
+# Queries the SQL agent runs during the current agent invocation
+_captured_queries = contextvars.ContextVar("captured_queries", default=None)
+
+
+class CapturingSQLDatabase(SQLDatabase):
+    """SQLDatabase that records each query the agent runs with its rows.
+
+    The agent's sql_db_query tool only gets a string rendering of the rows;
+    the structured rows are kept here so the page can show them without
+    executing the agent's SQL a second time.
+    """
+
+    def _execute(self, command, fetch="all", **kwargs):
+        result = super()._execute(command, fetch, **kwargs)
+        captured = _captured_queries.get()
+        if captured is not None and fetch == "all":
+            captured.append({"sql": str(command), "rows": [dict(row) for row in result]})
+        return result
+
+
+async def run_agent(agent_executor, question: str) -> dict:
+    """Run the SQL agent and collect what it did.
+
+    Returns a dict with the agent's output, the SQL and rows of its last
+    successful query, the number of agent iterations and the wall time.
+    """
+    captured = []
+    _captured_queries.set(captured)
+    start = time.perf_counter()
+    response = await agent_executor.ainvoke({"input": question})
+    final = captured[-1] if captured else {"sql": None, "rows": []}
+    return {
+        "question": question,
+        "output": response.get("output"),
+        "sql": final["sql"],
+        "rows": final["rows"],
+        "iterations": len(response.get("intermediate_steps", [])),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+class AgentRunCache:
+    """Finished agent runs keyed on the question and the DB change counter.
+
+    Questions are compared by their content tokens in order (synonyms,
+    plurals and filler words folded), so near-identical phrasings share an
+    entry but "tasks Alice assigned to Bob" and "tasks Bob assigned to
+    Alice" do not. Any write to CONTACTS/TASKS bumps the change counter and
+    so retires every entry. A summary of the last `history` runs, cached or
+    not, is kept for reporting.
+    """
+
+    def __init__(self, max_entries=100, history=50):
+        self.max_entries = max_entries
+        self.runs = deque(maxlen=history)
+        self.stats = {"hits": 0, "misses": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(question: str, path=DB_PATH):
+        """Cache key: the question's ordered content tokens and the change counter of the database at path.
+
+        Look runs up with the primary's key, and store a run under the key of
+        the file the agent read: a read snapshot may lag the primary, and its
+        answer belongs to the counter it was copied at. Take the key before
+        running the agent so a write that lands during the run leaves the
+        result keyed to the older data version.
+        """
+        if path == DB_PATH:
+            with get_pool().connection() as conn:
+                version = change_counter(conn)
+        else:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                version = change_counter(conn)
+            finally:
+                conn.close()
+        return content_sequence(question), version
+
+    def _record(self, run: dict, cached: bool):
+        self.runs.append({
+            "question": run["question"],
+            "iterations": run["iterations"],
+            "seconds": 0.0 if cached else run["seconds"],
+            "rows": len(run["rows"]),
+            "cached": cached,
+        })
+
+    def get(self, key):
+        """Cached run for a key, or None."""
+        with self._lock:
+            run = self._entries.get(key)
+            if run is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            self._record(run, cached=True)
+            return run
+
+    def put(self, key, run: dict):
+        """Store a finished run."""
+        with self._lock:
+            self._entries[key] = run
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._record(run, cached=False)
+
+
+_run_cache = AgentRunCache()
+
+
+def get_agent_run_cache() -> AgentRunCache:
+    """Process-wide cache of agent runs."""
+    return _run_cache
@@ -0,0 +1,219 @@
+import json
+import re
+import threading
+from collections import defaultdict, deque
+
+from db import get_pool
+from migrations import change_counter, dependency_counter
+
+# Working hours per unit of ESTIMATED_TIME ("3 days", "1 week", "4h")
+_HOURS_PER_UNIT = {"week": 40, "day": 8, "hour": 1, "hr": 1, "h": 1, "minute": 1 / 60, "min": 1 / 60}
+_ESTIMATE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(weeks?|days?|hours?|hrs?|h|minutes?|mins?)\b", re.IGNORECASE)
+
+# Columns shown for the tasks a dependency question returns, in graph order
+DEPENDENCY_RESULT_SQL = (
+    "SELECT T.ID, T.TITLE, T.STATUS, T.DEADLINE, T.ESTIMATED_TIME, C.NAME AS ASSIGNEE "
+    "FROM json_each(?) J JOIN TASKS T ON T.ID = J.value "
+    "LEFT JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID ORDER BY J.key"
+)
+
+
+def estimated_hours(text) -> float:
+    """Working hours in an ESTIMATED_TIME value; 0 when it cannot be read."""
+    total = 0.0
+    for amount, unit in _ESTIMATE_RE.findall(text or ""):
+        unit = unit.lower()
+        unit = unit if unit in _HOURS_PER_UNIT else unit.rstrip("s")
+        total += float(amount) * _HOURS_PER_UNIT[unit]
+    return total
+
+
+def _walk(start, edges) -> list:
+    """Nodes reachable from start over edges, nearest first (start excluded)."""
+    seen, order, queue = {start}, [], deque([start])
+    while queue:
+        for node in edges.get(queue.popleft(), ()):
+            if node not in seen:
+                seen.add(node)
+                order.append(node)
+                queue.append(node)
+    return order
+
+
+def reaches(edges, start, target) -> bool:
+    """True if target can be reached from start over edges (node -> set of nodes)."""
+    seen, stack = {start}, [start]
+    while stack:
+        for node in edges.get(stack.pop(), ()):
+            if node == target:
+                return True
+            if node not in seen:
+                seen.add(node)
+                stack.append(node)
+    return False
+
+
+def load_edges(conn):
+    """(task -> tasks it waits for, task -> tasks waiting for it) from TASK_DEPENDENCIES."""
+    depends_on, dependents = defaultdict(set), defaultdict(set)
+    for task_id, prerequisite in conn.execute("SELECT TASK_ID, DEPENDS_ON FROM TASK_DEPENDENCIES"):
+        depends_on[task_id].add(prerequisite)
+        dependents[prerequisite].add(task_id)
+    return dict(depends_on), dict(dependents)
+
+
+class DependencyGraph:
+    """In-memory adjacency index over TASK_DEPENDENCIES.
+
+    Both directions are held as dicts of sets, loaded on first use and
+    reloaded only when the dependency counter kept by triggers moves, so
+    ancestor/descendant walks and cycle checks never touch SQLite. Critical
+    paths come from a longest-chain table computed for the whole graph at
+    once and kept until the tasks or their dependencies change.
+    """
+
+    def __init__(self, pool=None):
+        self._pool = pool or get_pool()
+        self._lock = threading.Lock()
+        self._depends_on = {}   # task -> tasks it waits for
+        self._dependents = {}   # task -> tasks waiting for it
+        self._version = None
+        self._chains = {}
+        self._chains_version = None
+        self.stats = {"loads": 0, "queries": 0}
+
+    def _refresh(self, conn):
+        version = dependency_counter(conn)
+        if version == self._version:
+            return
+        self._depends_on, self._dependents = load_edges(conn)
+        self._version = version
+        self.stats["loads"] += 1
+
+    def _snapshot(self):
+        with self._lock, self._pool.connection() as conn:
+            self._refresh(conn)
+            self.stats["queries"] += 1
+            return self._depends_on, self._dependents
+
+    def ancestors(self, task_id: int) -> list:
+        """Tasks task_id waits for, directly or transitively, nearest first."""
+        depends_on, _ = self._snapshot()
+        return _walk(task_id, depends_on)
+
+    def descendants(self, task_id: int) -> list:
+        """Tasks blocked by task_id, directly or transitively, nearest first."""
+        _, dependents = self._snapshot()
+        return _walk(task_id, dependents)
+
+    def would_cycle(self, task_id: int, depends_on: int) -> bool:
+        """True if making task_id depend on depends_on would close a cycle."""
+        edges, _ = self._snapshot()
+        return task_id == depends_on or reaches(edges, depends_on, task_id)
+
+    def _longest_chains(self, conn):
+        """Heaviest prerequisite chain ending at every task in the graph.
+
+        Returns {task: previous task on its chain}. Computed over the whole
+        graph in one topological pass and cached until either the edges or
+        the tasks (their estimates) change.
+        """
+        key = (self._version, change_counter(conn))
+        if key == self._chains_version:
+            return self._chains
+        depends_on, dependents = self._depends_on, self._dependents
+        hours = {task: estimated_hours(estimate) for task, estimate in conn.execute(
+            "SELECT ID, ESTIMATED_TIME FROM TASKS WHERE ESTIMATED_TIME IS NOT NULL")}
+        nodes = depends_on.keys() | dependents.keys()
+        waiting = {node: len(depends_on.get(node, ())) for node in nodes}
+        ready = deque(node for node, count in waiting.items() if count == 0)
+        best, previous = {}, {}
+        while ready:
+            node = ready.popleft()
+            parent = max(depends_on.get(node, ()), key=best.__getitem__, default=None)
+            weight, length = best[parent] if parent is not None else (0.0, 0)
+            best[node] = (weight + hours.get(node, 0.0), length + 1)
+            previous[node] = parent
+            for child in dependents.get(node, ()):
+                waiting[child] -= 1
+                if waiting[child] == 0:
+                    ready.append(child)
+        # Tasks on a cycle left over from before the edge table never become
+        # ready and are missing from the result
+        self._chains, self._chains_version = previous, key
+        return previous
+
+    def critical_path(self, task_id: int) -> list:
+        """Longest chain of prerequisites ending at task_id, first task first.
+
+        Chains are compared by total ESTIMATED_TIME, then by length.
+        """
+        with self._lock, self._pool.connection() as conn:
+            self._refresh(conn)
+            self.stats["queries"] += 1
+            previous = self._longest_chains(conn)
+        path, node = [], task_id
+        while node is not None:
+            path.append(node)
+            node = previous.get(node)
+        return path[::-1]
+
+
+_QUESTIONS = [
+    ("descendants", re.compile(
+        r"(?:what|which tasks?|show|list)?\s*(?:is|are)?\s*(?:tasks\s+)?(?:blocked by|depend(?:s|ing)? on|waiting (?:on|for))\s+(.+)",
+        re.IGNORECASE)),
+    ("descendants", re.compile(r"(?:show |list )?(?:the )?dependents of\s+(.+)", re.IGNORECASE)),
+    ("ancestors", re.compile(
+        r"what (?:does|is)\s+(.+?)\s+(?:depend(?:ing)? on|waiting (?:on|for)|blocked by)", re.IGNORECASE)),
+    ("ancestors", re.compile(r"what blocks\s+(.+)", re.IGNORECASE)),
+    ("ancestors", re.compile(
+        r"(?:show |list )?(?:the )?(?:dependencies|prerequisites|blockers) (?:of|for)\s+(.+)", re.IGNORECASE)),
+    ("critical_path", re.compile(r"(?:show |what is )?(?:the )?critical path (?:to|for|of)\s+(.+)",
+                                 re.IGNORECASE)),
+]
+
+
+def _resolve_task(conn, text):
+    text = text.strip().strip("'\"").strip()
+    task = re.fullmatch(r"task\s+(?:id\s+|#|no\.?\s*)?(\d+)", text, re.IGNORECASE)
+    if task:
+        row = conn.execute("SELECT ID FROM TASKS WHERE ID = ?", (int(task.group(1)),)).fetchone()
+    else:
+        row = conn.execute("SELECT ID FROM TASKS WHERE LOWER(TITLE) = LOWER(?) ORDER BY ID LIMIT 1",
+                           (text,)).fetchone()
+    return row[0] if row else None
+
+
+def match_dependency_question(prompt: str, graph=None):
+    """Answer "what is blocked by X" style prompts from the dependency graph.
+
+    Returns (action, sql, params) like sql_templates.match_template, with
+    the task IDs in graph order as the parameter, or None.
+    """
+    prompt = re.sub(r"\s+", " ", prompt.strip().rstrip("?.!").strip())
+    for kind, pattern in _QUESTIONS:
+        match = pattern.fullmatch(prompt)
+        if not match:
+            continue
+        graph = graph or get_graph()
+        with graph._pool.connection() as conn:
+            task_id = _resolve_task(conn, match.group(1))
+        if task_id is None:
+            return None
+        task_ids = getattr(graph, kind)(task_id)
+        return "view", DEPENDENCY_RESULT_SQL, (json.dumps(task_ids),)
+    return None
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph() -> DependencyGraph:
+    """Process-wide dependency graph."""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = DependencyGraph()
+        return _graph
@@ -0,0 +1,87 @@
+import json
+import threading
+import uuid
+
+from db import get_pool
+
+# Local archive for chat turns that scrolled out of the visible window
+HISTORY_PATH = 'history.db'
+
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+def _pool(path):
+    pool = get_pool(path)
+    with _schema_lock:
+        if path not in _schema_ready:
+            with pool.connection() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS CHAT_ARCHIVE (
+                        SESSION_ID TEXT NOT NULL,
+                        SEQ INTEGER NOT NULL,
+                        MESSAGE TEXT NOT NULL,
+                        PRIMARY KEY (SESSION_ID, SEQ)
+                    )""")
+                conn.commit()
+            _schema_ready.add(path)
+    return pool
+
+
+class ChatHistory:
+    """Chat messages for one session with a bounded in-memory tail.
+
+    Only the last `window` messages are held in memory; older ones are
+    serialized to a SQLite archive and can be paged back in with
+    load_earlier(). Every message gets a sequence number that stays stable
+    for the whole session, which makes it usable as a widget key.
+    """
+
+    def __init__(self, window=20, path=HISTORY_PATH, session_id=None):
+        self.window = window
+        self.path = path
+        self.session_id = session_id or uuid.uuid4().hex
+        self.archived = 0
+        self._tail = []      # [(seq, message)], oldest first
+        self._earlier = []   # archived messages paged back in, oldest first
+        self._next_seq = 0
+
+    def append(self, message: dict):
+        """Add a message, spilling the oldest ones past the window."""
+        self._tail.append((self._next_seq, message))
+        self._next_seq += 1
+        overflow = len(self._tail) - self.window
+        if overflow > 0:
+            spilled, self._tail = self._tail[:overflow], self._tail[overflow:]
+            with _pool(self.path).connection() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO CHAT_ARCHIVE (SESSION_ID, SEQ, MESSAGE) VALUES (?, ?, ?)",
+                    [(self.session_id, seq, json.dumps(msg)) for seq, msg in spilled])
+                conn.commit()
+            self.archived += len(spilled)
+
+    def visible(self):
+        """(seq, message) pairs to render: paged-in archive plus the tail."""
+        return self._earlier + self._tail
+
+    def has_earlier(self) -> bool:
+        """True while archived messages remain that are not paged in."""
+        return self.archived > len(self._earlier)
+
+    def load_earlier(self, count: int = None):
+        """Page in up to `count` (default: window) archived messages."""
+        visible = self.visible()
+        before = visible[0][0] if visible else self._next_seq
+        with _pool(self.path).connection() as conn:
+            rows = conn.execute(
+                "SELECT SEQ, MESSAGE FROM CHAT_ARCHIVE WHERE SESSION_ID = ? AND SEQ < ? "
+                "ORDER BY SEQ DESC LIMIT ?",
+                (self.session_id, before, count or self.window)).fetchall()
+        self._earlier = [(seq, json.loads(msg)) for seq, msg in reversed(rows)] + self._earlier
+
+    def hide_earlier(self):
+        """Drop paged-in archive messages from memory again."""
+        self._earlier = []
+
+    def __len__(self):
+        return self._next_seq
@@ -0,0 +1,48 @@
+import re
+
+# Minimum confidence for answering without the LLM
+INTENT_CONFIDENCE_THRESHOLD = 0.8
+
+# (action, pattern, weight) rules built from the classifier's few-shot examples.
+# A verb at the start of the prompt is the strongest signal.
+INTENT_RULES = [
+    ("add", r"^\s*(add|create|insert|register|save|new)\b", 3.0),
+    ("add", r"\b(add|create|insert)\s+(a\s+)?(new\s+)?(contact|person|entry|record)s?\b", 2.0),
+    ("add", r"\bnew\s+contact\b", 1.0),
+    ("view", r"^\s*(show|list|display|find|get|view|search|fetch|give me|tell me|who|what|which|when|where|how many|count)\b", 3.0),
+    ("view", r"\b(contacts?|tasks?)\s+(in|from|for|with|of|assigned to|due)\b", 1.0),
+    ("view", r"\?\s*$", 1.0),
+    ("update", r"^\s*(update|change|modify|edit|set|mark|rename|reassign|move|postpone|extend|assign)\b", 3.0),
+    ("update", r"\b(as|to)\s+(completed|complete|done|in progress|on hold|not started|reviewed & approved)\b", 2.0),
+    ("update", r"\b(update|change|modify|rename|reassign)\b", 1.0),
+    ("update", r"\b(due date|deadline|email|phone|address|status|priority)\s+to\b", 2.0),
+]
+
+_COMPILED_RULES = [(action, re.compile(pattern, re.IGNORECASE), weight)
+                   for action, pattern, weight in INTENT_RULES]
+# The rules anchored at the start: a command verb opening the prompt
+_LEADING_RULES = [(action, pattern) for action, pattern, _ in _COMPILED_RULES
+                  if pattern.pattern.startswith("^")]
+
+
+def leading_action(text: str):
+    """The action whose command verb opens text ("mark ...", "show ..."), or None."""
+    return next((action for action, pattern in _LEADING_RULES if pattern.search(text)), None)
+
+
+def classify_intent(prompt: str):
+    """Classify a prompt into add/view/update with the local rule table.
+
+    Returns (action, confidence) where confidence is the winning action's
+    share of the total rule weight, or (None, 0.0) when no rule matches.
+    """
+    scores = {"add": 0.0, "view": 0.0, "update": 0.0}
+    for action, pattern, weight in _COMPILED_RULES:
+        if pattern.search(prompt):
+            scores[action] += weight
+
+    total = sum(scores.values())
+    if not total:
+        return None, 0.0
+    action = max(scores, key=scores.get)
+    return action, scores[action] / total
@@ -0,0 +1,167 @@
+import asyncio
+import random
+import threading
+import time
+
+
+class LLMTimeoutError(TimeoutError):
+    """An LLM call did not finish within its deadline."""
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for provider errors that mean "slow down and retry"."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    text = f"{type(error).__name__} {error}".lower()
+    return status == 429 or "ratelimit" in text or "rate limit" in text or "rate_limit" in text
+
+
+class LLMGateway:
+    """Shared async front door for LLM calls.
+
+    Calls run on one background event loop, at most max_concurrency at a
+    time. Each call has a deadline covering all of its attempts; rate-limit
+    errors are retried with exponential backoff and full jitter until the
+    deadline or max_retries is reached. Synchronous callers (the Streamlit
+    script) use invoke()/invoke_many(), which block on the loop.
+
+    Whole agent runs go through run(), which has its own limit of
+    max_agent_runs and its own agent_timeout, so long Deep Search runs
+    never hold the slots chat calls wait for.
+    """
+
+    def __init__(self, llm, max_concurrency=4, timeout=30.0, max_retries=4,
+                 base_delay=0.5, max_delay=8.0, max_agent_runs=2, agent_timeout=120.0):
+        self.llm = llm
+        self.timeout = timeout
+        self.agent_timeout = agent_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {"calls": 0, "retries": 0, "timeouts": 0, "errors": 0, "agent_runs": 0}
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._agent_semaphore = asyncio.Semaphore(max_agent_runs)
+        threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True).start()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def _guarded(self, make_call, timeout=None):
+        """Await make_call() under the concurrency limit, deadline and retry policy."""
+        timeout = timeout or self.timeout
+        deadline = self._loop.time() + timeout
+        self.stats["calls"] += 1
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise LLMTimeoutError(f"LLM call exceeded its {timeout:g}s deadline")
+                try:
+                    return await asyncio.wait_for(make_call(), remaining)
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    raise LLMTimeoutError(f"LLM call exceeded its {timeout:g}s deadline")
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                        self.stats["errors"] += 1
+                        raise
+                    delay = self._backoff(attempt)
+                    if self._loop.time() + delay >= deadline:
+                        self.stats["errors"] += 1
+                        raise
+                    attempt += 1
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(delay)
+
+    async def ainvoke(self, messages, timeout=None, **kwargs):
+        """Async LLM call; must run on the gateway's loop.
+
+        Extra keyword arguments, such as response_format for JSON mode, go
+        to the model call.
+        """
+        return await self._guarded(lambda: self.llm.ainvoke(messages, **kwargs), timeout)
+
+    async def _agent_run(self, make_call, timeout=None):
+        """Await make_call() under the agent limit, once; waiting for a slot counts against the deadline."""
+        timeout = timeout or self.agent_timeout
+        self.stats["agent_runs"] += 1
+
+        async def limited():
+            async with self._agent_semaphore:
+                return await make_call()
+
+        try:
+            return await asyncio.wait_for(limited(), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise LLMTimeoutError(f"Agent run exceeded its {timeout:g}s deadline")
+
+    def run(self, make_call, timeout=None):
+        """Run a coroutine factory that makes many LLM calls (an agent's ainvoke).
+
+        The run is attempted once under the agent limit and agent_timeout;
+        rate limits are retried per LLM call inside it (see
+        resources.get_agent_llm), not by starting the run over.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._agent_run(make_call, timeout), self._loop)
+        return future.result()
+
+    def invoke(self, messages, timeout=None, **kwargs):
+        """Blocking LLM call."""
+        future = asyncio.run_coroutine_threadsafe(self.ainvoke(messages, timeout, **kwargs), self._loop)
+        return future.result()
+
+    def invoke_many(self, message_lists, timeout=None):
+        """Run independent LLM calls concurrently.
+
+        Returns one entry per call in order: the response, or the exception
+        that call raised.
+        """
+        async def gather():
+            return await asyncio.gather(*(self.ainvoke(messages, timeout) for messages in message_lists),
+                                        return_exceptions=True)
+        return asyncio.run_coroutine_threadsafe(gather(), self._loop).result()
+
+    def close(self):
+        """Stop the background event loop."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class FakeLLM:
+    """Offline stand-in for ChatGroq with scripted replies.
+
+    respond(messages) returns the reply text. latency adds a delay per call
+    and rate_limit_failures makes the first N calls raise a 429-style error,
+    so retry, timeout and concurrency behaviour can be exercised without a
+    network.
+    """
+
+    class RateLimitError(Exception):
+        status_code = 429
+
+    def __init__(self, respond=None, latency=0.0, rate_limit_failures=0):
+        self.respond = respond or (lambda messages: "")
+        self.latency = latency
+        self.rate_limit_failures = rate_limit_failures
+        self.calls = []
+
+    def _reply(self, messages):
+        from langchain_core.messages import AIMessage
+
+        self.calls.append(messages)
+        if self.rate_limit_failures > 0:
+            self.rate_limit_failures -= 1
+            raise self.RateLimitError("rate limit exceeded")
+        return AIMessage(content=self.respond(messages))
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+    def invoke(self, messages, *args, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._reply(messages)
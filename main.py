@@ -3,224 +3,532 @@ import sqlite3
 import streamlit as st
 from datetime import datetime, time
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage
 import pandas as pd
-from langchain_community.agent_toolkits import create_sql_agent
-from langchain_community.utilities import SQLDatabase
 import json
-from datetime import datetime, timedelta
+from sql_cache import SQLCache
+from intent import classify_intent, INTENT_CONFIDENCE_THRESHOLD
+from sql_templates import match_template
+from sql_guard import ACTION_STATEMENTS, MAX_ROWS, UnsafeSQLError, get_validator
+from db import get_pool
+from snapshot import get_snapshot_reader
+from contacts import get_directory, is_contacts_write
+from history import ChatHistory
+from resources import chat_messages, get_llm_gateway, get_agent_executor
+from migrations import apply_migrations
+from schema_context import get_schema_context
+from plan_advisor import get_advisor
+from dependencies import match_dependency_question
+from bulk_import import import_upload
+from tracing import get_tracer, token_usage
+from batch import batch_item, is_batch, run_batch, split_commands
+from deadlines import deadline_mentions, parse_deadline
+from task_params import NEW_TASK_STATUSES, TASK_CATEGORIES, TaskParameters, get_task_params_cache, repair_json, task_schema
+from dashboard import deadline_buckets, match_dashboard_question, status_priority_counts, workload
+from contextlib import nullcontext
+import time as timer
 
 # Load environment variables
 load_dotenv('.env')
 
-# Initialize ChatGroq
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-llm = ChatGroq(
-    api_key=GROQ_API_KEY,
-    model_name="llama-3.3-70b-versatile",
-)
+# ChatGroq, the LLM gateway and the SQL agent are built lazily, once per
+# process, by the factories in resources.py; agent runs have their own
+# limit and deadline there (AGENT_MAX_CONCURRENCY, AGENT_TIMEOUT)
 
-# Initialize session state for chat history
+# Initialize session state for chat history; only the last
+# CHAT_HISTORY_WINDOW messages stay in memory, older ones go to history.db
 if "messages" not in st.session_state:
-    st.session_state.messages = []
-
-# Initialize SQL Agent
-try:
-    db_agent = SQLDatabase.from_uri(
-        "sqlite:///test.db",
-        include_tables=['CONTACTS', 'TASKS'],
-        sample_rows_in_table_info=2
+    st.session_state.messages = ChatHistory(window=int(os.getenv("CHAT_HISTORY_WINDOW", 20)))
+
+# Bring the database schema up to date once per process
+@st.cache_resource
+def init_database():
+    return apply_migrations()
+
+init_database()
+
+# Shared SQLite connections, created once per process
+db_pool = get_pool()
+
+# View results and Deep Search read a periodically refreshed copy of the
+# database, so long reads never hold up writes to db_pool
+snapshot_reader = get_snapshot_reader()
+
+def last_write() -> float:
+    """Wall time of this session's last committed write; reads must not predate it."""
+    return st.session_state.get("last_write", 0.0)
+
+# Contact (ID, NAME) list shared by the chat templates and the task form
+contact_directory = get_directory()
+CONTACT_PAGE_SIZE = 50
+
+# Rows shown per page for chat "view" results
+RESULT_PAGE_SIZE = 20
+
+@st.cache_resource
+def get_sql_cache():
+    """Process-wide NL->SQL cache shared by all sessions."""
+    return SQLCache()
+
+sql_cache = get_sql_cache()
+
+# Extracted "add task" parameters by prompt
+task_params_cache = get_task_params_cache()
+
+# EXPLAIN QUERY PLAN check of every chat/agent statement, logs full scans
+plan_advisor = get_advisor()
+
+# Compile-time checks of LLM and cached SQL before anything runs
+sql_validator = get_validator()
+
+# Per-stage spans of chat turns, stored in traces.db for the Traces page
+tracer = get_tracer()
+
+# LLM call counters for the chat path
+if "llm_stats" not in st.session_state:
+    st.session_state.llm_stats = {
+        "fused_calls": 0,
+        "fused_fallbacks": 0,
+        "fast_path_hits": 0,
+        "fast_path_misses": 0,
+        "fast_path_seconds": 0.0,
+        "template_hits": 0,
+        "latency": {},  # call kind -> [total seconds, count]
+    }
+
+# Helper Functions
+SQL_SYSTEM_PROMPTS = {
+    "add": (
+        "You are an expert in generating SQL INSERT statements for a contacts database. "
+        "Only insert into the CONTACTS table.\n\n"
+        "Rules for INSERT Statements:\n"
+        "1. For CONTACTS: INSERT INTO CONTACTS (NAME, PHONE, EMAIL, ADDRESS) VALUES (...);\n"
+        "2. Phone numbers must be 10-digit integers.\n"
+        "3. Use single quotes for string values.\n"
+        "4. Return only the SQL query, no explanations.\n\n"
+        "Examples:\n"
+        "1. +/(Add new) contact: INSERT INTO CONTACTS (NAME, PHONE, EMAIL, ADDRESS) VALUES ('John Doe', 5551234567, 'john@email.com', '123 Main St');\n"
+        "2. Add another contact: INSERT INTO CONTACTS (NAME, PHONE, EMAIL, ADDRESS) VALUES ('Jane Smith', 9876543210, 'jane@email.com', '456 Oak Ave');"
+        "3. Add task: none"
+    ),
+    "view": (
+        "You are an expert in generating SQL SELECT queries with JOINs for a contacts and tasks database.\n\n"
+        "Rules for SELECT Statements:\n"
+        "1. Always use JOINs when showing tasks to include assignee names.\n"
+        "2. Use LOWER() for case-insensitive comparisons in WHERE clauses.\n"
+        "3. Use proper table aliases (C for CONTACTS, T for TASKS).\n"
+        "4. For keywords in ADDRESS or task text, use the CONTACTS_FTS/TASKS_FTS full-text tables with MATCH instead of LIKE '%...%'.\n"
+        "5. When the request ends with 'Contacts mentioned' or 'Dates mentioned', filter by those CONTACTS.ID values and dates instead of by name or relative date.\n"
+        "6. Return only the SQL query, no explanations.\n\n"
+        "Examples:\n"
+        "1. Show all tasks: SELECT T.ID, T.TITLE, T.DESCRIPTION, T.CATEGORY, T.PRIORITY, T.STATUS, C.NAME AS ASSIGNEE FROM TASKS T LEFT JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID;\n"
+        "2. Find contacts from Delhi: SELECT C.* FROM CONTACTS_FTS JOIN CONTACTS C ON C.ID = CONTACTS_FTS.rowid WHERE CONTACTS_FTS MATCH 'ADDRESS: delhi*';\n"
+        "3. Show ongoing tasks for John: SELECT T.ID, T.TITLE, T.DEADLINE FROM TASKS T JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID WHERE LOWER(C.NAME) = LOWER('John Doe') AND T.STATUS = 'In Progress';"
+        "4. Display task 1: SELECT T.* FROM TASKS T JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID WHERE T.ID = 1;\n"
+        "5. Tasks mentioning the website: SELECT T.ID, T.TITLE, T.STATUS, C.NAME AS ASSIGNEE FROM TASKS_FTS JOIN TASKS T ON T.ID = TASKS_FTS.rowid LEFT JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID WHERE TASKS_FTS MATCH 'website*';"
+    ),
+    "update": (
+        "You are an expert in generating SQL UPDATE statements for a contacts and tasks database.\n\n"
+        "Rules for UPDATE Statements:\n"
+        "1. For contacts, use ID as the identifier in WHERE clause.\n"
+        "2. For tasks, use ID as the identifier in WHERE clause.\n"
+        "3. Use single quotes for string values.\n"
+        "4. Include only one SET clause per statement.\n"
+        "5. When the request ends with 'Contacts mentioned' or 'Dates mentioned', use those CONTACTS.ID values and dates instead of looking people up by name or computing dates.\n"
+        "6. Return only the SQL query, no explanations.\n\n"
+        "Examples:\n"
+        "1. Update contact email: UPDATE CONTACTS SET EMAIL = 'new@email.com' WHERE ID = 2;\n"
+        "2. Mark task as completed: UPDATE TASKS SET STATUS = 'Completed' WHERE ID = 5;\n"
+        "3. Change task deadline: UPDATE TASKS SET DEADLINE = '2024-12-31 23:59' WHERE ID = 3;\n"
+        "4. Reassign task: UPDATE TASKS SET ASSIGNED_TO = (SELECT ID FROM CONTACTS WHERE NAME = 'vivek') WHERE ID = 10;\n"
+        "5. Update contact based on name: UPDATE CONTACTS SET ADDRESS = 'New Address' WHERE LOWER(NAME) = LOWER('John Doe');\n"
+        "6. Update task status based on title: UPDATE TASKS SET STATUS = 'Reviewed & Approved' WHERE LOWER(TITLE) = LOWER('Project Planning');"
     )
-    
-    llm = ChatGroq(
-    api_key=GROQ_API_KEY,
-    model_name="llama-3.3-70b-versatile",
+}
+
+CLASSIFY_SYSTEM_PROMPT = (
+    "Classify the user's database request into one of: add, view, or update. "
+    "Respond ONLY with the action keyword. Rules:\n"
+    "- 'add' for creating new records (insert)\n"
+    "- 'view' for read operations (select)\n"
+    "- 'update' for modifying existing records\n"
+    "Examples:\n"
+    "User: Add new contact -> add\n"
+    "User: Show tasks -> view\n"
+    "User: Change email -> update\n"
+    "User: List contacts in NY -> view\n"
+    "User: Mark task 5 completed -> update"
 )
-    agent_executor = create_sql_agent(
-        llm=llm,
-        db=db_agent,
-        verbose=True,
-        top_k=5,
-        max_iterations=10
-    )
-except Exception as e:
-    st.error(f"Failed to initialize SQL agent: {e}")
 
-# Helper Functions
+ACTION_INSTRUCTIONS = "\n\n".join(f"### {action}\n{text}" for action, text in SQL_SYSTEM_PROMPTS.items())
+
+FUSED_SYSTEM_PROMPT = (
+    "You handle requests for a contacts and tasks database in a single step.\n"
+    "1. Classify the request as 'add' (creating new records), 'view' (read operations) "
+    "or 'update' (modifying existing records).\n"
+    "2. Write the SQL statement for that action using the matching instructions below.\n\n"
+    + ACTION_INSTRUCTIONS
+    + "\n\nRespond ONLY with a JSON object using double quotes, no explanations:\n"
+    '{"action": "add|view|update", "sql": "<single SQL statement>"}'
+)
+
+BATCH_SYSTEM_PROMPT = (
+    "You handle a numbered list of requests for a contacts and tasks database in a single step.\n"
+    "For every request:\n"
+    "1. Classify it as 'add' (creating new records), 'view' (read operations) "
+    "or 'update' (modifying existing records).\n"
+    "2. Write one SQL statement for that action using the matching instructions below.\n\n"
+    + ACTION_INSTRUCTIONS
+    + "\n\nRespond ONLY with a JSON array using double quotes, one object per request in the "
+    "same order, no explanations:\n"
+    '[{"action": "add|view|update", "sql": "<single SQL statement>"}, ...]'
+)
+
+def with_schema(system_prompt: str) -> str:
+    """Append the compact, precomputed schema description to a system prompt."""
+    return f"{system_prompt}\n\nDatabase schema:\n{get_schema_context().text}"
+
+def strip_code_fence(text: str) -> str:
+    """Remove markdown code fences the LLM sometimes wraps around its output."""
+    text = text.strip()
+    if text.startswith("```sql"):
+        text = text[6:-3].strip()
+    elif text.startswith("```json"):
+        text = text[7:-3].strip()
+    elif text.startswith("```"):
+        text = text[3:-3].strip()
+    return text
+
+def record_llm_latency(kind: str, seconds: float, calls: int = 1):
+    """Add LLM call time to the per-kind latency totals."""
+    total = st.session_state.llm_stats["latency"].setdefault(kind, [0.0, 0])
+    total[0] += seconds * calls
+    total[1] += calls
+
+def invoke_llm(kind: str, messages, **kwargs):
+    """Invoke the LLM through the gateway and record its latency under the given call kind."""
+    start = timer.perf_counter()
+    with tracer.span("llm", kind=kind) as span:
+        try:
+            response = get_llm_gateway().invoke(messages, **kwargs)
+            span.set(**token_usage(response))
+            return response
+        finally:
+            record_llm_latency(kind, timer.perf_counter() - start)
+
+def invoke_llm_many(kind: str, message_lists):
+    """Run independent LLM calls concurrently; failed calls come back as exceptions."""
+    start = timer.perf_counter()
+    with tracer.span("llm", kind=kind, calls=len(message_lists)) as span:
+        try:
+            responses = get_llm_gateway().invoke_many(message_lists)
+            usages = [token_usage(r) for r in responses if not isinstance(r, Exception)]
+            for field in ("tokens_in", "tokens_out"):
+                counts = [usage[field] for usage in usages if usage[field] is not None]
+                span.set(**{field: sum(counts) if counts else None})
+            return responses
+        finally:
+            record_llm_latency(kind, timer.perf_counter() - start, len(message_lists))
+
+def average_llm_latency(kind: str):
+    """Mean latency in seconds of recorded LLM calls of a kind, if any."""
+    total, count = st.session_state.llm_stats["latency"].get(kind, (0.0, 0))
+    return total / count if count else None
+
+def fast_classify(prompt: str):
+    """Classify with the local rule table; None when not confident enough."""
+    stats = st.session_state.llm_stats
+    start = timer.perf_counter()
+    with tracer.span("fast_classify") as span:
+        action, confidence = classify_intent(prompt)
+        span.set(action=action, confidence=round(confidence, 3))
+    stats["fast_path_seconds"] += timer.perf_counter() - start
+    if confidence >= INTENT_CONFIDENCE_THRESHOLD:
+        stats["fast_path_hits"] += 1
+        return action
+    stats["fast_path_misses"] += 1
+    return None
+
+def cacheable(prompt: str) -> bool:
+    """False for prompts naming dates: their SQL holds the dates as resolved today."""
+    return not deadline_mentions(prompt)
+
+def cached_sql(prompt: str):
+    """(action, sql) stored for this or a paraphrased prompt, or None."""
+    if not cacheable(prompt):
+        return None
+    with tracer.span("sql_cache_get") as span:
+        cached = sql_cache.get(prompt)
+        span.set(hit=cached is not None)
+        return cached
+
+def with_resolved_mentions(prompt: str) -> str:
+    """Append the contacts and dates a prompt names, resolved locally, for the LLM to use as is."""
+    with tracer.span("resolve_mentions") as span:
+        contacts = contact_directory.index.mentions(prompt)
+        dates = deadline_mentions(prompt)
+        span.set(contacts=len(contacts), dates=len(dates))
+    resolved = "; ".join(f"{text} = CONTACTS.ID {contact_id} ({name})"
+                         for text, contact_id, name, certain in contacts if certain)
+    if resolved:
+        prompt = f"{prompt}\n\nContacts mentioned: {resolved}"
+    possible = "; ".join(f"{text} ~ CONTACTS.ID {contact_id} ({name})"
+                         for text, contact_id, name, certain in contacts if not certain)
+    if possible:
+        prompt = f"{prompt}\n\nPossible contacts (spelling match, use only if clearly meant): {possible}"
+    if dates:
+        resolved = "; ".join(f"{text} = '{moment:%Y-%m-%d %H:%M}'" for text, moment in dates)
+        prompt = f"{prompt}\n\nDates mentioned: {resolved}"
+    return prompt
+
 def generate_sql_query(prompt: str, action: str) -> str:
     """Generate SQL query based on selected action and user input."""
-    system_prompts = {
-        "add": (
-            "You are an expert in generating SQL INSERT statements for a contacts database. "
-            "The database has one table: CONTACTS.\n\n"
-            "CONTACTS Table Structure:\n"
-            "- ID (INTEGER, PRIMARY KEY, AUTOINCREMENT)\n"
-            "- NAME (VARCHAR, NOT NULL)\n"
-            "- PHONE (INTEGER, UNIQUE, NOT NULL, 10 digits)\n"
-            "- EMAIL (VARCHAR, UNIQUE, NOT NULL)\n"
-            "- ADDRESS (TEXT)\n\n"
-            "Rules for INSERT Statements:\n"
-            "1. For CONTACTS: INSERT INTO CONTACTS (NAME, PHONE, EMAIL, ADDRESS) VALUES (...);\n"
-            "2. Phone numbers must be 10-digit integers.\n"
-            "3. Use single quotes for string values.\n"
-            "4. Return only the SQL query, no explanations.\n\n"
-            "Examples:\n"
-            "1. +/(Add new) contact: INSERT INTO CONTACTS (NAME, PHONE, EMAIL, ADDRESS) VALUES ('John Doe', 5551234567, 'john@email.com', '123 Main St');\n"
-            "2. Add another contact: INSERT INTO CONTACTS (NAME, PHONE, EMAIL, ADDRESS) VALUES ('Jane Smith', 9876543210, 'jane@email.com', '456 Oak Ave');"
-            "3. Add task: none"
-        ),
-        "view": (
-            "You are an expert in generating SQL SELECT queries with JOINs for a contacts and tasks database.\n\n"
-            "Rules for SELECT Statements:\n"
-            "1. Always use JOINs when showing tasks to include assignee names.\n"
-            "2. Use LOWER() for case-insensitive comparisons in WHERE clauses.\n"
-            "3. Use proper table aliases (C for CONTACTS, T for TASKS).\n"
-            "4. Return only the SQL query, no explanations.\n\n"
-            "Examples:\n"
-            "1. Show all tasks: SELECT T.ID, T.TITLE, T.DESCRIPTION, T.CATEGORY, T.PRIORITY, T.STATUS, C.NAME AS ASSIGNEE FROM TASKS T LEFT JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID;\n"
-            "2. Find contacts from Delhi: SELECT * FROM CONTACTS WHERE LOWER(ADDRESS) LIKE '%delhi%';\n"
-            "3. Show ongoing tasks for John: SELECT T.ID, T.TITLE, T.DEADLINE FROM TASKS T JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID WHERE LOWER(C.NAME) = LOWER('John Doe') AND T.STATUS = 'In Progress';"
-            "4. Display task 1: SELECT T.* FROM TASKS T JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID WHERE T.ID = 1;"
-        ),
-        "update": (
-            "You are an expert in generating SQL UPDATE statements for a contacts and tasks database.\n\n"
-            "Rules for UPDATE Statements:\n"
-            "1. For contacts, use ID as the identifier in WHERE clause.\n"
-            "2. For tasks, use ID as the identifier in WHERE clause.\n"
-            "3. Use single quotes for string values.\n"
-            "4. Include only one SET clause per statement.\n"
-            "5. Return only the SQL query, no explanations.\n\n"
-            "Examples:\n"
-            "1. Update contact email: UPDATE CONTACTS SET EMAIL = 'new@email.com' WHERE ID = 2;\n"
-            "2. Mark task as completed: UPDATE TASKS SET STATUS = 'Completed' WHERE ID = 5;\n"
-            "3. Change task deadline: UPDATE TASKS SET DEADLINE = '2024-12-31 23:59' WHERE ID = 3;\n"
-            "4. Reassign task: UPDATE TASKS SET ASSIGNED_TO = (SELECT ID FROM CONTACTS WHERE NAME = 'vivek') WHERE ID = 10;\n"
-            "5. Update contact based on name: UPDATE CONTACTS SET ADDRESS = 'New Address' WHERE LOWER(NAME) = LOWER('John Doe');\n"
-            "6. Update task status based on title: UPDATE TASKS SET STATUS = 'Reviewed & Approved' WHERE LOWER(TITLE) = LOWER('Project Planning');"
-        )
-    }
-    
-    messages = [
-        SystemMessage(content=system_prompts[action]),
-        HumanMessage(content=prompt)
-    ]
+    messages = chat_messages(with_schema(SQL_SYSTEM_PROMPTS[action]), with_resolved_mentions(prompt))
     
     try:
-        response = llm.invoke(messages)
-        sql_query = response.content.strip()
-        
-        # Clean markdown formatting if present
-        if sql_query.startswith("```sql"):
-            sql_query = sql_query[6:-3].strip()
-        elif sql_query.startswith("```"):
-            sql_query = sql_query[3:-3].strip()
-            
-        return sql_query
+        response = invoke_llm("generate", messages)
+        return strip_code_fence(response.content)
     except Exception as e:
         st.error(f"Error generating SQL query: {e}")
         return ""
 
+def classify_and_generate(prompt: str):
+    """Classify intent and generate its SQL in a single LLM round-trip.
+
+    Returns (action, sql_query). Falls back to classify_action followed by
+    generate_sql_query when the combined response fails validation.
+    """
+    stats = st.session_state.llm_stats
+    messages = chat_messages(with_schema(FUSED_SYSTEM_PROMPT), with_resolved_mentions(prompt))
+
+    stats["fused_calls"] += 1
+    try:
+        response = invoke_llm("fused", messages)
+        parsed = json.loads(strip_code_fence(response.content))
+        action = str(parsed.get("action", "")).strip().lower()
+        sql_query = strip_code_fence(str(parsed.get("sql", "")))
+        if action in ACTION_STATEMENTS and sql_query.upper().startswith(ACTION_STATEMENTS[action]):
+            return action, sql_query
+    except Exception:
+        pass
+
+    # Combined output was unusable, use the two-call path instead
+    stats["fused_fallbacks"] += 1
+    guess, _ = classify_intent(prompt)
+    if not guess:
+        action = classify_action(prompt, fast_path=False)
+        return action, generate_sql_query(prompt, action)
+
+    # Classify with the LLM while generating SQL for the local best guess;
+    # the speculative SQL is kept when both agree
+    classified, generated = invoke_llm_many("fallback", [
+        chat_messages(CLASSIFY_SYSTEM_PROMPT, prompt),
+        chat_messages(with_schema(SQL_SYSTEM_PROMPTS[guess]), with_resolved_mentions(prompt)),
+    ])
+    action = guess
+    if not isinstance(classified, Exception):
+        action = classified.content.strip().lower()
+        action = action if action in ACTION_STATEMENTS else 'view'
+    if action == guess and not isinstance(generated, Exception):
+        return action, strip_code_fence(generated.content)
+    return action, generate_sql_query(prompt, action)
+
+def resolve_batch(commands):
+    """Batch items for each command: templates and the SQL cache first, then
+    one LLM call for all remaining commands. Cached and generated SQL must
+    pass the SQL gate."""
+    items = []
+    for command in commands:
+        item = batch_item(command)
+        if "add task" in command.lower() or "create task" in command.lower():
+            item["error"] = "tasks are added through the New Task form or Bulk Import"
+        elif template := match_template(command, contact_directory.index):
+            item.update(zip(("action", "sql", "params"), template), source="template")
+        elif cached := cached_sql(command):
+            item.update(zip(("action", "sql"), cached), source="cache")
+        items.append(item)
+
+    pending = [item for item in items if not item["sql"] and not item["error"]]
+    if pending:
+        numbered = "\n".join(f"{i}. {with_resolved_mentions(item['command'])}" for i, item in enumerate(pending, 1))
+        try:
+            response = invoke_llm("batch", chat_messages(with_schema(BATCH_SYSTEM_PROMPT), numbered))
+            parsed = json.loads(strip_code_fence(response.content))
+        except Exception:
+            parsed = []
+        for item, entry in zip(pending, parsed if isinstance(parsed, list) else []):
+            if not isinstance(entry, dict):
+                continue
+            action = str(entry.get("action", "")).strip().lower()
+            sql_query = strip_code_fence(str(entry.get("sql", "")))
+            if action in ACTION_STATEMENTS and sql_query.upper().startswith(ACTION_STATEMENTS[action]):
+                item.update(action=action, sql=sql_query, source="llm")
+        for item in pending:
+            if not item["sql"]:
+                item["error"] = "no usable SQL from the LLM"
+
+    for item in items:
+        if item["source"] in ("cache", "llm"):
+            try:
+                item["sql"] = sql_validator.validate(item["sql"], item["action"])
+            except UnsafeSQLError as e:
+                item.update(sql=None, error=f"SQL not run: {e}")
+    return items
+
 def execute_query(sql_query: str, params=None):
     try:
-        conn = sqlite3.connect('test.db', check_same_thread=False)
-        cur = conn.cursor()
-        
-        if sql_query.strip().upper().startswith("SELECT"):
-            cur.execute(sql_query, params or ())
-            rows = cur.fetchall()
-            columns = [desc[0] for desc in cur.description] if cur.description else []
-            return columns, rows
-        else:
+        with tracer.span("execute_query") as span, db_pool.connection() as conn:
+            cur = conn.cursor()
+            
             cur.execute(sql_query, params or ())
-            affected_rows = cur.rowcount
-            conn.commit()
-            return None, affected_rows
+            if cur.description:
+                # Statements returning rows (SELECT, WITH ... SELECT)
+                rows = cur.fetchall()
+                columns = [desc[0] for desc in cur.description]
+                span.set(rows=len(rows))
+                return columns, rows
+            else:
+                affected_rows = cur.rowcount
+                conn.commit()
+                st.session_state.last_write = timer.time()
+                span.set(rows=affected_rows)
+                if is_contacts_write(sql_query):
+                    contact_directory.invalidate()
+                return None, affected_rows
             
     except sqlite3.Error as e:
         st.error(f"SQL error: {e}")
         return None, None
-    finally:
-        if conn:
-            conn.close()
-
-def classify_action(prompt: str) -> str:
-    """Classify user intent into add/view/update actions using LLM."""
-    system_prompt = (
-        "Classify the user's database request into one of: add, view, or update. "
-        "Respond ONLY with the action keyword. Rules:\n"
-        "- 'add' for creating new records (insert)\n"
-        "- 'view' for read operations (select)\n"
-        "- 'update' for modifying existing records\n"
-        "Examples:\n"
-        "User: Add new contact -> add\n"
-        "User: Show tasks -> view\n"
-        "User: Change email -> update\n"
-        "User: List contacts in NY -> view\n"
-        "User: Mark task 5 completed -> update"
-    )
-    
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=prompt)
-    ]
+
+def open_result(sql_query: str, params=None):
+    """Run a SELECT far enough to count its rows and return a result handle.
+
+    The handle (query, params, columns, total, page cursor) is what the chat
+    history keeps; rows are fetched again one page at a time when rendered.
+    total counts rows after the validator's MAX_ROWS cap, so capped is set
+    when it reaches the cap.
+    """
+    sql_query = sql_query.strip().rstrip(";")
+    params = list(params or ())
+    try:
+        with tracer.span("open_result") as span, snapshot_reader.connection(last_write()) as conn:
+            # Own lines, so a trailing -- comment cannot swallow the wrapper
+            cur = conn.execute(f"SELECT * FROM (\n{sql_query}\n) LIMIT 0", params)
+            columns = [desc[0] for desc in cur.description]
+            total = conn.execute(f"SELECT COUNT(*) FROM (\n{sql_query}\n)", params).fetchone()[0]
+            span.set(rows=total)
+        return {"sql": sql_query, "params": params, "columns": columns, "total": total,
+                "capped": total >= MAX_ROWS, "page": 0}
+    except sqlite3.Error as e:
+        st.error(f"SQL error: {e}")
+        return None
+
+def fetch_page(handle: dict, page_size: int = RESULT_PAGE_SIZE):
+    """Stream one page of a result handle with fetchmany.
+
+    Returns (rows, has_next_page), or (None, False) if the query fails.
+    """
+    try:
+        with tracer.span("fetch_page", page=handle["page"]) as span, snapshot_reader.connection(last_write()) as conn:
+            cur = conn.execute(
+                f"SELECT * FROM (\n{handle['sql']}\n) LIMIT ? OFFSET ?",
+                [*handle["params"], page_size + 1, handle["page"] * page_size])
+            rows = cur.fetchmany(page_size + 1)
+            span.set(rows=min(len(rows), page_size))
+        return rows[:page_size], len(rows) > page_size
+    except sqlite3.Error as e:
+        st.error(f"SQL error: {e}")
+        return None, False
+
+def turn_page(handle: dict, step: int):
+    """Move a result handle's page cursor (button callback)."""
+    handle["page"] = max(handle["page"] + step, 0)
+
+def render_result(handle: dict, key: str):
+    """Render the current page of a stored result with previous/next controls."""
+    rows, has_next = fetch_page(handle)
+    if rows is None:
+        return
+    with tracer.span("render_table", rows=len(rows)):
+        df = pd.DataFrame(rows, columns=handle["columns"])
+        st.markdown(df.to_markdown(index=False))
+    if handle["page"] or has_next:
+        start = handle["page"] * RESULT_PAGE_SIZE
+        nav = st.columns([1, 1, 4])
+        nav[0].button("◀ Previous", key=f"prev_{key}", disabled=handle["page"] == 0,
+                      on_click=turn_page, args=(handle, -1))
+        nav[1].button("Next ▶", key=f"next_{key}", disabled=not has_next,
+                      on_click=turn_page, args=(handle, 1))
+        total = f"the first {handle['total']}" if handle.get("capped") else handle["total"]
+        nav[2].caption(f"Rows {start + 1}–{start + len(rows)} of {total}")
+
+def classify_action(prompt: str, fast_path: bool = True) -> str:
+    """Classify user intent into add/view/update actions, using the LLM only for unclear prompts.
+
+    fast_path=False goes straight to the LLM, for callers that already ran
+    fast_classify this turn (so its hit rate counts each prompt once).
+    """
+    if fast_path and (action := fast_classify(prompt)):
+        return action
+
+    messages = chat_messages(CLASSIFY_SYSTEM_PROMPT, prompt)
     
     try:
-        response = llm.invoke(messages)
+        response = invoke_llm("classify", messages)
         action = response.content.strip().lower()
         return action if action in ['add', 'view', 'update'] else 'view'
     except Exception as e:
         st.error(f"Error classifying action: {e}")
         return 'view'
 
-def format_response(action: str, sql_query: str, rowcount: int = None, data: tuple = None):
-    """Format the response based on the action."""
+def format_response(action: str, sql_query: str, rowcount: int = None, capped: bool = False):
+    """Format the response based on the action; capped views say only the first rowcount are shown."""
     responses = {
         "add": lambda: f"✅ Successfully added {rowcount} record(s)",
         "update": lambda: f"✅ Successfully updated {rowcount} record(s)",
-        "view": lambda: (f"🔍 Found {len(data[1])} results:", data)
+        "view": lambda: (f"🔍 Found at least {rowcount} results, showing the first {rowcount}:" if capped
+                         else f"🔍 Found {rowcount} results:")
     }
     return responses[action]()
 
+TASK_SYSTEM_PROMPT = (
+    "Extract the parameters of a task to create from the user's request. Respond ONLY with one "
+    "JSON object using double quotes and these keys; leave out keys the request does not mention:\n"
+    + task_schema()
+    + "\n\nExample: Need to finish the client proposal ASAP, Vivek owns it, due Friday 5pm ->\n"
+    '{"title": "Complete client proposal", "priority": "High", "assigned_to": "Vivek", '
+    '"deadline": "Friday 5pm", "status": "In Progress"}'
+)
+
 def parse_task_parameters(prompt: str) -> dict:
-    """Extract task parameters from natural language input using LLM."""
-    system_prompt = """Extract task parameters from user input. Return JSON with:
-    - title: string
-    - description: string
-    - category: string (default: Work)
-    - priority: string (default: Medium)
-    - deadline: string (date/time in natural language)
-    - assigned_to: string (contact name)
-    - status: string (default: Not Started)
-    Ensure valid JSON format with double quotes. Example output: 
-    {"title": "Task", "priority": "High", "deadline": "tomorrow", "assigned_to": "John"}
-    "input": "Need to finish client proposal ASAP",
-  "output": {
-    "title": "Complete Client Proposal",
-    "priority": "High",
-    "status": "In Progress"}}"""
-    
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=prompt)
-    ]
-    
-    try:
-        response = llm.invoke(messages)
-        parsed = json.loads(response.content.strip())
-        # Ensure essential fields exist
-        return {
-            "title": parsed.get("title", ""),
-            "priority": parsed.get("priority", "Medium"),
-            "deadline": parsed.get("deadline", ""),
-            "assigned_to": parsed.get("assigned_to", ""),
-            "category": parsed.get("category", "Work"),
-            "status": parsed.get("status", "Not Started"),
-            "description": parsed.get("description", "")
-        }
-    except Exception as e:
-        st.error(f"Parameter parsing error: {str(e)}")
-        return {}
+    """Task form values extracted from natural language input.
+
+    Uses a cached extraction for a repeated prompt. Otherwise the LLM is
+    asked for a JSON object in JSON mode; a damaged reply is repaired
+    locally, and only a reply with no usable object costs a second call.
+    """
+    task = task_params_cache.get(prompt)
+    if task is None:
+        for attempt in range(2):
+            system_prompt = TASK_SYSTEM_PROMPT
+            if attempt:
+                system_prompt += "\n\nYour previous reply had no JSON object with a title. Reply with the JSON object only."
+            try:
+                response = invoke_llm("parse_task", chat_messages(system_prompt, prompt),
+                                      response_format={"type": "json_object"})
+            except Exception as e:
+                st.error(f"Parameter parsing error: {str(e)}")
+                return {}
+            parsed = repair_json(response.content)
+            if parsed is not None:
+                task = TaskParameters.from_dict(parsed)
+                if task.title:
+                    break
+        if task is None:
+            st.error("Parameter parsing error: the model did not return task parameters")
+            return {}
+        if task.title:
+            task_params_cache.put(prompt, task)
+    return task.as_prefill(prompt)
 
 # Streamlit UI Setup
 st.set_page_config(page_title="DB Manager", layout="wide")
@@ -234,7 +542,8 @@ if 'target_page' not in st.session_state:
 if st.session_state.target_page != "🏠 Home":
     page = st.session_state.target_page
 else:
-    page = st.sidebar.radio("Go to", ["🏠 Home", "📝 New Contact", "✅ New Task", "🔍 Deep Search"])
+    page = st.sidebar.radio("Go to", ["🏠 Home", "📊 Dashboard", "📝 New Contact", "✅ New Task",
+                                     "🔍 Deep Search", "📥 Bulk Import", "📈 Traces"])
 # Home Page
 if page == "🏠 Home":
     
@@ -244,48 +553,178 @@ if page == "🏠 Home":
     
     st.header("💬 Personal Chat Assistant")
 
-    # Display chat history
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    # The previous turn ended in st.rerun(); attach the rerun and the render
+    # of its answer to that turn's trace
+    pending = st.session_state.pop("pending_render", None)
+    if pending:
+        trace_id, turn_span_id, rerun_at = pending
+        tracer.record(trace_id, turn_span_id, "rerun", rerun_at, timer.time() - rerun_at)
+
+    # Display chat history; only the visible tail is rendered
+    chat_history = st.session_state.messages
+    with tracer.resume(trace_id, turn_span_id, "render") if pending else nullcontext():
+        if chat_history.has_earlier():
+            st.button("⬆️ Load earlier messages", on_click=chat_history.load_earlier)
+        elif chat_history.archived:
+            st.button("⬇️ Hide earlier messages", on_click=chat_history.hide_earlier)
+        for seq, message in chat_history.visible():
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+                if "result" in message:
+                    render_result(message["result"], key=str(seq))
+                if "batch" in message:
+                    st.dataframe(pd.DataFrame(message["batch"]), hide_index=True)
 
     # Main chat logic
     if prompt := st.chat_input("What would you like to do?"):
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        
-        if "add task" in prompt.lower() or "create task" in prompt.lower():
-            # Parse parameters and redirect to task page
-            params = parse_task_parameters(prompt)
-            st.session_state.prefill_task = params
-            st.session_state.target_page = "✅ New Task"
-            st.rerun()
-        else:
-            # Classify user intent
-            action_type = classify_action(prompt)
+        with tracer.trace("chat_turn", prompt=prompt[:200]) as turn:
+            # Add user message to chat history
+            st.session_state.messages.append({"role": "user", "content": prompt})
         
-            # Generate SQL query based on detected action
-            sql_query = generate_sql_query(prompt, action_type)
+            commands = split_commands(prompt)
+            if "add task" in prompt.lower() or "create task" in prompt.lower():
+                # Parse parameters and redirect to task page
+                turn.set(route="task_prefill")
+                params = parse_task_parameters(prompt)
+                st.session_state.prefill_task = params
+                st.session_state.target_page = "✅ New Task"
+                st.rerun()
+            elif is_batch(commands):
+                # Batch mode: every command runs in one all-or-nothing transaction
+                turn.set(route="batch", action="batch", commands=len(commands))
+                items = resolve_batch(commands)
+                with tracer.span("batch_execute", items=len(items)) as span:
+                    results, committed = run_batch(items, db_pool)
+                    span.set(committed=committed)
+                if committed:
+                    st.session_state.last_write = timer.time()
+                    if any(is_contacts_write(item["sql"]) for item in items):
+                        contact_directory.invalidate()
+                    for item in items:
+                        if item["source"] == "llm" and cacheable(item["command"]):
+                            sql_cache.put(item["command"], item["action"], item["sql"])
+                    response = f"✅ Ran {len(items)} commands in one transaction"
+                elif failed := next((r for r in results if r["status"].startswith("error")), None):
+                    response = (f"❌ Batch rolled back, nothing was changed: command {failed['#']} "
+                                f"({failed['command']}) failed")
+                else:
+                    reason = results[0]["status"].split(": ", 1)[-1]
+                    response = f"❌ Batch not run, nothing was changed: {reason}"
+                st.session_state.messages.append({"role": "assistant", "content": response, "batch": results})
+                st.session_state.pending_render = (turn.trace_id, turn.span_id, timer.time())
+                st.rerun()
+            else:
+                # Dependency questions are answered from the in-memory task graph,
+                # task counts from the summary tables; other common request
+                # shapes become parameterized SQL without the LLM
+                with tracer.span("match_template") as span:
+                    template = (match_dependency_question(prompt)
+                                or match_dashboard_question(prompt)
+                                or match_template(prompt, contact_directory.index))
+                    span.set(hit=template is not None)
+                query_params = None
+                cached = None
+                if template:
+                    action_type, sql_query, query_params = template
+                    st.session_state.llm_stats["template_hits"] += 1
+                    route = "template"
+                # Reuse SQL generated for the same (or a paraphrased) request
+                elif cached := cached_sql(prompt):
+                    action_type, sql_query = cached
+                    route = "cache"
+                elif action_type := fast_classify(prompt):
+                    # Intent is obvious, only the SQL needs the LLM
+                    sql_query = generate_sql_query(prompt, action_type)
+                    route = "fast_path"
+                else:
+                    # Classify user intent and generate SQL in one round-trip
+                    action_type, sql_query = classify_and_generate(prompt)
+                    route = "llm"
+                turn.set(route=route, action=action_type)
         
-            if sql_query:
-                # st.session_state.messages.append({"role": "assistant", "content": f"Generated SQL:\n```sql\n{sql_query}\n```"})  # Debugging
+                if sql_query and not template:
+                    # Generated or cached SQL is checked before it runs
+                    with tracer.span("validate_sql") as span:
+                        try:
+                            sql_query = sql_validator.validate(sql_query, action_type, query_params)
+                        except UnsafeSQLError as e:
+                            span.set(rejected=str(e))
+                            turn.set(rejected=str(e))
+                            st.session_state.messages.append(
+                                {"role": "assistant", "content": f"❌ The generated SQL was not run: {e}"})
+                            st.session_state.pending_render = (turn.trace_id, turn.span_id, timer.time())
+                            st.rerun()
+
+                if sql_query:
+                    # st.session_state.messages.append({"role": "assistant", "content": f"Generated SQL:\n```sql\n{sql_query}\n```"})  # Debugging
                 
-                # Execute query
-                columns, result = execute_query(sql_query)
-
-                # Format response
-                if action_type == "view" and columns:
-                    response_text = format_response(action_type, sql_query, data=(columns, result))
-                    df = pd.DataFrame(result, columns=columns)
-                    response = f"{response_text[0]}\n\n{df.to_markdown(index=False)}"
-                elif action_type in ["add", "update"]:
-                    response = format_response(action_type, sql_query, rowcount=result)
-                else:
-                    response = "❌ No results found or invalid query"
+                    with tracer.span("plan_check") as span:
+                        span.set(full_scans=", ".join(plan_advisor.check(sql_query, query_params)) or None)
 
-                # Add assistant response
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                st.rerun()
+                    # Execute query; SELECTs only keep a handle to page through later
+                    result_handle = None
+                    if action_type == "view":
+                        result_handle = open_result(sql_query, query_params)
+                        result = result_handle["total"] if result_handle else None
+                    else:
+                        _, result = execute_query(sql_query, query_params)
+                    turn.set(rows=result)
+                    if not template and not cached and result is not None and cacheable(prompt):
+                        with tracer.span("sql_cache_put"):
+                            sql_cache.put(prompt, action_type, sql_query)
+
+                    # Format response
+                    if result_handle or action_type in ["add", "update"]:
+                        response = format_response(action_type, sql_query, rowcount=result,
+                                                   capped=bool(result_handle and result_handle["capped"]))
+                    else:
+                        response = "❌ No results found or invalid query"
+
+                    # Add assistant response
+                    message = {"role": "assistant", "content": response}
+                    if result_handle:
+                        message["result"] = result_handle
+                    st.session_state.messages.append(message)
+                    st.session_state.pending_render = (turn.trace_id, turn.span_id, timer.time())
+                    st.rerun()
+
+# Dashboard Page
+elif page == "📊 Dashboard":
+    st.header("📊 Task Dashboard")
+    st.caption("Read from summary tables that triggers keep current on every task change.")
+
+    with db_pool.connection() as conn:
+        counts = pd.DataFrame(status_priority_counts(conn), columns=["Status", "Priority", "Tasks"])
+        buckets = pd.DataFrame(deadline_buckets(conn), columns=["Deadline", "Category", "Tasks"])
+        busiest = pd.DataFrame(workload(conn), columns=["Assignee", "Status", "Tasks"])
+
+    if counts.empty:
+        st.info("No tasks yet.")
+    else:
+        by_bucket = buckets.groupby("Deadline", sort=False)["Tasks"].sum()
+        cols = st.columns(4)
+        cols[0].metric("Open", f"{buckets['Tasks'].sum():,}")
+        cols[1].metric("Overdue", f"{by_bucket.get('Overdue', 0):,}")
+        cols[2].metric("Due today", f"{by_bucket.get('Due today', 0):,}")
+        cols[3].metric("Due in 7 days", f"{by_bucket.get('Due in 7 days', 0):,}")
+
+        chart_cols = st.columns(2)
+        with chart_cols[0]:
+            st.subheader("Status × priority")
+            st.bar_chart(counts.fillna("None").pivot_table(
+                index="Status", columns="Priority", values="Tasks", aggfunc="sum", fill_value=0))
+        with chart_cols[1]:
+            st.subheader("Open tasks by deadline")
+            st.bar_chart(buckets.fillna("None").pivot_table(
+                index="Deadline", columns="Category", values="Tasks", aggfunc="sum", fill_value=0,
+                sort=False))
+
+        st.subheader("Busiest assignees")
+        st.dataframe(busiest.pivot_table(index="Assignee", columns="Status", values="Tasks",
+                                         aggfunc="sum", fill_value=0)
+                     .assign(Open=lambda df: df.drop(columns=["Completed", "Reviewed & Approved"],
+                                                     errors="ignore").sum(axis=1))
+                     .sort_values("Open", ascending=False))
 
 # New Contact Page
 elif page == "📝 New Contact":
@@ -326,18 +765,31 @@ elif page == "✅ New Task":
     
     # st.write("Debug Prefill:", st.session_state.get('prefill_task', {}))
     
-    # Get contacts for assignment
-    conn = sqlite3.connect('test.db', check_same_thread=False)
-    cur = conn.cursor()
-    cur.execute("SELECT ID, NAME FROM CONTACTS ORDER BY NAME")
-    contacts = cur.fetchall()
-    contact_names = [name for _, name in contacts]
-    contact_dict = {name: id for id, name in contacts}
-    conn.close()
-    
     # Check for prefill parameters
     prefill = st.session_state.get('prefill_task', {})
     
+    # Contact search sits outside the form so it filters on every keystroke;
+    # only one page of matches is sent to the assignee pickers
+    search_cols = st.columns([3, 1])
+    with search_cols[0]:
+        contact_search = st.text_input("🔎 Find contacts", placeholder="Type part of a name")
+    _, contact_total = contact_directory.search(contact_search, page_size=CONTACT_PAGE_SIZE)
+    with search_cols[1]:
+        page_count = max(1, -(-contact_total // CONTACT_PAGE_SIZE))
+        contact_page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count,
+                                       value=1, key=f"contact_page_{contact_search}")
+    page_contacts, _ = contact_directory.search(contact_search, contact_page - 1, CONTACT_PAGE_SIZE)
+    contact_ids = [contact_id for contact_id, _ in page_contacts]
+
+    def picker_options(preferred_name):
+        """Current page of contact IDs, with a prefilled contact kept first."""
+        if not preferred_name:
+            return contact_ids
+        contact = contact_directory.index.find(preferred_name)
+        if not contact:
+            return contact_ids
+        return [contact[0]] + [contact_id for contact_id in contact_ids if contact_id != contact[0]]
+    
     with st.form("task_form", clear_on_submit=True):
         # Basic Info
         col1, col2 = st.columns([2, 1])
@@ -347,73 +799,42 @@ elif page == "✅ New Task":
                                       value=prefill.get('description', ''),
                                       height=100)
         with col2:
-            # Handle natural language deadlines
-            deadline_input = prefill.get('deadline', '')
-            default_date = datetime.today()
+            # Natural language deadlines ("friday 5pm", "end of month"), never before today
+            default_deadline = parse_deadline(prefill.get('deadline', ''))
+            if default_deadline is None or default_deadline < datetime.now():
+                default_deadline = datetime.now()
 
-            if deadline_input:
-                try:
-                    # Use simple natural date parsing
-                    if 'tomorrow' in deadline_input.lower():
-                        default_date += timedelta(days=1)
-                    elif 'next week' in deadline_input.lower():
-                        default_date += timedelta(weeks=1)
-                    elif 'in 2 days' in deadline_input.lower():
-                        default_date += timedelta(days=2)
-                except:
-                    pass
-
-            
             deadline_date = st.date_input("Deadline Date*", 
                                         min_value=datetime.today(),
-                                        value=default_date)
-            deadline_time = st.time_input("Deadline Time*", datetime.now().time())
+                                        value=default_deadline.date())
+            deadline_time = st.time_input("Deadline Time*", default_deadline.time())
         
         # Task Metadata
         st.subheader("Task Details", divider="rainbow")
         cols = st.columns(3)
         with cols[0]:
-            category = st.selectbox("Category", ["Work", "Personal", "Project", "Other"],
-                                  index=["Work", "Personal", "Project", "Other"].index(
-                                      prefill.get('category', 'Work')))
+            category = st.selectbox("Category", TASK_CATEGORIES,
+                                  index=TASK_CATEGORIES.index(prefill.get('category', 'Work')))
             priority = st.select_slider("Priority*", options=["Low", "Medium", "High"],
                                       value=prefill.get('priority', 'Medium'))
             expected_outcome = st.text_input("Expected Outcome", 
                                            value=prefill.get('expected_outcome', ''),
                                            placeholder="e.g., Complete project setup")
         with cols[1]:
-            # Safe index handling for assigned_to
-            assigned_to_index = 0
-            if prefill.get('assigned_to'):
-                # Case-insensitive match
-                lower_names = [name.lower() for name in contact_names]
-                try:
-                    assigned_to_index = lower_names.index(prefill['assigned_to'].lower())
-                except ValueError:
-                    assigned_to_index = 0
-            
+            # Prefilled assignee (case-insensitive match) is listed first
             assigned_to = st.selectbox("Assign To*", 
-                                     options=contact_names,
-                                     index=assigned_to_index)
+                                     options=picker_options(prefill.get('assigned_to')),
+                                     format_func=contact_directory.name)
             
             # Safe status index
-            status_index = ["Not Started", "In Progress", "On Hold", "Completed"].index(
-                prefill.get('status', 'Not Started'))
+            status_index = NEW_TASK_STATUSES.index(prefill.get('status', 'Not Started'))
             status = st.selectbox("Status*", 
-                                ["Not Started", "In Progress", "On Hold", "Completed"],
+                                NEW_TASK_STATUSES,
                                 index=status_index)
             
-            # Safe support contact index
-            support_index = 0
-            if prefill.get('support_contact'):
-                try:
-                    support_index = contact_names.index(prefill['support_contact'])
-                except ValueError:
-                    support_index = 0
-            
             support_contact = st.selectbox("Support Contact", 
-                                          options=contact_names,
-                                          index=support_index)
+                                          options=picker_options(prefill.get('support_contact')),
+                                          format_func=contact_directory.name)
         with cols[2]:
             estimated_time = st.text_input("Estimated Time", 
                                          value=prefill.get('estimated_time', ''),
@@ -457,14 +878,14 @@ elif page == "✅ New Task":
                         priority,
                         expected_outcome.strip(),
                         deadline,
-                        contact_dict[assigned_to],
+                        assigned_to,
                         dependencies.strip(),
                         required_resources.strip(),
                         estimated_time.strip(),
                         instructions.strip(),
                         review_process.strip(),
                         performance_metrics.strip(),
-                        contact_dict.get(support_contact, None),
+                        support_contact,
                         notes.strip(),
                         status
                     )
@@ -503,42 +924,33 @@ elif page == "🔍 Deep Search":
         if submitted:
             with st.spinner("Analyzing your query..."):
                 try:
-                    # Invoke the SQL agent
-                    response = agent_executor.invoke({"input": query})
-                    
-                    # Display the results
-                    st.subheader("Analysis Results", divider="rainbow")
-                    
-                    # Check if the response contains the expected output
-                    if "output" in response:
-                        st.markdown(f"**Result:**\n{response['output']}")
-                        
-                        # If the query is a SELECT, try to fetch and display the results
-                        if "SELECT" in response['output'].upper():
-                            conn = sqlite3.connect('test.db', check_same_thread=False)
-                            cur = conn.cursor()
-                            cur.execute(response['output'])
-                            rows = cur.fetchall()
-                            columns = [desc[0] for desc in cur.description]
-                            conn.close()
-                            
-                            if rows:
-                                df = pd.DataFrame(rows, columns=columns)
-                                st.dataframe(df)
-                                st.download_button(
-                                    "📥 Export Results",
-                                    df.to_csv(index=False),
-                                    "results.csv",
-                                    mime="text/csv"
-                                )
-                            else:
-                                st.warning("No results found.")
-                    else:
-                        st.error("The agent did not return a valid response.")
-                    
-                    st.success("Analysis completed!")
+                    # Agent runs are reused while CONTACTS/TASKS are unchanged
+                    from deep_search import get_agent_run_cache, run_agent
+                    run_cache = get_agent_run_cache()
+                    with tracer.trace("deep_search", prompt=query[:200]) as turn:
+                        run_key = run_cache.key(query)
+                        run = run_cache.get(run_key)
+                        turn.set(route="cache" if run else "agent")
+                        if run is None:
+                            # Invoke the SQL agent (built on first use) on the
+                            # snapshot, and cache the run under the snapshot's counter
+                            agent_path = snapshot_reader.ensure_fresh(last_write())
+                            agent_key = run_cache.key(query, agent_path)
+                            agent_executor = get_agent_executor(agent_path)
+                            with tracer.span("agent_run") as span:
+                                run = get_llm_gateway().run(lambda: run_agent(agent_executor, query))
+                                span.set(iterations=run["iterations"])
+                            run_cache.put(agent_key, run)
+                            if run["sql"]:
+                                with tracer.span("plan_check"):
+                                    plan_advisor.check(run["sql"])
+                            st.session_state.deep_search = (run, False)
+                        else:
+                            st.session_state.deep_search = (run, True)
+                        turn.set(rows=len(run["rows"]))
                 
                 except Exception as e:
+                    st.session_state.pop("deep_search", None)
                     st.error(f"Search failed: {str(e)}")
                     st.markdown("**Troubleshooting Tips:**")
                     st.markdown("""
@@ -547,6 +959,139 @@ elif page == "🔍 Deep Search":
                     - Check for typos in contact/task names
                     """)
 
+    # Results render outside the form so they can offer a download button
+    if "deep_search" in st.session_state:
+        run, from_cache = st.session_state.deep_search
+        if from_cache:
+            st.caption(f"⚡ Answered from a previous run ({run['iterations']} agent iterations saved)")
+        else:
+            st.caption(f"⏱️ {run['iterations']} agent iterations · {run['seconds']:.1f}s")
+
+        # Display the results
+        st.subheader("Analysis Results", divider="rainbow")
+        
+        # Check if the response contains the expected output
+        if run["output"]:
+            st.markdown(f"**Result:**\n{run['output']}")
+            
+            # Rows of the agent's last query, captured from its tool call
+            if run["sql"]:
+                with st.expander("SQL used"):
+                    st.code(run["sql"], language="sql")
+                if run["rows"]:
+                    df = pd.DataFrame(run["rows"])
+                    st.dataframe(df)
+                    st.download_button(
+                        "📥 Export Results",
+                        df.to_csv(index=False),
+                        "results.csv",
+                        mime="text/csv"
+                    )
+                else:
+                    st.warning("No results found.")
+            st.success("Analysis completed!")
+        else:
+            st.error("The agent did not return a valid response.")
+
+    # Per-question agent cost for recent runs
+    from deep_search import get_agent_run_cache
+    recent_runs = list(get_agent_run_cache().runs)
+    if recent_runs:
+        with st.expander("Recent agent runs"):
+            st.dataframe(pd.DataFrame(reversed(recent_runs)))
+
+# Bulk Import Page
+elif page == "📥 Bulk Import":
+    st.header("📥 Bulk Import")
+    st.caption("CSV with a header row, or JSONL with one record per line. Contacts are matched on "
+               "phone; tasks with an ID column update that task, others are added. Assignees "
+               "may be given as contact ID or phone.")
+
+    import_table = st.radio("Import into", ["contacts", "tasks"], format_func=str.title, horizontal=True)
+    upload = st.file_uploader("File", type=["csv", "jsonl", "ndjson"])
+    if upload is not None and st.button("⬆️ Import"):
+        with st.spinner("Importing..."):
+            report = import_upload(upload, import_table, pool=db_pool)
+        if report["written"]:
+            st.session_state.last_write = timer.time()
+        if import_table == "contacts" and report["written"]:
+            contact_directory.invalidate()
+
+        cols = st.columns(4)
+        cols[0].metric("Written", f"{report['written']:,}")
+        cols[1].metric("Unchanged", f"{report['unchanged']:,}")
+        cols[2].metric("Rejected", f"{report['rejected']:,}")
+        cols[3].metric("Rows/sec", f"{report['rows_per_sec']:,.0f}")
+        if report["errors"]:
+            st.warning(f"{report['rejected']} records were rejected"
+                       + (f" (first {len(report['errors'])} shown)" if report["rejected"] > len(report["errors"]) else ""))
+            st.dataframe(pd.DataFrame(report["errors"], columns=["Line", "Error"]), hide_index=True)
+        else:
+            st.success(f"Imported in {report['seconds']:.2f}s")
+
+# Traces Page
+elif page == "📈 Traces":
+    st.header("📈 Chat Turn Traces")
+    st.caption("End-to-end time runs from the prompt to the end of the render that shows its answer, "
+               "including the Streamlit rerun in between.")
+
+    windows = {"Last hour": 3600, "Last day": 86400, "Last week": 7 * 86400, "All": None}
+    window = st.radio("Window", list(windows), index=1, horizontal=True)
+    since = timer.time() - windows[window] if windows[window] else 0.0
+    turns = pd.DataFrame(tracer.turns(since))
+    if turns.empty:
+        st.info("No traced turns yet.")
+    else:
+        totals = turns["total_seconds"]
+        cols = st.columns(4)
+        cols[0].metric("Turns", f"{len(turns):,}")
+        cols[1].metric("p50", f"{totals.quantile(0.5) * 1000:,.0f} ms")
+        cols[2].metric("p95", f"{totals.quantile(0.95) * 1000:,.0f} ms")
+        cols[3].metric("Max", f"{totals.max() * 1000:,.0f} ms")
+
+        def latency_histogram(seconds: pd.Series, bins: int = 20):
+            """Bar chart of counts per latency bucket, labelled in ms."""
+            counts = pd.cut(seconds * 1000, bins=min(bins, max(seconds.nunique(), 1))).value_counts(sort=False)
+            st.bar_chart(pd.Series(counts.values, index=[f"{interval.right:,.0f}" for interval in counts.index]),
+                         x_label="ms (bucket upper bound)", y_label="count")
+
+        st.subheader("End-to-end latency")
+        latency_histogram(totals)
+
+        stages = pd.DataFrame(tracer.stage_durations(since), columns=["stage", "seconds"])
+        if not stages.empty:
+            st.subheader("Stages")
+            summary = stages.groupby("stage")["seconds"].agg(
+                calls="count",
+                p50=lambda x: x.quantile(0.5) * 1000,
+                p95=lambda x: x.quantile(0.95) * 1000,
+                total=lambda x: x.sum(),
+            ).sort_values("total", ascending=False)
+            summary["share"] = summary["total"] / summary["total"].sum()
+            st.dataframe(summary.drop(columns="total"), column_config={
+                "p50": st.column_config.NumberColumn("p50 ms", format="%.1f"),
+                "p95": st.column_config.NumberColumn("p95 ms", format="%.1f"),
+                "share": st.column_config.ProgressColumn("share of time", format="%.0f%%", min_value=0, max_value=1),
+            })
+            stage = st.selectbox("Stage histogram", summary.index)
+            latency_histogram(stages.loc[stages["stage"] == stage, "seconds"])
+
+        st.subheader("Slowest turns")
+        slowest = turns.nlargest(20, "total_seconds")
+        slowest["start"] = pd.to_datetime(slowest["start"], unit="s")
+        shown = ["start", "name", "prompt", "route", "action", "rows", "total_seconds", "turn_seconds", "spans"]
+        st.dataframe(slowest[[c for c in shown if c in slowest]], hide_index=True)
+        trace_id = st.selectbox("Spans of", slowest["trace_id"],
+                                format_func=lambda t: slowest.loc[slowest["trace_id"] == t, "prompt"].iloc[0])
+        spans = pd.DataFrame(tracer.spans(trace_id))
+        spans["offset_ms"] = (spans["start"] - spans["start"].min()) * 1000
+        spans["ms"] = spans["seconds"] * 1000
+        spans["attrs"] = spans["attrs"].map(lambda attrs: json.dumps(attrs) if attrs else "")
+        st.dataframe(spans[["name", "offset_ms", "ms", "attrs"]], hide_index=True, column_config={
+            "offset_ms": st.column_config.NumberColumn("starts at ms", format="%.1f"),
+            "ms": st.column_config.NumberColumn("ms", format="%.1f"),
+        })
+
 # Sidebar Examples Guide
 st.sidebar.markdown("### Examples Guide")
 st.sidebar.markdown("""
@@ -558,12 +1103,71 @@ st.sidebar.markdown("""
 - "Show contacts from Delhi"
 - "List ongoing tasks for John"
 - "Display completed tasks"
+- "What is blocked by Database Setup?"
+- "Critical path to Deployment"
+- "How many high priority tasks are in progress per person?"
+- "Overdue tasks by category"
+- "Show high priority tasks due before Friday"
 
 **Update Data Examples:**
 - "Change John's email to new@email.com"
 - "Mark task 5 as completed"
 - "Update task 3's due date to tomorrow"
+- "Postpone task 4 to next Friday 5pm"
+
+**Batch Examples** (one transaction, all or nothing):
+- "Mark tasks 3, 5, 9 completed"
+- Several changes, one per line (Shift+Enter), each starting with a verb
 """)
 
+st.sidebar.markdown("### LLM Stats")
+st.sidebar.caption(
+    f"Combined calls: {st.session_state.llm_stats['fused_calls']} · "
+    f"Two-call fallbacks: {st.session_state.llm_stats['fused_fallbacks']} · "
+    f"Template answers: {st.session_state.llm_stats['template_hits']}"
+)
+# Time a fast-path hit saves: the classification share of an LLM turn
+llm_stats = st.session_state.llm_stats
+classify_cost = average_llm_latency("classify")
+if classify_cost is None and average_llm_latency("fused") and average_llm_latency("generate"):
+    classify_cost = average_llm_latency("fused") - average_llm_latency("generate")
+fast_path_total = llm_stats["fast_path_hits"] + llm_stats["fast_path_misses"]
+if fast_path_total:
+    fast_path_cost = llm_stats["fast_path_seconds"] / fast_path_total
+    saved = f"{(classify_cost - fast_path_cost) * 1000:.0f} ms" if classify_cost else "n/a"
+    st.sidebar.caption(
+        f"Intent fast path: {llm_stats['fast_path_hits'] / fast_path_total:.0%} hit rate · "
+        f"{fast_path_cost * 1e6:.0f} µs per prompt · ~{saved} saved per hit"
+    )
+st.sidebar.caption(
+    f"SQL cache: {sql_cache.stats['hits']} hits · {sql_cache.stats['near_hits']} near hits · "
+    f"{sql_cache.stats['misses']} misses · {len(sql_cache)} entries"
+)
+st.sidebar.caption(
+    f"Task parse cache: {task_params_cache.stats['hits']} hits · "
+    f"{task_params_cache.stats['misses']} misses · {len(task_params_cache)} entries"
+)
+st.sidebar.caption(
+    f"SQL gate: {sql_validator.stats['checked']} checked · {sql_validator.stats['cached']} cached · "
+    f"{sql_validator.stats['rejected']} rejected"
+)
+snapshot_age = snapshot_reader.age
+if not snapshot_reader.enabled:
+    snapshot_state = "off"
+else:
+    snapshot_state = "not taken yet" if snapshot_age is None else f"{snapshot_age:.0f}s old"
+st.sidebar.caption(
+    f"Read snapshot: {snapshot_state} · "
+    f"{snapshot_reader.stats['snapshot_reads']} snapshot reads · "
+    f"{snapshot_reader.stats['primary_reads']} primary reads · {snapshot_reader.stats['refreshes']} refreshes"
+)
+st.sidebar.caption(
+    f"Query plans: {plan_advisor.stats['checked']} checked · "
+    f"{plan_advisor.stats['full_scans']} with full scans"
+)
+if plan_advisor.warnings:
+    with st.sidebar.expander("Full table scans"):
+        st.dataframe(pd.DataFrame(reversed(plan_advisor.warnings)))
+
 if st.button("Push Database Changes to GitHub"):
     print('hello')
@@ -0,0 +1,282 @@
+import sqlite3
+
+from db import DB_PATH
+
+# Schema changes applied on top of the tables created by sql2.py. Each entry
+# runs once, tracked through PRAGMA user_version, so apply_migrations() is
+# safe to call on every start.
+_CHANGE_TRIGGERS = "\n".join(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_CHANGE_{event} AFTER {event} ON {table}
+    BEGIN
+        UPDATE DB_META SET VALUE = VALUE + 1 WHERE KEY = 'change_counter';
+    END;"""
+    for table in ("CONTACTS", "TASKS")
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+# External-content FTS5 indexes over the free-text columns; the rowid of
+# each index row is the ID of the CONTACTS/TASKS row it mirrors
+_FTS_COLUMNS = {
+    "CONTACTS": ("NAME", "ADDRESS"),
+    "TASKS": ("TITLE", "DESCRIPTION", "EXPECTED_OUTCOME", "INSTRUCTIONS", "NOTES"),
+}
+
+
+def _fts_script(table, columns):
+    listed = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    return f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {table}_FTS USING fts5(
+        {listed}, content='{table}', content_rowid='ID',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS {table}_FTS_INSERT AFTER INSERT ON {table}
+    BEGIN
+        INSERT INTO {table}_FTS (rowid, {listed}) VALUES (new.ID, {new});
+    END;
+    CREATE TRIGGER IF NOT EXISTS {table}_FTS_DELETE AFTER DELETE ON {table}
+    BEGIN
+        INSERT INTO {table}_FTS ({table}_FTS, rowid, {listed}) VALUES ('delete', old.ID, {old});
+    END;
+    CREATE TRIGGER IF NOT EXISTS {table}_FTS_UPDATE AFTER UPDATE OF {listed} ON {table}
+    BEGIN
+        INSERT INTO {table}_FTS ({table}_FTS, rowid, {listed}) VALUES ('delete', old.ID, {old});
+        INSERT INTO {table}_FTS (rowid, {listed}) VALUES (new.ID, {new});
+    END;
+    INSERT INTO {table}_FTS ({table}_FTS) VALUES ('rebuild');"""
+
+
+# Titles listed in one task's DEPENDENCIES text ("Project Planning, Testing")
+# resolved to task IDs, for the sync triggers; {source} is the text and
+# {task_id} the owning task
+_DEPENDENCY_EDGES = """
+    SELECT {task_id}, MIN(D.ID) FROM (
+        WITH RECURSIVE SPLIT (ITEM, REST) AS (
+            SELECT '', {source} || ','
+            UNION ALL
+            SELECT TRIM(SUBSTR(REST, 1, INSTR(REST, ',') - 1)), SUBSTR(REST, INSTR(REST, ',') + 1)
+            FROM SPLIT WHERE REST != ''
+        )
+        SELECT ITEM FROM SPLIT WHERE ITEM != ''
+    ) S JOIN TASKS D ON LOWER(D.TITLE) = LOWER(S.ITEM)
+    WHERE D.ID != {task_id}
+    GROUP BY S.ITEM"""
+
+_DEPENDENCY_COUNTER_TRIGGERS = "\n".join(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS TASK_DEPENDENCIES_CHANGE_{event} AFTER {event} ON TASK_DEPENDENCIES
+    BEGIN
+        UPDATE DB_META SET VALUE = VALUE + 1 WHERE KEY = 'dependency_counter';
+    END;"""
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+# CONTACTS changes alone, for caches of SQL that embeds contact IDs
+_CONTACT_COUNTER_TRIGGERS = "\n".join(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS CONTACTS_COUNTER_{event} AFTER {event} ON CONTACTS
+    BEGIN
+        UPDATE DB_META SET VALUE = VALUE + 1 WHERE KEY = 'contact_counter';
+    END;"""
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+
+# Task counts kept current by triggers: per assignee x status x priority,
+# and per deadline day x status x priority x category. NULL priorities and
+# categories and unreadable deadlines are stored as '' so they can be keys.
+_SUMMARY_KEYS = {
+    "TASK_COUNTS": {
+        "ASSIGNED_TO": "{row}.ASSIGNED_TO",
+        "STATUS": "{row}.STATUS",
+        "PRIORITY": "IFNULL({row}.PRIORITY, '')",
+    },
+    "TASK_DUE_COUNTS": {
+        "DUE_DAY": "IFNULL(DATE({row}.DEADLINE), '')",
+        "STATUS": "{row}.STATUS",
+        "PRIORITY": "IFNULL({row}.PRIORITY, '')",
+        "CATEGORY": "IFNULL({row}.CATEGORY, '')",
+    },
+}
+
+
+def _summary_add(row):
+    return "\n            ".join(
+        f"INSERT INTO {table} ({', '.join(keys)}, N) "
+        f"VALUES ({', '.join(expr.format(row=row) for expr in keys.values())}, 1) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET N = N + 1;"
+        for table, keys in _SUMMARY_KEYS.items())
+
+
+def _summary_remove(row):
+    statements = []
+    for table, keys in _SUMMARY_KEYS.items():
+        match = " AND ".join(f"{key} = {expr.format(row=row)}" for key, expr in keys.items())
+        statements.append(f"UPDATE {table} SET N = N - 1 WHERE {match};")
+        statements.append(f"DELETE FROM {table} WHERE {match} AND N <= 0;")
+    return "\n            ".join(statements)
+
+
+def summary_refresh(where: str) -> list:
+    """Statements adding the TASKS rows matching `where` (alias T) to the summaries."""
+    statements = []
+    for table, keys in _SUMMARY_KEYS.items():
+        exprs = ", ".join(expr.format(row="T") for expr in keys.values())
+        statements.append(
+            f"INSERT INTO {table} ({', '.join(keys)}, N) "
+            f"SELECT {exprs}, COUNT(*) FROM TASKS T WHERE {where} GROUP BY {exprs} "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET N = N + excluded.N")
+    return statements
+
+
+MIGRATIONS = [
+    (1, "change counter", f"""
+        CREATE TABLE IF NOT EXISTS DB_META (
+            KEY TEXT PRIMARY KEY,
+            VALUE INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO DB_META (KEY, VALUE) VALUES ('change_counter', 0);
+        {_CHANGE_TRIGGERS}
+    """),
+    # Filters the chat path and the SQL agent generate: name lookups are
+    # case-insensitive, task lists filter on assignee/status/deadline
+    (2, "secondary indexes", """
+        CREATE INDEX IF NOT EXISTS CONTACTS_NAME ON CONTACTS (NAME);
+        CREATE INDEX IF NOT EXISTS CONTACTS_NAME_LOWER ON CONTACTS (LOWER(NAME));
+        CREATE INDEX IF NOT EXISTS TASKS_ASSIGNED_STATUS_DEADLINE ON TASKS (ASSIGNED_TO, STATUS, DEADLINE);
+        CREATE INDEX IF NOT EXISTS TASKS_STATUS_DEADLINE ON TASKS (STATUS, DEADLINE);
+        CREATE INDEX IF NOT EXISTS TASKS_PRIORITY_STATUS ON TASKS (PRIORITY, STATUS);
+        CREATE INDEX IF NOT EXISTS TASKS_DEADLINE ON TASKS (DEADLINE);
+        CREATE INDEX IF NOT EXISTS TASKS_SUPPORT_CONTACT ON TASKS (SUPPORT_CONTACT);
+        CREATE INDEX IF NOT EXISTS TASKS_TITLE_LOWER ON TASKS (LOWER(TITLE));
+    """),
+    (3, "full-text search", "\n".join(
+        _fts_script(table, columns) for table, columns in _FTS_COLUMNS.items())),
+    # TASK_ID depends on DEPENDS_ON. Edges are backfilled from, and kept in
+    # sync with, the DEPENDENCIES text column; an edge closing a cycle aborts
+    # the write that adds it
+    (4, "task dependency edges", f"""
+        CREATE TABLE IF NOT EXISTS TASK_DEPENDENCIES (
+            TASK_ID INTEGER NOT NULL REFERENCES TASKS(ID) ON DELETE CASCADE,
+            DEPENDS_ON INTEGER NOT NULL REFERENCES TASKS(ID) ON DELETE CASCADE,
+            PRIMARY KEY (TASK_ID, DEPENDS_ON)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS TASK_DEPENDENCIES_DEPENDS_ON ON TASK_DEPENDENCIES (DEPENDS_ON, TASK_ID);
+        INSERT OR IGNORE INTO DB_META (KEY, VALUE) VALUES ('dependency_counter', 0);
+
+        WITH RECURSIVE SPLIT (TASK_ID, ITEM, REST) AS (
+            SELECT ID, '', DEPENDENCIES || ',' FROM TASKS WHERE DEPENDENCIES IS NOT NULL
+            UNION ALL
+            SELECT TASK_ID, TRIM(SUBSTR(REST, 1, INSTR(REST, ',') - 1)), SUBSTR(REST, INSTR(REST, ',') + 1)
+            FROM SPLIT WHERE REST != ''
+        )
+        INSERT OR IGNORE INTO TASK_DEPENDENCIES (TASK_ID, DEPENDS_ON)
+        SELECT S.TASK_ID, MIN(D.ID) FROM SPLIT S JOIN TASKS D ON LOWER(D.TITLE) = LOWER(S.ITEM)
+        WHERE S.ITEM != '' AND D.ID != S.TASK_ID
+        GROUP BY S.TASK_ID, S.ITEM;
+
+        CREATE TRIGGER IF NOT EXISTS TASK_DEPENDENCIES_NO_CYCLE BEFORE INSERT ON TASK_DEPENDENCIES
+        WHEN NEW.TASK_ID = NEW.DEPENDS_ON OR EXISTS (
+            WITH RECURSIVE UPSTREAM (ID) AS (
+                SELECT NEW.DEPENDS_ON
+                UNION
+                SELECT E.DEPENDS_ON FROM TASK_DEPENDENCIES E JOIN UPSTREAM U ON E.TASK_ID = U.ID
+            )
+            SELECT 1 FROM UPSTREAM WHERE ID = NEW.TASK_ID
+        )
+        BEGIN
+            SELECT RAISE(ABORT, 'dependency cycle');
+        END;
+        CREATE TRIGGER IF NOT EXISTS TASKS_DEPENDENCIES_INSERT AFTER INSERT ON TASKS
+        WHEN NEW.DEPENDENCIES IS NOT NULL
+        BEGIN
+            INSERT OR IGNORE INTO TASK_DEPENDENCIES (TASK_ID, DEPENDS_ON)
+            {_DEPENDENCY_EDGES.format(task_id="NEW.ID", source="NEW.DEPENDENCIES")};
+        END;
+        CREATE TRIGGER IF NOT EXISTS TASKS_DEPENDENCIES_UPDATE AFTER UPDATE OF DEPENDENCIES ON TASKS
+        BEGIN
+            DELETE FROM TASK_DEPENDENCIES WHERE TASK_ID = NEW.ID;
+            INSERT OR IGNORE INTO TASK_DEPENDENCIES (TASK_ID, DEPENDS_ON)
+            {_DEPENDENCY_EDGES.format(task_id="NEW.ID", source="IFNULL(NEW.DEPENDENCIES, '')")};
+        END;
+        {_DEPENDENCY_COUNTER_TRIGGERS}
+    """),
+    (5, "task summaries", f"""
+        CREATE TABLE IF NOT EXISTS TASK_COUNTS (
+            ASSIGNED_TO INTEGER NOT NULL,
+            STATUS TEXT NOT NULL,
+            PRIORITY TEXT NOT NULL,
+            N INTEGER NOT NULL,
+            PRIMARY KEY (ASSIGNED_TO, STATUS, PRIORITY)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS TASK_COUNTS_STATUS_PRIORITY ON TASK_COUNTS (STATUS, PRIORITY, ASSIGNED_TO, N);
+        CREATE TABLE IF NOT EXISTS TASK_DUE_COUNTS (
+            DUE_DAY TEXT NOT NULL,
+            STATUS TEXT NOT NULL,
+            PRIORITY TEXT NOT NULL,
+            CATEGORY TEXT NOT NULL,
+            N INTEGER NOT NULL,
+            PRIMARY KEY (DUE_DAY, STATUS, PRIORITY, CATEGORY)
+        ) WITHOUT ROWID;
+        DELETE FROM TASK_COUNTS;
+        DELETE FROM TASK_DUE_COUNTS;
+        {";".join(summary_refresh("1"))};
+
+        CREATE TRIGGER IF NOT EXISTS TASKS_SUMMARY_INSERT AFTER INSERT ON TASKS
+        BEGIN
+            {_summary_add("NEW")}
+        END;
+        CREATE TRIGGER IF NOT EXISTS TASKS_SUMMARY_DELETE AFTER DELETE ON TASKS
+        BEGIN
+            {_summary_remove("OLD")}
+        END;
+        CREATE TRIGGER IF NOT EXISTS TASKS_SUMMARY_UPDATE
+        AFTER UPDATE OF ASSIGNED_TO, STATUS, PRIORITY, CATEGORY, DEADLINE ON TASKS
+        BEGIN
+            {_summary_remove("OLD")}
+            {_summary_add("NEW")}
+        END;
+    """),
+    (6, "contact counter", f"""
+        INSERT OR IGNORE INTO DB_META (KEY, VALUE) VALUES ('contact_counter', 0);
+        {_CONTACT_COUNTER_TRIGGERS}
+    """),
+]
+
+
+def apply_migrations(path=DB_PATH) -> list:
+    """Apply pending migrations; returns the names of those applied."""
+    applied = []
+    conn = sqlite3.connect(path)
+    try:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, name, script in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;")
+            applied.append(name)
+    finally:
+        conn.close()
+    return applied
+
+
+def _meta_value(conn, key) -> int:
+    row = conn.execute("SELECT VALUE FROM DB_META WHERE KEY = ?", (key,)).fetchone()
+    return row[0] if row else 0
+
+
+def change_counter(conn) -> int:
+    """Number of CONTACTS/TASKS row changes ever made (via triggers)."""
+    return _meta_value(conn, 'change_counter')
+
+
+def contact_counter(conn) -> int:
+    """Number of CONTACTS row changes ever made (via triggers)."""
+    return _meta_value(conn, 'contact_counter')
+
+
+def dependency_counter(conn) -> int:
+    """Number of TASK_DEPENDENCIES row changes ever made (via triggers)."""
+    return _meta_value(conn, 'dependency_counter')
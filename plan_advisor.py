@@ -0,0 +1,114 @@
+import logging
+import re
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+from db import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Tables whose full scans are worth reporting
+WATCHED_TABLES = {"CONTACTS", "TASKS"}
+
+# "SCAN T" (SQLite >= 3.36) or "SCAN TABLE TASKS AS T"; index scans carry "USING"
+_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$", re.IGNORECASE)
+_TABLE_ALIAS_RE = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(?!WHERE|SET|ON|JOIN|LEFT|INNER|ORDER|GROUP|LIMIT)(\w+))?",
+    re.IGNORECASE)
+_WHERE_RE = re.compile(r"\bWHERE\b", re.IGNORECASE)
+
+
+def _aliases(sql_query: str) -> dict:
+    """Map of table aliases (and names) to table names, upper-cased."""
+    aliases = {}
+    for table, alias in _TABLE_ALIAS_RE.findall(sql_query):
+        aliases[table.upper()] = table.upper()
+        if alias:
+            aliases[alias.upper()] = table.upper()
+    return aliases
+
+
+def full_scans(sql_query: str, plan) -> list:
+    """Watched tables a filtered statement reads without an index.
+
+    plan is the rows of EXPLAIN QUERY PLAN. A statement without a WHERE
+    clause reads the whole table by design and is not reported.
+    """
+    if not _WHERE_RE.search(sql_query):
+        return []
+    aliases = _aliases(sql_query)
+    tables = []
+    for row in plan:
+        match = _SCAN_RE.match(row[-1])
+        if not match:
+            continue
+        name = (match.group(2) or match.group(1)).upper()
+        table = aliases.get(name, name)
+        if table in WATCHED_TABLES and table not in tables:
+            tables.append(table)
+    return tables
+
+
+class QueryPlanAdvisor:
+    """Runs EXPLAIN QUERY PLAN on generated SQL and reports full scans.
+
+    Each distinct statement is explained once per schema version (adding an
+    index changes PRAGMA schema_version). Full scans are logged as warnings
+    and the last `history` of them are kept for the sidebar, so missing
+    indexes show up from real traffic.
+    """
+
+    def __init__(self, pool=None, max_entries=500, history=50):
+        self._pool = pool or get_pool()
+        self.max_entries = max_entries
+        self.warnings = deque(maxlen=history)
+        self.stats = {"checked": 0, "cached": 0, "full_scans": 0}
+        self._plans = OrderedDict()
+        self._schema_version = None
+        self._lock = threading.Lock()
+
+    def check(self, sql_query: str, params=None) -> list:
+        """Tables the statement would fully scan; [] if none or unexplainable."""
+        key = " ".join(sql_query.split()).rstrip(";")
+        try:
+            with self._pool.connection() as conn:
+                schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+                with self._lock:
+                    if schema_version != self._schema_version:
+                        self._plans.clear()
+                        self._schema_version = schema_version
+                    if key in self._plans:
+                        self._plans.move_to_end(key)
+                        self.stats["cached"] += 1
+                        return self._plans[key]
+                plan = conn.execute(f"EXPLAIN QUERY PLAN {key}", params or ()).fetchall()
+        except sqlite3.Error:
+            # Let the real execution report the error
+            return []
+
+        tables = full_scans(key, plan)
+        with self._lock:
+            self._plans[key] = tables
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+            self.stats["checked"] += 1
+            if tables:
+                self.stats["full_scans"] += 1
+                self.warnings.append({
+                    "sql": key,
+                    "tables": ", ".join(tables),
+                    "plan": "; ".join(row[-1] for row in plan),
+                })
+        if tables:
+            logger.warning("Full scan of %s in: %s (plan: %s)",
+                           ", ".join(tables), key, "; ".join(row[-1] for row in plan))
+        return tables
+
+
+_advisor = QueryPlanAdvisor()
+
+
+def get_advisor() -> QueryPlanAdvisor:
+    """Process-wide query plan advisor."""
+    return _advisor
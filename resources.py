@@ -0,0 +1,112 @@
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+from db import DB_PATH
+
+# Heavy LLM/agent objects are built on first use, once per process. The
+# langchain imports live inside the factories so pages that never talk to
+# the LLM (forms, template-answered chat turns) do not pay for them.
+
+load_dotenv('.env')
+
+MODEL_NAME = "llama-3.3-70b-versatile"
+
+
+def chat_messages(system_prompt: str, prompt: str):
+    """[SystemMessage, HumanMessage] pair for an LLM call."""
+    from langchain_core.messages import SystemMessage, HumanMessage
+
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=prompt)
+    ]
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """The ChatGroq client for the chat path; retries are left to the gateway."""
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        api_key=os.getenv("GROQ_API_KEY"),
+        model_name=MODEL_NAME,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_agent_llm():
+    """ChatGroq client for the SQL agent.
+
+    An agent run makes several LLM calls; rate limits are retried per call
+    here, with the client's own backoff, rather than by re-running the
+    agent.
+    """
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        api_key=os.getenv("GROQ_API_KEY"),
+        model_name=MODEL_NAME,
+        max_retries=int(os.getenv("AGENT_LLM_MAX_RETRIES", 4)),
+        request_timeout=float(os.getenv("LLM_TIMEOUT", 30)),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_llm_gateway():
+    """Process-wide LLM gateway: deadlines, retries and bounded concurrency."""
+    from llm_gateway import LLMGateway
+
+    return LLMGateway(
+        get_llm(),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 4)),
+        timeout=float(os.getenv("LLM_TIMEOUT", 30)),
+        max_agent_runs=int(os.getenv("AGENT_MAX_CONCURRENCY", 2)),
+        agent_timeout=float(os.getenv("AGENT_TIMEOUT", 120)),
+    )
+
+
+def get_agent_executor(database_path=DB_PATH):
+    """SQL agent for Deep Search over database_path (the primary or its read
+    snapshot), rebuilt only when the schema context or the path changes."""
+    from schema_context import get_schema_context
+
+    context = get_schema_context()
+    context.refresh()
+    return _build_agent_executor(context.version, database_path)
+
+
+@lru_cache(maxsize=2)
+def _build_agent_executor(schema_context_version, database_path):
+    from langchain_community.agent_toolkits import create_sql_agent
+    from deep_search import CapturingSQLDatabase
+    from schema_context import get_schema_context
+
+    if database_path == DB_PATH:
+        uri, engine_args = f"sqlite:///{DB_PATH}", None
+    else:
+        from sqlalchemy.pool import NullPool
+
+        # The snapshot file is replaced on every refresh; connecting per
+        # query makes each one read the current copy
+        uri = f"sqlite:///file:{database_path}?mode=ro&immutable=1&uri=true"
+        engine_args = {"poolclass": NullPool}
+
+    # The precomputed schema context replaces per-call table info and
+    # sample rows in the agent's prompt
+    db_agent = CapturingSQLDatabase.from_uri(
+        uri,
+        engine_args=engine_args,
+        include_tables=['CONTACTS', 'TASKS', 'TASK_DEPENDENCIES'],
+        sample_rows_in_table_info=0,
+        custom_table_info=dict(get_schema_context().tables)
+    )
+    return create_sql_agent(
+        llm=get_agent_llm(),
+        db=db_agent,
+        verbose=True,
+        top_k=5,
+        max_iterations=10,
+        agent_executor_kwargs={"return_intermediate_steps": True}
+    )
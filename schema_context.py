@@ -0,0 +1,138 @@
+import re
+import threading
+
+from db import get_pool
+from migrations import change_counter
+
+TABLES = ['CONTACTS', 'TASKS', 'TASK_DEPENDENCIES']
+
+# Text columns with at most this many distinct, repeating values get them listed
+MAX_LISTED_VALUES = 10
+# Longest value (in a sample) for a column to count as categorical
+MAX_CATEGORY_LENGTH = 40
+
+_CHECK_IN_RE = re.compile(r"CHECK\s*\(\s*(\w+)\s+IN\s*\(([^)]*)\)\s*\)", re.IGNORECASE)
+_CHECK_LENGTH_RE = re.compile(r"CHECK\s*\(\s*LENGTH\s*\(\s*(\w+)\s*\)\s*=\s*(\d+)\s*\)", re.IGNORECASE)
+
+
+def _describe_table(conn, table):
+    create_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    enums = {column.upper(): values.strip() for column, values in _CHECK_IN_RE.findall(create_sql)}
+    lengths = {column.upper(): length for column, length in _CHECK_LENGTH_RE.findall(create_sql)}
+    foreign_keys = {row[3].upper(): f"{row[2]}.{row[4]}"
+                    for row in conn.execute(f"PRAGMA foreign_key_list({table})")}
+    unique = set()
+    for index in conn.execute(f"PRAGMA index_list({table})"):
+        if index[2] and index[3] == 'u':
+            columns = conn.execute(f"PRAGMA index_info({index[1]})").fetchall()
+            if len(columns) == 1:
+                unique.add(columns[0][2].upper())
+    row_count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    parts, value_lines = [], []
+    for _, name, col_type, notnull, default, pk in conn.execute(f"PRAGMA table_info({table})"):
+        key = name.upper()
+        desc = f"{name} {col_type}"
+        if pk:
+            desc += " PK"
+        if key in unique:
+            desc += " UNIQUE"
+        if notnull and not pk:
+            desc += " NOT NULL"
+        if default is not None:
+            desc += f" DEFAULT {default}"
+        if key in lengths:
+            desc += f" ({lengths[key]} digits)"
+        if key in enums:
+            desc += f" IN ({enums[key]})"
+        if key in foreign_keys:
+            desc += f" -> {foreign_keys[key]}"
+        parts.append(desc)
+
+        is_text = "CHAR" in col_type.upper() or "TEXT" in col_type.upper()
+        if pk or not is_text or key in unique or key in enums or key in foreign_keys:
+            continue
+        longest = conn.execute(
+            f"SELECT MAX(LENGTH({name})) FROM (SELECT {name} FROM {table} LIMIT 200)").fetchone()[0]
+        if not longest or longest > MAX_CATEGORY_LENGTH:
+            continue
+        values = conn.execute(
+            f"SELECT {name}, COUNT(*) FROM {table} WHERE {name} IS NOT NULL AND {name} != '' "
+            f"GROUP BY {name} ORDER BY COUNT(*) DESC LIMIT ?", (MAX_LISTED_VALUES + 1,)).fetchall()
+        # Only columns whose values repeat are worth listing
+        if values and len(values) <= MAX_LISTED_VALUES and sum(count for _, count in values) >= 2 * len(values):
+            value_lines.append(f"  {name} values: " + ", ".join(repr(value) for value, _ in values))
+
+    fts_table = f"{table}_FTS"
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (fts_table,)).fetchone():
+        fts_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({fts_table})")]
+        value_lines.append(
+            f"  Keyword search on {', '.join(fts_columns)}: FROM {fts_table} JOIN {table} "
+            f"ON {table}.ID = {fts_table}.rowid WHERE {fts_table} MATCH 'word*' "
+            f"('COLUMN: word*' for one column), not LIKE '%word%'")
+
+    text = f"{table} ({row_count} rows): " + ", ".join(parts)
+    return "\n".join([text] + value_lines), row_count
+
+
+class SchemaContext:
+    """Compact, precomputed description of the CONTACTS/TASKS schema.
+
+    Lists columns with their constraints, CHECK enums, foreign keys and the
+    values of small categorical columns, in far fewer tokens than CREATE
+    TABLE statements plus sample rows. The description is rebuilt only when
+    the schema changes or the number of row changes since the last build
+    exceeds refresh_ratio of the table sizes (at least min_changes).
+    """
+
+    def __init__(self, pool=None, refresh_ratio=0.1, min_changes=50):
+        self._pool = pool or get_pool()
+        self.refresh_ratio = refresh_ratio
+        self.min_changes = min_changes
+        self.version = 0
+        self.tables = {}
+        self._built_at = None   # (schema cookie, change counter, row total)
+        self._lock = threading.Lock()
+
+    def _stale(self, conn):
+        if self._built_at is None:
+            return True
+        cookie, counter, rows = self._built_at
+        if conn.execute("PRAGMA schema_version").fetchone()[0] != cookie:
+            return True
+        changes = change_counter(conn) - counter
+        return changes >= max(self.min_changes, rows * self.refresh_ratio)
+
+    def refresh(self, force=False):
+        """Rebuild the description if it is stale (or force is set)."""
+        with self._lock, self._pool.connection() as conn:
+            if not force and not self._stale(conn):
+                return
+            tables, total = {}, 0
+            for table in TABLES:
+                tables[table], rows = _describe_table(conn, table)
+                total += rows
+            self.tables = tables
+            self._built_at = (conn.execute("PRAGMA schema_version").fetchone()[0],
+                              change_counter(conn), total)
+            self.version += 1
+
+    @property
+    def text(self) -> str:
+        """Description of all tables, refreshed if stale."""
+        self.refresh()
+        return "\n".join(self.tables[table] for table in TABLES)
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def get_schema_context() -> SchemaContext:
+    """Process-wide schema context."""
+    global _context
+    with _context_lock:
+        if _context is None:
+            _context = SchemaContext()
+        return _context
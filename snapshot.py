@@ -0,0 +1,193 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from db import DB_PATH, ConnectionPool, get_pool
+from migrations import change_counter, dependency_counter
+
+# Seconds a snapshot may lag the primary and still serve reads; 0 sends
+# every read to the primary
+SNAPSHOT_MAX_STALENESS = float(os.getenv("SNAPSHOT_MAX_STALENESS", 30))
+
+
+def snapshot_path(path=DB_PATH) -> str:
+    """File the read snapshot of a database lives in: test.db -> test.snapshot.db."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.snapshot{ext or '.db'}"
+
+
+class SnapshotReader:
+    """Read path for analytical queries, served from a copy of the database.
+
+    Deep Search and chat view results read a snapshot copied from the
+    primary with the SQLite backup API, so long agent runs and scans of a
+    large TASKS table neither hold locks on the file the forms write to nor
+    keep its WAL from being checkpointed. Each copy is written beside the
+    primary and swapped in with os.replace; queries already running finish
+    on the copy they opened.
+
+    The snapshot serves a read while it is at most max_staleness seconds
+    old and newer than the reader's own last write (not_before), so a
+    session always sees its changes. A snapshot that fails either test but
+    whose source has not changed since (same schema version and change
+    counters) is re-dated and used. Otherwise the read goes to the primary
+    and a refresh starts in the background: chat reads never wait for a
+    copy. A background refresh also starts once the snapshot is half way
+    to max_staleness, so under steady use reads stay on the snapshot.
+    ensure_fresh() copies synchronously instead, for the agent, whose
+    database is fixed when it starts.
+    """
+
+    def __init__(self, path=DB_PATH, max_staleness=SNAPSHOT_MAX_STALENESS):
+        self.path = path
+        self.snapshot_path = snapshot_path(path)
+        self.max_staleness = max_staleness
+        self.stats = {"snapshot_reads": 0, "primary_reads": 0, "refreshes": 0,
+                      "refresh_errors": 0, "refresh_seconds": 0.0}
+        self._primary = get_pool(path)
+        self._pool = None
+        self._taken_at = 0.0  # wall time the snapshot's contents were last current
+        self._source = None   # primary state the snapshot was copied at
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_staleness > 0
+
+    @property
+    def age(self):
+        """Seconds since the snapshot was last known current, or None before the first copy."""
+        with self._lock:
+            return time.time() - self._taken_at if self._pool else None
+
+    @staticmethod
+    def _source_state(conn):
+        return (conn.execute("PRAGMA schema_version").fetchone()[0],
+                change_counter(conn), dependency_counter(conn))
+
+    def refresh(self) -> bool:
+        """Copy the primary into the snapshot; False if the snapshot was already current."""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            tmp = f"{self.snapshot_path}.tmp"
+            with self._primary.connection() as source:
+                # Read before the copy: the copy is at least this new
+                taken_at = time.time()
+                state = self._source_state(source)
+                with self._lock:
+                    if self._pool is not None and state == self._source:
+                        self._taken_at = max(self._taken_at, taken_at)
+                        return False
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                dest = sqlite3.connect(tmp)
+                try:
+                    # One step, so one read transaction: under WAL the
+                    # writer carries on while the pages are copied
+                    source.backup(dest)
+                    dest.execute("PRAGMA journal_mode = DELETE")
+                finally:
+                    dest.close()
+            os.replace(tmp, self.snapshot_path)
+
+            pool = ConnectionPool(self.snapshot_path, read_only=True)
+            with self._lock:
+                previous, self._pool = self._pool, pool
+                self._taken_at, self._source = taken_at, state
+                self.stats["refreshes"] += 1
+                self.stats["refresh_seconds"] += time.perf_counter() - start
+            if previous is not None:
+                previous.close_all()
+            return True
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="snapshot-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except (sqlite3.Error, OSError):
+            # Reads stay on the primary; the next stale read tries again
+            with self._lock:
+                self.stats["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _usable_pool(self, not_before: float):
+        """The snapshot pool if it may serve a read, else None."""
+        with self._lock:
+            pool, taken_at, source = self._pool, self._taken_at, self._source
+        if pool is None:
+            self._refresh_in_background()
+            return None
+        age = time.time() - taken_at
+        if taken_at >= not_before and age <= self.max_staleness:
+            if age > self.max_staleness / 2:
+                # Copy ahead of expiry so reads never have to leave the snapshot
+                self._refresh_in_background()
+            return pool
+        with self._primary.connection() as conn:
+            checked_at = time.time()
+            unchanged = self._source_state(conn) == source
+        if unchanged:
+            with self._lock:
+                if self._source == source:
+                    self._taken_at = max(self._taken_at, checked_at)
+            return pool
+        self._refresh_in_background()
+        return None
+
+    @contextmanager
+    def connection(self, not_before: float = 0.0):
+        """Connection for read-only queries: the snapshot if fresh enough, else the primary.
+
+        not_before is the wall time of the caller's last write; a snapshot
+        taken earlier is only used if nothing has changed since.
+        """
+        pool = self._usable_pool(not_before) if self.enabled else None
+        with self._lock:
+            self.stats["snapshot_reads" if pool else "primary_reads"] += 1
+        with (pool or self._primary).connection() as conn:
+            yield conn
+
+    def ensure_fresh(self, not_before: float = 0.0) -> str:
+        """Path of a file to run read-only queries against, copying the primary first if needed.
+
+        The snapshot when enabled and it can be brought up to date, else the
+        primary.
+        """
+        if not self.enabled:
+            return self.path
+        with self._lock:
+            fresh = (self._pool is not None and self._taken_at >= not_before
+                     and time.time() - self._taken_at <= self.max_staleness)
+        if not fresh:
+            try:
+                self.refresh()
+            except (sqlite3.Error, OSError):
+                with self._lock:
+                    self.stats["refresh_errors"] += 1
+                return self.path
+        return self.snapshot_path
+
+
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def get_snapshot_reader() -> SnapshotReader:
+    """Process-wide snapshot reader for the app database."""
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            _reader = SnapshotReader()
+        return _reader
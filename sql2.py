@@ -1,5 +1,7 @@
 import sqlite3
 
+from migrations import apply_migrations
+
 conn = sqlite3.connect('test.db')
 conn.execute("PRAGMA foreign_keys = 1")  # Enable foreign key constraints
 cursor = conn.cursor()
@@ -27,7 +29,9 @@ contacts_data = [
     ('Vaibhav', 9999807097, 'vaibhav@gmail.com', 'jaipur'),
     ('mohit', 9920128977, 'mohit@gmail.com', 'mumbai')
 ]
-cursor.executemany("INSERT INTO CONTACTS (NAME, PHONE, EMAIL, ADDRESS) VALUES (?, ?, ?, ?)", contacts_data)
+# Contacts already present (same phone or email) are left as they are
+cursor.executemany("INSERT INTO CONTACTS (NAME, PHONE, EMAIL, ADDRESS) VALUES (?, ?, ?, ?) "
+                   "ON CONFLICT DO NOTHING", contacts_data)
 
 # Retrieve contact IDs based on phone numbers
 cursor.execute("SELECT PHONE, ID FROM CONTACTS")
@@ -161,7 +165,13 @@ INSERT INTO TASKS (
     NOTES, STATUS
 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
 """
-cursor.executemany(insert_query, tasks_data)
+# Tasks are matched on title so rerunning the script adds no duplicates
+cursor.execute("SELECT TITLE FROM TASKS")
+existing_titles = {row[0] for row in cursor.fetchall()}
+cursor.executemany(insert_query, [task for task in tasks_data if task[0] not in existing_titles])
 
 conn.commit()
-conn.close()
\ No newline at end of file
+conn.close()
+
+# Indexes, full-text tables and triggers on top of the base tables
+apply_migrations()
\ No newline at end of file
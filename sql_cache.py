@@ -0,0 +1,271 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+from db import DB_PATH, get_pool
+from migrations import contact_counter
+
+# Persistent cache of natural language prompts -> generated SQL
+CACHE_PATH = 'cache.db'
+
+# Filler words that do not change the meaning of a request
+STOPWORDS = {
+    "a", "an", "the", "me", "my", "all", "please", "can", "you", "i", "want",
+    "to", "of", "is", "are", "which", "that", "whose", "with", "who", "what",
+    "and", "us", "just", "every", "any", "some", "do", "we", "have", "there",
+}
+
+# Words that flip a request's meaning; a paraphrase may not add or drop one
+NEGATIONS = {"not", "no", "non", "none", "never", "except", "excluding", "without", "other", "than"}
+
+# Cached SQL that names contacts or filters on a contact ID; it goes stale
+# when CONTACTS changes
+_CONTACT_SQL_RE = re.compile(r"CONTACT|ASSIGNED_TO", re.IGNORECASE)
+
+# Paraphrases mapped onto one canonical token
+SYNONYMS = {
+    "list": "show", "display": "show", "find": "show", "get": "show",
+    "view": "show", "fetch": "show", "give": "show", "see": "show",
+    "in": "from", "at": "from", "living": "from", "located": "from", "based": "from",
+    "ongoing": "progress", "pending": "progress", "active": "progress",
+    "done": "completed", "finished": "completed", "complete": "completed",
+    "assigned": "for",
+}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase the prompt and collapse punctuation and whitespace."""
+    return " ".join(re.findall(r"[a-z0-9@._'-]+", prompt.lower())).strip(" .'-")
+
+
+def content_sequence(prompt: str) -> tuple:
+    """Meaningful tokens of a prompt in order, with synonyms and plurals folded."""
+    tokens = []
+    for token in normalize_prompt(prompt).split():
+        token = token.strip(".'-")
+        if token.endswith("'s"):
+            token = token[:-2]
+        if not token or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(SYNONYMS.get(token, token))
+    return tuple(tokens)
+
+
+def content_tokens(prompt: str) -> frozenset:
+    """Meaningful tokens of a prompt as a set, with synonyms and plurals folded."""
+    return frozenset(content_sequence(prompt))
+
+
+def _same_order(a: tuple, b: tuple) -> bool:
+    """True if the tokens a and b share come in the same order in both."""
+    shared = set(a) & set(b)
+    return [t for t in a if t in shared] == [t for t in b if t in shared]
+
+
+def schema_fingerprint(conn) -> str:
+    """Hash of the CONTACTS/TASKS table definitions."""
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' "
+        "AND name IN ('CONTACTS', 'TASKS') ORDER BY name"
+    ).fetchall()
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+
+class SQLCache:
+    """NL->SQL cache with exact and near-duplicate lookup.
+
+    Entries are keyed on the normalized prompt plus action and stored in a
+    small SQLite file so they survive restarts. Near duplicates are found
+    through an in-memory token index, for view entries only: a reused write
+    with its roles swapped would change the wrong rows. A paraphrase only
+    matches when its shared tokens come in the same order and the tokens it
+    differs by are not numbers, negations, words of contact names or text
+    in the cached SQL, so "contacts from Delhi" never answers "contacts from
+    Mumbai" nor "tasks in progress" "tasks not in progress". Entries
+    expire after ttl_seconds, the least recently used ones are evicted above
+    max_entries, and everything is dropped when the table schema changes.
+    Entries whose SQL touches contacts (resolved contact IDs, names) record
+    the contact counter they were made at and are dropped once CONTACTS
+    has changed since.
+    """
+
+    def __init__(self, path=CACHE_PATH, db_path=DB_PATH, max_entries=500,
+                 ttl_seconds=7 * 24 * 3600, similarity=0.85):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.stats = {"hits": 0, "near_hits": 0, "misses": 0, "invalidations": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS NL_SQL_CACHE (
+                KEY TEXT PRIMARY KEY,
+                ACTION TEXT NOT NULL,
+                PROMPT TEXT NOT NULL,
+                SQL TEXT NOT NULL,
+                SCHEMA_VERSION TEXT NOT NULL,
+                CREATED_AT REAL NOT NULL,
+                LAST_USED REAL NOT NULL,
+                CONTACT_VERSION INTEGER
+            )""")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(NL_SQL_CACHE)")}
+        if "CONTACT_VERSION" not in columns:
+            # Cache files from before contact versions were recorded
+            self._conn.execute("ALTER TABLE NL_SQL_CACHE ADD COLUMN CONTACT_VERSION INTEGER")
+            self._conn.execute("DELETE FROM NL_SQL_CACHE")
+            self._conn.commit()
+        self._pool = get_pool(db_path)
+        self._schema_cookie = None
+        self._schema_version = None
+        self._contact_version = None
+        self._index = {}    # token -> set of keys
+        self._entries = {}  # key -> (action, tokens, token sequence, sql)
+        self._contact_words = set()
+        self._check_schema()
+
+    @staticmethod
+    def _key(prompt: str, action: str) -> str:
+        return f"{action}:{normalize_prompt(prompt)}"
+
+    def _check_schema(self):
+        """Reload the index, dropping stale entries, when the schema or CONTACTS change."""
+        with self._pool.connection() as db:
+            cookie = db.execute("PRAGMA schema_version").fetchone()[0]
+            contact_version = contact_counter(db)
+            if cookie == self._schema_cookie and contact_version == self._contact_version:
+                return
+            self._schema_cookie = cookie
+            self._contact_version = contact_version
+            version = schema_fingerprint(db)
+            self._contact_words = set()
+            for (name,) in db.execute("SELECT NAME FROM CONTACTS"):
+                self._contact_words |= content_tokens(name or "")
+        self._schema_version = version
+        deleted = self._conn.execute(
+            "DELETE FROM NL_SQL_CACHE WHERE SCHEMA_VERSION != ? OR CREATED_AT < ? "
+            "OR CONTACT_VERSION != ?",
+            (version, time.time() - self.ttl_seconds, contact_version)).rowcount
+        self._conn.commit()
+        self.stats["invalidations"] += max(deleted, 0)
+        self._index.clear()
+        self._entries.clear()
+        for key, action, prompt, sql in self._conn.execute(
+                "SELECT KEY, ACTION, PROMPT, SQL FROM NL_SQL_CACHE"):
+            self._add_to_index(key, action, prompt, sql)
+
+    def _add_to_index(self, key, action, prompt, sql):
+        sequence = content_sequence(prompt)
+        tokens = frozenset(sequence)
+        self._entries[key] = (action, tokens, sequence, sql)
+        for token in tokens:
+            self._index.setdefault(token, set()).add(key)
+
+    def _remove(self, key):
+        action, tokens, _, _ = self._entries.pop(key, (None, (), (), None))
+        for token in tokens:
+            keys = self._index.get(token)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._index[token]
+        self._conn.execute("DELETE FROM NL_SQL_CACHE WHERE KEY = ?", (key,))
+
+    def _near_duplicate(self, prompt, action):
+        if action not in (None, "view"):
+            return None
+        sequence = content_sequence(prompt)
+        tokens = frozenset(sequence)
+        candidates = set()
+        for token in tokens:
+            candidates |= self._index.get(token, set())
+
+        best, best_score = None, 0.0
+        for key in candidates:
+            cached_action, cached_tokens, cached_sequence, sql = self._entries[key]
+            if cached_action != "view":
+                continue
+            score = len(tokens & cached_tokens) / len(tokens | cached_tokens)
+            if score < self.similarity or score <= best_score:
+                continue
+            if not _same_order(sequence, cached_sequence):
+                continue
+            sql_text = sql.lower()
+            if any(t.isdigit() or t in NEGATIONS or t.endswith("n't") or t in self._contact_words
+                   or t in sql_text for t in tokens ^ cached_tokens):
+                continue
+            best, best_score = key, score
+        return best
+
+    def get(self, prompt: str, action: str = None):
+        """Return (action, sql) for a cached prompt, or None on a miss.
+
+        Without an action, an entry for any action matches.
+        """
+        with self._lock:
+            self._check_schema()
+            now = time.time()
+            actions = [action] if action else ["add", "view", "update"]
+            row = None
+            for candidate in actions:
+                row = self._conn.execute(
+                    "SELECT KEY, ACTION, SQL, CREATED_AT FROM NL_SQL_CACHE WHERE KEY = ?",
+                    (self._key(prompt, candidate),)).fetchone()
+                if row:
+                    break
+            stat = "hits"
+            if not row:
+                key = self._near_duplicate(prompt, action)
+                if key:
+                    row = self._conn.execute(
+                        "SELECT KEY, ACTION, SQL, CREATED_AT FROM NL_SQL_CACHE WHERE KEY = ?",
+                        (key,)).fetchone()
+                    stat = "near_hits"
+            if row and row[3] < now - self.ttl_seconds:
+                self._remove(row[0])
+                self._conn.commit()
+                row = None
+            if not row:
+                self.stats["misses"] += 1
+                return None
+
+            self._conn.execute("UPDATE NL_SQL_CACHE SET LAST_USED = ? WHERE KEY = ?", (now, row[0]))
+            self._conn.commit()
+            self.stats[stat] += 1
+            return row[1], row[2]
+
+    def put(self, prompt: str, action: str, sql: str):
+        """Store the SQL generated for a prompt, evicting the LRU entries."""
+        with self._lock:
+            self._check_schema()
+            key = self._key(prompt, action)
+            now = time.time()
+            if key in self._entries:
+                self._remove(key)
+            contact_version = self._contact_version if _CONTACT_SQL_RE.search(sql) else None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO NL_SQL_CACHE VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, action, prompt, sql, self._schema_version, now, now, contact_version))
+            self._add_to_index(key, action, prompt, sql)
+
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                for (old_key,) in self._conn.execute(
+                        "SELECT KEY FROM NL_SQL_CACHE ORDER BY LAST_USED LIMIT ?",
+                        (overflow,)).fetchall():
+                    self._remove(old_key)
+            self._conn.commit()
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM NL_SQL_CACHE")
+            self._conn.commit()
+            self._index.clear()
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
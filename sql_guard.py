@@ -0,0 +1,249 @@
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from db import DB_PATH
+
+# Statement each chat action is expected to produce
+ACTION_STATEMENTS = {"add": "INSERT", "view": "SELECT", "update": "UPDATE"}
+
+# Tables generated SQL may read, and the subset it may change
+READABLE_TABLES = {"CONTACTS", "TASKS", "CONTACTS_FTS", "TASKS_FTS", "TASK_DEPENDENCIES",
+                   "TASK_COUNTS", "TASK_DUE_COUNTS"}
+WRITABLE_TABLES = {"CONTACTS", "TASKS"}
+
+# Row cap added to SELECTs without a LIMIT of their own
+MAX_ROWS = 10_000
+
+_WRITES = {sqlite3.SQLITE_INSERT: "INSERT", sqlite3.SQLITE_UPDATE: "UPDATE", sqlite3.SQLITE_DELETE: "DELETE"}
+# Authorizer actions that only read; everything else (DDL, PRAGMA, ATTACH,
+# transactions) is refused
+_READS = {sqlite3.SQLITE_READ, sqlite3.SQLITE_SELECT, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+_ACTION_NAMES = {getattr(sqlite3, f"SQLITE_{name}"): name for name in (
+    "CREATE_INDEX", "CREATE_TABLE", "CREATE_TEMP_INDEX", "CREATE_TEMP_TABLE", "CREATE_TEMP_TRIGGER",
+    "CREATE_TEMP_VIEW", "CREATE_TRIGGER", "CREATE_VIEW", "CREATE_VTABLE", "DROP_INDEX", "DROP_TABLE",
+    "DROP_TEMP_INDEX", "DROP_TEMP_TABLE", "DROP_TEMP_TRIGGER", "DROP_TEMP_VIEW", "DROP_TRIGGER",
+    "DROP_VIEW", "DROP_VTABLE", "ALTER_TABLE", "ANALYZE", "ATTACH", "DETACH", "PRAGMA", "REINDEX",
+    "SAVEPOINT", "TRANSACTION")}
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+_COMMENT_RE = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|--[^\n]*|/\*.*?(?:\*/|$)", re.DOTALL)
+_PARENS_RE = re.compile(r"\([^()]*\)")
+# Literals, parameters, parentheses and words, for walking a statement's clauses
+_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\?\d*|[:@$]\w+|[()]|\w+|\s+|.", re.DOTALL)
+_WHERE_END = {"RETURNING", "ORDER", "LIMIT"}
+# Alias of the table an UPDATE or DELETE changes ("UPDATE TASKS AS T SET ...")
+_TARGET_ALIAS_RE = re.compile(
+    r"\b(?:UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+\w+\s+(?:AS\s+)?(?!SET\b|WHERE\b|INDEXED\b|NOT\b)(\w+)",
+    re.IGNORECASE)
+
+
+class UnsafeSQLError(ValueError):
+    """Generated SQL failed validation and was not run."""
+
+
+def normalize_sql(sql_query: str) -> str:
+    """Statement text with whitespace collapsed and a trailing semicolon dropped."""
+    return " ".join(sql_query.split()).rstrip(";").rstrip()
+
+
+def strip_comments(sql_query: str) -> str:
+    """Statement text with -- and /* */ comments removed, literals left alone."""
+    return _COMMENT_RE.sub(lambda match: match.group(1) or " ", sql_query)
+
+
+def _top_level(sql_query: str) -> str:
+    """Statement text with literals blanked and parenthesized parts removed."""
+    text = _STRING_RE.sub("''", sql_query)
+    while True:
+        stripped = _PARENS_RE.sub(" ", text)
+        if stripped == text:
+            return text
+        text = stripped
+
+
+def _where_clause(sql_query: str):
+    """Text of a statement's top-level WHERE clause with parameters as NULL, or None."""
+    depth, clause = 0, None
+    for match in _TOKEN_RE.finditer(sql_query):
+        token, word = match.group(), match.group().upper()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and clause is None and word == "WHERE":
+            clause = []
+            continue
+        elif depth == 0 and clause is not None and word in _WHERE_END:
+            break
+        if clause is not None:
+            clause.append("NULL" if token[0] in "?:@$" else token)
+    return "".join(clause) if clause is not None else None
+
+
+class SQLValidator:
+    """Local gate for generated SQL, run before it reaches the database.
+
+    A statement is compiled (EXPLAIN, nothing runs) on a read-only
+    connection with an authorizer, so SQLite's own parser reports syntax
+    errors, unknown tables and columns, and several statements in one
+    string. The authorizer also records what the statement reads and
+    writes: only READABLE_TABLES may be read, only WRITABLE_TABLES written,
+    and DDL, PRAGMA, ATTACH and transaction control are refused. The
+    statement type must match the chat action, UPDATE and DELETE need a
+    WHERE clause that reads a column of the table they change (so "WHERE
+    1=1" is refused), and a SELECT without a LIMIT gets LIMIT MAX_ROWS.
+
+    Decisions are cached by normalized statement text, action and number of
+    parameters, and dropped when the schema version changes.
+    """
+
+    def __init__(self, path=DB_PATH, max_entries=500, max_rows=MAX_ROWS):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.stats = {"checked": 0, "cached": 0, "rejected": 0}
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._decisions = OrderedDict()  # key -> (error or None, add LIMIT)
+        self._schema_version = None
+        self._lock = threading.Lock()
+
+    def _warm_up(self):
+        """Connect the FTS5 tables before the authorizer is set.
+
+        On first use in a connection FTS5 reads its config with statements
+        of its own, which would otherwise be taken for the validated one's.
+        """
+        for table in READABLE_TABLES:
+            try:
+                self._conn.execute(f"EXPLAIN SELECT * FROM {table} LIMIT 0")
+            except sqlite3.Error:
+                pass
+
+    def _inspect(self, sql_query: str, params) -> dict:
+        """Tables read and written and refused operations, from compiling the statement."""
+        seen = {"reads": set(), "writes": {}, "refused": set(), "select": False}
+
+        def authorize(action, arg1, arg2, database, source):
+            if source is not None:
+                # Inside a trigger or view: maintained by the schema, not the statement
+                return sqlite3.SQLITE_OK
+            if action == sqlite3.SQLITE_READ:
+                seen["reads"].add(arg1.upper())
+            elif action == sqlite3.SQLITE_SELECT:
+                seen["select"] = True
+            elif action in _WRITES:
+                seen["writes"].setdefault(_WRITES[action], set()).add(arg1.upper())
+            elif action not in _READS:
+                seen["refused"].add(_ACTION_NAMES.get(action, str(action)))
+            return sqlite3.SQLITE_OK
+
+        self._conn.set_authorizer(authorize)
+        try:
+            self._conn.execute(f"EXPLAIN {sql_query}", params)
+        finally:
+            self._conn.set_authorizer(None)
+        return seen
+
+    def _where_reads(self, table: str, alias, where: str) -> bool:
+        """True if the WHERE clause reads a column of table, from compiling it in a SELECT."""
+        read = []
+
+        def authorize(action, arg1, arg2, database, source):
+            # A READ with no column is the FROM clause itself
+            if action == sqlite3.SQLITE_READ and source is None and arg1.upper() == table and arg2:
+                read.append(arg2)
+            return sqlite3.SQLITE_OK
+
+        self._conn.set_authorizer(authorize)
+        try:
+            self._conn.execute(f"EXPLAIN SELECT 1 FROM {table} {f'AS {alias}' if alias else ''} WHERE {where}")
+        except sqlite3.Error:
+            return False
+        finally:
+            self._conn.set_authorizer(None)
+        return bool(read)
+
+    def _decide(self, sql_query: str, action, params):
+        """(error or None, whether to add a LIMIT) for a statement."""
+        try:
+            seen = self._inspect(sql_query, params)
+        except sqlite3.ProgrammingError as e:
+            if "one statement at a time" in str(e):
+                return "only one statement can be run at a time", False
+            return f"does not compile: {e}", False
+        except sqlite3.Error as e:
+            return f"does not compile: {e}", False
+
+        if seen["refused"]:
+            return f"not allowed: {', '.join(sorted(seen['refused']))}", False
+        if len(seen["writes"]) > 1:
+            return "writes with more than one statement type", False
+        kind = next(iter(seen["writes"]), "SELECT" if seen["select"] else None)
+        if kind is None:
+            return "not a SELECT, INSERT or UPDATE statement", False
+        expected = ACTION_STATEMENTS.get(action)
+        if expected and kind != expected:
+            return f"{kind} statement for a '{action}' request", False
+        unknown = seen["reads"] - READABLE_TABLES
+        if unknown:
+            return f"reads tables outside the app schema: {', '.join(sorted(unknown))}", False
+        written = seen["writes"].get(kind, set()) - WRITABLE_TABLES
+        if written:
+            return f"writes tables the app does not manage: {', '.join(sorted(written))}", False
+
+        top_level = _top_level(sql_query)
+        if kind in ("UPDATE", "DELETE"):
+            where = _where_clause(sql_query)
+            if where is None:
+                return f"{kind} without a WHERE clause would change every row", False
+            table = next(iter(seen["writes"][kind]))
+            alias = _TARGET_ALIAS_RE.search(top_level)
+            if not self._where_reads(table, alias and alias.group(1), where):
+                return f"{kind} whose WHERE clause does not filter {table} rows would change every row", False
+        return None, kind == "SELECT" and not re.search(r"\bLIMIT\b", top_level, re.IGNORECASE)
+
+    def validate(self, sql_query: str, action: str = None, params=None) -> str:
+        """The statement to run for generated SQL, or UnsafeSQLError saying why not.
+
+        The returned text is the input without comments or a trailing
+        semicolon, with a LIMIT appended to unbounded SELECTs.
+        """
+        params = tuple(params or ())
+        sql_query = strip_comments(sql_query).strip().rstrip(";").rstrip()
+        key = (normalize_sql(sql_query), action, len(params))
+        with self._lock:
+            schema_version = self._conn.execute("PRAGMA schema_version").fetchone()[0]
+            if schema_version != self._schema_version:
+                self._decisions.clear()
+                self._schema_version = schema_version
+                self._warm_up()
+            decision = self._decisions.get(key)
+            if decision is not None:
+                self._decisions.move_to_end(key)
+                self.stats["cached"] += 1
+            else:
+                decision = self._decide(sql_query, action, params)
+                self._decisions[key] = decision
+                while len(self._decisions) > self.max_entries:
+                    self._decisions.popitem(last=False)
+                self.stats["checked"] += 1
+            error, add_limit = decision
+            if error:
+                self.stats["rejected"] += 1
+        if error:
+            raise UnsafeSQLError(error)
+        return f"{sql_query}\nLIMIT {self.max_rows}" if add_limit else sql_query
+
+
+_validator = None
+_validator_lock = threading.Lock()
+
+
+def get_validator() -> SQLValidator:
+    """Process-wide SQL validator for the app database."""
+    global _validator
+    with _validator_lock:
+        if _validator is None:
+            _validator = SQLValidator()
+        return _validator
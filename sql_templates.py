@@ -0,0 +1,284 @@
+import re
+from datetime import date
+
+from contacts import NameIndex
+from deadlines import match_deadline_range, parse_deadline
+
+# Allowed values from the CHECK constraints in sql2.py
+STATUSES = ['Not Started', 'In Progress', 'On Hold', 'Completed', 'Reviewed & Approved']
+PRIORITIES = ['Low', 'Medium', 'High']
+# Statuses of tasks that still need work; only these can be overdue
+OPEN_STATUSES = STATUSES[:3]
+
+# Phrases users type for each status, longest first so "not started" wins over "started"
+STATUS_WORDS = {
+    'reviewed & approved': 'Reviewed & Approved',
+    'reviewed and approved': 'Reviewed & Approved',
+    'approved': 'Reviewed & Approved',
+    'not started': 'Not Started',
+    'in progress': 'In Progress',
+    'ongoing': 'In Progress',
+    'pending': 'In Progress',
+    'on hold': 'On Hold',
+    'paused': 'On Hold',
+    'completed': 'Completed',
+    'complete': 'Completed',
+    'finished': 'Completed',
+    'done': 'Completed',
+}
+
+TASK_COLUMNS = ("T.ID, T.TITLE, T.DESCRIPTION, T.CATEGORY, T.PRIORITY, T.STATUS, "
+                "T.DEADLINE, C.NAME AS ASSIGNEE")
+
+# Words that may appear in a template prompt without changing its meaning
+FILLER = {'me', 'all', 'the', 'my', 'please', 'of', 'every', 'a', 'current', 'that', 'are', 'is'}
+
+_VIEW_VERB = r"(?:show|list|display|get|find|view|fetch|give)"
+_STATUS_RE = "|".join(re.escape(word) for word in sorted(STATUS_WORDS, key=len, reverse=True))
+_OVERDUE_RE = r"(?<!\w)(?:overdue|late|past due)(?!\w)"
+_DUE_RE = r"(?<!\w)(?:due|deadlines?)\s+"
+_EMAIL_RE = r"[\w.+-]+@[\w-]+\.[\w.-]+"
+
+
+def _clean(prompt: str) -> str:
+    prompt = prompt.strip().rstrip("?.!").strip()
+    return re.sub(r"\s+", " ", prompt)
+
+
+def find_contact(text: str, contacts):
+    """Resolve a contact mentioned in text to (ID, NAME).
+
+    contacts is a NameIndex or a list of (ID, NAME) pairs; matching is
+    typo-tolerant (see NameIndex.find). Returns None when nothing or more
+    than one contact matches.
+    """
+    index = contacts if isinstance(contacts, NameIndex) else NameIndex(contacts)
+    return index.find(text)
+
+
+def fts_phrase(text: str, column: str = None):
+    """FTS5 MATCH expression for text as a phrase, last word as a prefix.
+
+    Only word characters are kept, so the expression needs no escaping.
+    Returns None when text has no words.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    phrase = f'"{" ".join(words)}"*'
+    return f"{column}: {phrase}" if column else phrase
+
+
+def deadline_filter(text: str, column: str, status_column: str, today: date = None):
+    """Conditions for the deadline filter in a lowercase prompt.
+
+    "overdue" (or "late", "past due") selects open tasks due before today;
+    "due <range>" or "deadline <range>" the deadlines in any range
+    deadlines.match_deadline_range understands. Returns (text without the
+    filter, conditions, params), () when text has no filter, or None when
+    it has one that cannot be parsed.
+    """
+    today = today or date.today()
+    overdue = re.search(_OVERDUE_RE, text)
+    if overdue:
+        return (text[:overdue.start()] + " " + text[overdue.end():],
+                [f"{column} < ?", f"{status_column} IN ({', '.join('?' * len(OPEN_STATUSES))})"],
+                [today.isoformat(), *OPEN_STATUSES])
+    due = re.search(_DUE_RE, text)
+    if not due:
+        return ()
+    found = match_deadline_range(text[due.end():], today)
+    if not found:
+        return None
+    start, end, length = found
+    conditions, params = [], []
+    if start:
+        conditions.append(f"{column} >= ?")
+        params.append(start.isoformat())
+    if end:
+        conditions.append(f"{column} < ?")
+        params.append(end.isoformat())
+    return text[:due.start()] + " " + text[due.end() + length:], conditions, params
+
+
+def _match_task_list(prompt, contacts):
+    """Tasks filtered by any of status, priority and assignee."""
+    match = re.fullmatch(rf"{_VIEW_VERB}\b(.*?)\btasks?\b(.*)", prompt, re.IGNORECASE)
+    if not match:
+        return None
+    rest = f" {match.group(1)} {match.group(2)} ".lower()
+    conditions, params = [], []
+
+    # Before the assignee, which would take "by friday" for a name
+    deadline = deadline_filter(rest, "T.DEADLINE", "T.STATUS")
+    if deadline is None:
+        return None
+    if deadline:
+        rest, deadline_conditions, deadline_params = deadline
+        conditions += deadline_conditions
+        params += deadline_params
+
+    status = re.search(rf"(?<!\w)({_STATUS_RE})(?!\w)", rest)
+    if status:
+        conditions.append("T.STATUS = ?")
+        params.append(STATUS_WORDS[status.group(1)])
+        rest = rest.replace(status.group(0), " ", 1)
+
+    priority = re.search(r"(?<!\w)(high|medium|low)(?: priority)?(?!\w)", rest)
+    if priority:
+        conditions.append("T.PRIORITY = ?")
+        params.append(priority.group(1).capitalize())
+        rest = rest.replace(priority.group(0), " ", 1)
+
+    assignee = re.search(r"(?<!\w)(?:assigned to|for|of|owned by|by)\s+(.+?)\s*$", rest)
+    if assignee:
+        contact = find_contact(assignee.group(1), contacts)
+        if not contact:
+            return None
+        conditions.append("T.ASSIGNED_TO = ?")
+        params.append(contact[0])
+        rest = rest[:assignee.start()]
+
+    if set(re.findall(r"\w+", rest)) - FILLER:
+        return None
+    sql = f"SELECT {TASK_COLUMNS} FROM TASKS T LEFT JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return "view", sql, tuple(params)
+
+
+def _match_single_task(prompt, contacts):
+    match = re.fullmatch(rf"(?:{_VIEW_VERB}|open)\b(?: me)?(?: the)? task (?:id |#|no\.? )?(\d+)",
+                         prompt, re.IGNORECASE)
+    if not match:
+        return None
+    sql = ("SELECT T.*, C.NAME AS ASSIGNEE FROM TASKS T "
+           "LEFT JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID WHERE T.ID = ?")
+    return "view", sql, (int(match.group(1)),)
+
+
+def _match_contact_list(prompt, contacts):
+    match = re.fullmatch(
+        rf"{_VIEW_VERB}\b(?: me)?(?: all)?(?: the| my)? contacts?"
+        r"(?: (?:from|in|living in|located in|based in|at) ([\w ,.'-]{1,60}))?",
+        prompt, re.IGNORECASE)
+    if not match:
+        return None
+    if not match.group(1):
+        return "view", "SELECT * FROM CONTACTS", ()
+    place = fts_phrase(match.group(1), "ADDRESS")
+    if not place:
+        return None
+    return ("view", "SELECT C.* FROM CONTACTS_FTS JOIN CONTACTS C ON C.ID = CONTACTS_FTS.rowid "
+            "WHERE CONTACTS_FTS MATCH ?", (place,))
+
+
+def _match_task_search(prompt, contacts):
+    """Tasks whose free-text columns mention a keyword or phrase."""
+    match = re.fullmatch(
+        rf"(?:{_VIEW_VERB}|search)\b(?: me)?(?: all)?(?: the| my)? tasks? "
+        r"(?:mentioning|about|containing|matching|related to|that mentions?|"
+        r"with (?:the )?(?:keyword|word|text|phrase)s?) ['\"]?([\w ,.'-]{1,60}?)['\"]?",
+        prompt, re.IGNORECASE)
+    if not match:
+        return None
+    keywords = fts_phrase(match.group(1))
+    if not keywords:
+        return None
+    sql = (f"SELECT {TASK_COLUMNS} FROM TASKS_FTS JOIN TASKS T ON T.ID = TASKS_FTS.rowid "
+           "LEFT JOIN CONTACTS C ON T.ASSIGNED_TO = C.ID WHERE TASKS_FTS MATCH ?")
+    return "view", sql, (keywords,)
+
+
+def _match_task_update(prompt, contacts):
+    """Status, priority, deadline or assignee change for a task given by ID."""
+    task = re.search(r"\btask\s+(?:id\s+|#|no\.?\s*)?(\d+)(?:'s)?\b", prompt, re.IGNORECASE)
+    if not task or not re.match(r"(?:update|change|set|mark|move|reassign|assign|modify|"
+                                r"reschedule|postpone|push|extend)\b",
+                                prompt, re.IGNORECASE):
+        return None
+    task_id = int(task.group(1))
+    rest = prompt[task.end():].strip().lower()
+
+    status = re.fullmatch(rf"(?:status\s+)?(?:as|to|=)?\s*({_STATUS_RE})", rest)
+    if status:
+        return "update", "UPDATE TASKS SET STATUS = ? WHERE ID = ?", (STATUS_WORDS[status.group(1)], task_id)
+
+    priority = re.fullmatch(r"(?:priority\s+)?(?:as|to|=)\s*(high|medium|low)(?: priority)?", rest)
+    if priority:
+        return "update", "UPDATE TASKS SET PRIORITY = ? WHERE ID = ?", (priority.group(1).capitalize(), task_id)
+
+    if re.match(r"(?:reschedule|postpone|push|extend)\b", prompt, re.IGNORECASE):
+        deadline = re.fullmatch(r"(?:(?:deadline|due date)\s+)?(?:to|until|till)\s+(.+)", rest)
+    else:
+        deadline = re.fullmatch(r"(?:deadline|due date|due)\s*(?:to|=|on|as)?\s*(.+)", rest)
+    if deadline and (value := parse_deadline(deadline.group(1))):
+        return ("update", "UPDATE TASKS SET DEADLINE = ? WHERE ID = ?",
+                (value.strftime("%Y-%m-%d %H:%M"), task_id))
+
+    assignee = re.fullmatch(r"(?:assignee\s+)?(?:to|=)\s+(.+)", rest)
+    if assignee:
+        contact = find_contact(assignee.group(1), contacts)
+        if contact and contact[1].lower() == assignee.group(1).strip().lower():
+            return "update", "UPDATE TASKS SET ASSIGNED_TO = ? WHERE ID = ?", (contact[0], task_id)
+    return None
+
+
+def _match_contact_update(prompt, contacts):
+    """Email, phone or address change for a contact given by name."""
+    match = re.fullmatch(
+        r"(?:update|change|set)\s+(.+?)(?:'s|s')?\s+(email|e-mail|phone|phone number|address)\s+to\s+(.+)",
+        prompt, re.IGNORECASE)
+    if not match:
+        return None
+    contact = find_contact(match.group(1), contacts)
+    if not contact:
+        return None
+    field, value = match.group(2).lower(), match.group(3).strip().strip("'\"")
+    if field in ("email", "e-mail") and re.fullmatch(_EMAIL_RE, value):
+        return "update", "UPDATE CONTACTS SET EMAIL = ? WHERE ID = ?", (value, contact[0])
+    if field.startswith("phone") and re.fullmatch(r"\d{10}", value):
+        return "update", "UPDATE CONTACTS SET PHONE = ? WHERE ID = ?", (int(value), contact[0])
+    if field == "address" and value:
+        return "update", "UPDATE CONTACTS SET ADDRESS = ? WHERE ID = ?", (value, contact[0])
+    return None
+
+
+def _match_contact_add(prompt, contacts):
+    """New contact given as "add contact: name, phone, email[, address]"."""
+    match = re.fullmatch(
+        rf"(?:add|create)(?: a)?(?: new)? contact:?\s+([^,\d]+?),\s*(\d{{10}}),\s*({_EMAIL_RE})(?:,\s*(.+))?",
+        prompt, re.IGNORECASE)
+    if not match:
+        return None
+    name, phone, email, address = match.groups()
+    return ("add", "INSERT INTO CONTACTS (NAME, PHONE, EMAIL, ADDRESS) VALUES (?, ?, ?, ?)",
+            (name.strip(), int(phone), email, (address or "").strip()))
+
+
+TEMPLATES = [
+    _match_single_task,
+    _match_task_list,
+    _match_contact_list,
+    _match_task_search,
+    _match_task_update,
+    _match_contact_update,
+    _match_contact_add,
+]
+
+
+def match_template(prompt: str, contacts):
+    """Build parameterized SQL for prompts that fit a known shape.
+
+    contacts is the NameIndex (or a list of (ID, NAME) pairs) used to
+    resolve people. Returns (action, sql, params) or None when the prompt
+    should go to the LLM.
+    """
+    prompt = _clean(prompt)
+    if not isinstance(contacts, NameIndex):
+        contacts = NameIndex(contacts)
+    for template in TEMPLATES:
+        result = template(prompt, contacts)
+        if result:
+            return result
+    return None
@@ -0,0 +1,221 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields
+
+from deadlines import deadline_mentions, parse_deadline
+from sql_cache import normalize_prompt
+from sql_templates import PRIORITIES, STATUS_WORDS, STATUSES
+
+# Choices offered by the New Task form; a new task cannot start out reviewed
+TASK_CATEGORIES = ["Work", "Personal", "Project", "Other"]
+NEW_TASK_STATUSES = STATUSES[:4]
+
+# What the LLM is told about each field, in TASKS column order
+FIELD_NOTES = {
+    "title": "short task title (required)",
+    "description": "what has to be done",
+    "category": f"one of {', '.join(TASK_CATEGORIES)} (default Work)",
+    "priority": f"one of {', '.join(PRIORITIES)} (default Medium)",
+    "expected_outcome": "result that marks the task done",
+    "deadline": "deadline exactly as the user wrote it, e.g. 'next friday 5pm' or '2025-03-05'",
+    "assigned_to": "name of the contact doing the task",
+    "dependencies": "titles of tasks that must finish first, comma separated",
+    "required_resources": "tools, budget or people needed",
+    "estimated_time": "effort, e.g. '2 hours' or '3 days'",
+    "instructions": "how to do the task",
+    "review_process": "how the result is reviewed",
+    "performance_metrics": "how success is measured",
+    "support_contact": "name of a contact who can help",
+    "notes": "anything else",
+    "status": f"one of {', '.join(NEW_TASK_STATUSES)} (default Not Started)",
+}
+
+
+@dataclass
+class TaskParameters:
+    """Fields of a task to create, one per TASKS column except ID.
+
+    Contacts are given by name and resolved by the New Task form; the
+    deadline is kept as the user wrote it and resolved when the form is
+    prefilled, so a cached "due tomorrow" stays relative. Everything else
+    holds the column value.
+    """
+
+    title: str = ""
+    description: str = ""
+    category: str = "Work"
+    priority: str = "Medium"
+    expected_outcome: str = ""
+    deadline: str = ""
+    assigned_to: str = ""
+    dependencies: str = ""
+    required_resources: str = ""
+    estimated_time: str = ""
+    instructions: str = ""
+    review_process: str = ""
+    performance_metrics: str = ""
+    support_contact: str = ""
+    notes: str = ""
+    status: str = "Not Started"
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TaskParameters":
+        """Coerce loosely shaped LLM output into a task.
+
+        Keys match in any case and with spaces for underscores, lists are
+        joined with commas and unknown keys are dropped. A category outside
+        the form's list becomes Other; priority and status fall back to
+        their defaults unless they name an allowed value.
+        """
+        if isinstance(data.get("output"), dict) and "title" not in data:
+            # The shape of the worked example in older prompts
+            data = data["output"]
+        known = {field.name for field in fields(cls)}
+        values = {}
+        for key, value in data.items():
+            key = re.sub(r"[\s-]+", "_", str(key).strip().lower())
+            if key not in known or value is None:
+                continue
+            if isinstance(value, (list, tuple)):
+                value = ", ".join(str(item) for item in value if item is not None)
+            values[key] = str(value).strip()
+
+        task = cls(**values)
+        task.category = _choice(task.category, TASK_CATEGORIES, "Other" if task.category else "Work")
+        task.priority = _choice(task.priority, PRIORITIES, "Medium")
+        status = STATUS_WORDS.get(task.status.lower(), task.status)
+        task.status = _choice(status, NEW_TASK_STATUSES, "Not Started")
+        return task
+
+    def as_prefill(self, prompt: str = "", now=None) -> dict:
+        """Form values, with the deadline resolved to "YYYY-MM-DD HH:MM".
+
+        A deadline found in the user's own prompt wins over the extracted
+        one; an unreadable deadline is passed on as written.
+        """
+        prefill = asdict(self)
+        mentioned = deadline_mentions(prompt, now) if prompt else []
+        deadline = mentioned[0][1] if mentioned else parse_deadline(self.deadline, now)
+        if deadline:
+            prefill["deadline"] = deadline.strftime("%Y-%m-%d %H:%M")
+        return prefill
+
+
+def _choice(value: str, allowed, default: str) -> str:
+    by_lower = {option.lower(): option for option in allowed}
+    return by_lower.get(value.strip().lower(), default)
+
+
+def task_schema() -> str:
+    """The task fields as lines for an extraction prompt."""
+    return "\n".join(f'- "{name}": {note}' for name, note in FIELD_NOTES.items())
+
+
+# Double-quoted string, single-quoted string, or a run of anything else
+_SEGMENT_RE = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|[^"\']+|.', re.DOTALL)
+
+
+def _balanced_object(text: str, start: int) -> str:
+    """The {...} starting at start, closed off if the text ends inside it."""
+    closers, quote, escaped = [], None, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+            if not closers:
+                return text[start:i + 1]
+    return text[start:].rstrip().rstrip(",") + (quote or "") + "".join(reversed(closers))
+
+
+def _loosen(text: str) -> str:
+    """Rewrite common near-JSON: single quotes, bare keys, trailing commas, Python literals."""
+    parts = []
+    for segment in _SEGMENT_RE.findall(text):
+        if segment.startswith("'") and len(segment) > 1:
+            segment = json.dumps(segment[1:-1].replace("\\'", "'"))
+        elif not segment.startswith('"'):
+            segment = re.sub(r"([{,]\s*)([A-Za-z_][\w ]*?)\s*:", r'\1"\2":', segment)
+            segment = re.sub(r",\s*([}\]])", r"\1", segment)
+            segment = re.sub(r"\b(True|False|None)\b",
+                             lambda m: {"True": "true", "False": "false", "None": "null"}[m.group(1)], segment)
+        parts.append(segment)
+    return "".join(parts)
+
+
+def repair_json(text: str):
+    """The JSON object in an LLM reply, tolerating the usual damage; None if there is none.
+
+    Handles prose or markdown fences around the object, single quotes,
+    unquoted keys, trailing commas, Python True/False/None and a reply cut
+    off before its closing braces.
+    """
+    start = (text or "").find("{")
+    if start < 0:
+        return None
+    candidate = _balanced_object(text, start)
+    for attempt in (candidate, _loosen(candidate)):
+        try:
+            value = json.loads(attempt)
+        except ValueError:
+            continue
+        return value if isinstance(value, dict) else None
+    return None
+
+
+class TaskParamsCache:
+    """Extracted task parameters keyed on the normalized prompt.
+
+    Extraction does not depend on the database, so entries only leave by
+    LRU eviction above max_entries.
+    """
+
+    def __init__(self, max_entries=200):
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, prompt: str):
+        """Cached TaskParameters for a prompt, or None."""
+        key = normalize_prompt(prompt)
+        with self._lock:
+            task = self._entries.get(key)
+            if task is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return task
+
+    def put(self, prompt: str, task: TaskParameters):
+        """Store the parameters extracted for a prompt."""
+        with self._lock:
+            key = normalize_prompt(prompt)
+            self._entries[key] = task
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = TaskParamsCache()
+
+
+def get_task_params_cache() -> TaskParamsCache:
+    """Process-wide cache of extracted task parameters."""
+    return _cache
@@ -0,0 +1,201 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from db import get_pool
+
+# Spans of finished traces; TRACE_JSONL additionally appends them as JSON lines
+TRACE_PATH = os.getenv("TRACE_PATH", "traces.db")
+TRACE_JSONL = os.getenv("TRACE_JSONL")
+MAX_TRACES = 5000
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed stage. Attributes set while it is open are stored with it."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "seconds", "attrs", "_t0")
+
+    def __init__(self, trace_id, parent_id, name, attrs):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = {key: value for key, value in attrs.items() if value is not None}
+        self.start = time.time()
+        self.seconds = None
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update((key, value) for key, value in attrs.items() if value is not None)
+
+    def as_dict(self) -> dict:
+        return {"trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "name": self.name, "start": self.start, "seconds": self.seconds, "attrs": self.attrs}
+
+
+class Tracer:
+    """Per-stage timings of chat turns, kept in a local SQLite file.
+
+    trace() opens the root span of a turn and span() nests stages under the
+    innermost open span of the current context; outside a trace span() only
+    times and records nothing. A trace's spans are buffered and written in
+    one transaction when it closes. Stages that run after the turn, such as
+    the rerun and the render of its answer, are attached later with
+    resume() or record(). Only the newest max_traces traces are kept.
+    """
+
+    def __init__(self, path=TRACE_PATH, jsonl_path=TRACE_JSONL, max_traces=MAX_TRACES):
+        self.path = path
+        self.jsonl_path = jsonl_path
+        self.max_traces = max_traces
+        self._buffers = {}  # trace_id -> finished spans
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def _pool(self):
+        pool = get_pool(self.path)
+        with self._lock:
+            if not self._schema_ready:
+                with pool.connection() as conn:
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS SPANS (
+                            TRACE_ID TEXT NOT NULL,
+                            SPAN_ID TEXT PRIMARY KEY,
+                            PARENT_ID TEXT,
+                            NAME TEXT NOT NULL,
+                            START REAL NOT NULL,
+                            SECONDS REAL NOT NULL,
+                            ATTRS TEXT NOT NULL
+                        )""")
+                    conn.execute("CREATE INDEX IF NOT EXISTS SPANS_TRACE ON SPANS (TRACE_ID)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS SPANS_START ON SPANS (START)")
+                    conn.commit()
+                self._schema_ready = True
+        return pool
+
+    @contextmanager
+    def _open(self, span):
+        token = _current.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            # st.rerun() and st.stop() raise BaseException; they end the span normally
+            span.seconds = time.perf_counter() - span._t0
+            _current.reset(token)
+            if span.trace_id is not None:
+                with self._lock:
+                    self._buffers.setdefault(span.trace_id, []).append(span)
+
+    @contextmanager
+    def _flushing(self, span):
+        try:
+            with self._open(span):
+                yield span
+        finally:
+            with self._lock:
+                spans = self._buffers.pop(span.trace_id, [])
+            self._write(spans)
+
+    def trace(self, name: str, **attrs):
+        """Root span of a new trace; all spans are written when it closes."""
+        return self._flushing(Span(uuid.uuid4().hex, None, name, attrs))
+
+    def resume(self, trace_id, parent_id, name: str, **attrs):
+        """Span under an already written trace, e.g. for work done on the next rerun."""
+        return self._flushing(Span(trace_id, parent_id, name, attrs))
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Child of the innermost open span, or an unrecorded span outside a trace."""
+        parent = _current.get()
+        span = Span(parent.trace_id if parent else None, parent.span_id if parent else None, name, attrs)
+        with self._open(span):
+            yield span
+
+    def record(self, trace_id, parent_id, name, start, seconds, **attrs):
+        """Add a span timed elsewhere to an already written trace."""
+        span = Span(trace_id, parent_id, name, attrs)
+        span.start, span.seconds = start, seconds
+        self._write([span])
+
+    def _write(self, spans):
+        if not spans:
+            return
+        with self._pool().connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO SPANS (TRACE_ID, SPAN_ID, PARENT_ID, NAME, START, SECONDS, ATTRS) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(s.trace_id, s.span_id, s.parent_id, s.name, s.start, s.seconds, json.dumps(s.attrs))
+                 for s in spans])
+            if any(s.parent_id is None for s in spans):
+                # A new root: drop the oldest traces past the limit
+                conn.execute("""
+                    DELETE FROM SPANS WHERE TRACE_ID IN (
+                        SELECT TRACE_ID FROM SPANS WHERE PARENT_ID IS NULL
+                        ORDER BY START DESC LIMIT -1 OFFSET ?)""", (self.max_traces,))
+            conn.commit()
+        if self.jsonl_path:
+            with self._lock, open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(s.as_dict()) + "\n" for s in spans)
+
+    def turns(self, since: float = 0.0, limit: int = 1000) -> list:
+        """Recent traces as dicts with name, start, end-to-end seconds and root attributes.
+
+        End-to-end time runs from the root span's start to the end of the
+        last span recorded for the trace, so it includes late spans.
+        """
+        with self._pool().connection() as conn:
+            rows = conn.execute("""
+                SELECT R.TRACE_ID, R.NAME, R.START, R.SECONDS,
+                       MAX(S.START + S.SECONDS) - R.START, COUNT(*), R.ATTRS
+                FROM SPANS R JOIN SPANS S ON S.TRACE_ID = R.TRACE_ID
+                WHERE R.PARENT_ID IS NULL AND R.START >= ?
+                GROUP BY R.SPAN_ID ORDER BY R.START DESC LIMIT ?""", (since, limit)).fetchall()
+        return [{"trace_id": trace_id, "name": name, "start": start, "turn_seconds": seconds,
+                 "total_seconds": total, "spans": count, **json.loads(attrs)}
+                for trace_id, name, start, seconds, total, count, attrs in rows]
+
+    def stage_durations(self, since: float = 0.0) -> list:
+        """(stage name, seconds) for every non-root span since a time."""
+        with self._pool().connection() as conn:
+            return conn.execute(
+                "SELECT NAME, SECONDS FROM SPANS WHERE PARENT_ID IS NOT NULL AND START >= ?",
+                (since,)).fetchall()
+
+    def spans(self, trace_id: str) -> list:
+        """All spans of one trace in start order, as dicts."""
+        with self._pool().connection() as conn:
+            rows = conn.execute(
+                "SELECT TRACE_ID, SPAN_ID, PARENT_ID, NAME, START, SECONDS, ATTRS FROM SPANS "
+                "WHERE TRACE_ID = ? ORDER BY START", (trace_id,)).fetchall()
+        return [{"trace_id": t, "span_id": s, "parent_id": p, "name": n, "start": start,
+                 "seconds": seconds, "attrs": json.loads(attrs)}
+                for t, s, p, n, start, seconds, attrs in rows]
+
+
+def token_usage(response) -> dict:
+    """input_tokens/output_tokens reported on an LLM reply, if any."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return {"tokens_in": usage.get("input_tokens"), "tokens_out": usage.get("output_tokens")}
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer